@@ -90,21 +90,20 @@ class AudioAgent:
             logger.error(f"Error processing audio chunk: {e}")
             return None
 
+    def _infer(self, audio_input: np.ndarray) -> str:
+        """Run Wav2Vec2 inference (blocking)."""
+        # No resampling needed if input is already 16k
+        inputs = self.processor(audio_input, sampling_rate=16000, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            logits = self.model(inputs.input_values).logits
+        predicted_ids = torch.argmax(logits, dim=-1)
+        return self.processor.batch_decode(predicted_ids)[0]
+
     async def _transcribe_audio(self, audio_input: np.ndarray) -> Optional[str]:
         """Run Wav2Vec2 inference."""
         try:
             loop = asyncio.get_event_loop()
-            
-            def infer():
-                # No resampling needed if input is already 16k
-                inputs = self.processor(audio_input, sampling_rate=16000, return_tensors="pt", padding=True)
-                with torch.no_grad():
-                    logits = self.model(inputs.input_values).logits
-                predicted_ids = torch.argmax(logits, dim=-1)
-                transcription = self.processor.batch_decode(predicted_ids)[0]
-                return transcription
-
-            text = await loop.run_in_executor(None, infer)
+            text = await loop.run_in_executor(None, self._infer, audio_input)
             
             if text and len(text.strip()) > 0:
                 logger.info(f"Transcribed: {text}")
@@ -114,6 +113,23 @@ class AudioAgent:
             logger.error(f"STT Error: {e}")
             return None
 
+    def transcribe_segment(self, chunk_data: bytes) -> Dict:
+        """
+        Transcribe one complete speech segment (16-bit PCM) synchronously,
+        returning the same fields as audio_service /transcribe.
+        Used by the orchestrator's local backend.
+        """
+        if not self.has_stt:
+            return {"transcript": "", "intent": None, "entity": None}
+        
+        pcm_data = np.frombuffer(chunk_data, dtype=np.int16)
+        text = self._infer(pcm_data.astype(np.float32) / 32768.0).lower().strip()
+        if not text:
+            return {"transcript": "", "intent": None, "entity": None}
+        
+        self._update_transcript(text)
+        return {"transcript": text, "intent": self._detect_intent(text), "entity": None}
+
     def _detect_intent(self, text: str) -> Optional[str]:
         text = text.lower()
         if "dashboard" in text: return "OPEN_DASHBOARD"
@@ -8,7 +8,6 @@ import asyncio
 import logging
 from typing import Dict, Optional, Tuple, List
 import numpy as np
-import cv2
 import mediapipe as mp
 from deepface import DeepFace
 
@@ -17,6 +16,9 @@ import base64
 import io
 from PIL import Image
 
+from metrics import Metrics
+from preprocess import EMOTION_INPUT_SIZE, LANDMARK_INPUT_SIZE, FrameDecoder
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +46,12 @@ class VisionAgent:
             min_tracking_confidence=0.5
         )
         
+        # Shared preprocessing (scaled / RGB decoding) and per-stage timings
+        self.metrics = Metrics()
+        self.rgb_decoder = FrameDecoder(LANDMARK_INPUT_SIZE, rgb=True, metrics=self.metrics)
+        self.bgr_decoder = FrameDecoder(LANDMARK_INPUT_SIZE, metrics=self.metrics)
+        self.emotion_decoder = FrameDecoder(EMOTION_INPUT_SIZE, metrics=self.metrics)
+        
         # Calibration data
         self.calibration_baseline: Optional[np.ndarray] = None
         self.calibration_frames = []
@@ -66,22 +74,27 @@ class VisionAgent:
         Analyze a single video frame for gaze, gestures, and optionally emotion.
         """
         try:
-            # Convert bytes to OpenCV format
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode: DeepFace needs BGR, MediaPipe alone decodes straight to RGB
+            if process_emotion:
+                img = self.bgr_decoder.decode(image_data)
+                img_rgb = self.bgr_decoder.to_rgb(img) if img is not None else None
+            else:
+                img = img_rgb = self.rgb_decoder.decode(image_data)
             
             if img is None:
                 return None
             
-            # Convert to RGB
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            
             result = {
                 "timestamp": asyncio.get_event_loop().time()
             }
 
+            # Both graphs run before DeepFace is awaited: img_rgb is a reused buffer
+            with self.metrics.timer("face"):
+                face_results = self.face_mesh.process(img_rgb)
+            with self.metrics.timer("hands"):
+                hand_results = self.hands.process(img_rgb)
+
             # 1. Face Analysis (Gaze)
-            face_results = self.face_mesh.process(img_rgb)
             if face_results.multi_face_landmarks:
                 face_landmarks = face_results.multi_face_landmarks[0]
                 gaze_vector, gaze_deviation = self._calculate_gaze(face_landmarks, img.shape)
@@ -91,11 +104,11 @@ class VisionAgent:
                 
                 # Optional Emotion Detection (Expensive)
                 if process_emotion:
-                    emotion = await self._detect_emotion(img) # Use BGR for DeepFace
+                    with self.metrics.timer("emotion"):
+                        emotion = await self._detect_emotion(img) # Use BGR for DeepFace
                     result.update(emotion)
             
             # 2. Hand Analysis (Gestures)
-            hand_results = self.hands.process(img_rgb)
             if hand_results.multi_hand_landmarks:
                 hand_landmarks = hand_results.multi_hand_landmarks[0]
                 gesture = self._classify_gesture(hand_landmarks)
@@ -107,6 +120,32 @@ class VisionAgent:
             logger.error(f"Error analyzing frame: {e}")
             return None
     
+    def analyze_emotion(self, image_data: bytes) -> Dict:
+        """
+        Synchronous DeepFace pass returning the same fields as
+        deepface_service /analyze. Used by the orchestrator's local backend.
+        """
+        img = self.emotion_decoder.decode(image_data)
+        if img is None:
+            return {"error": "Invalid image"}
+        
+        with self.metrics.timer("emotion"):
+            result = DeepFace.analyze(
+                img_path=img,
+                actions=['emotion'],
+                enforce_detection=False,
+                detector_backend='opencv',
+                silent=True
+            )
+        if result and len(result) > 0:
+            dominant_emotion = result[0]['dominant_emotion']
+            return {
+                "emotion": dominant_emotion,
+                "confidence": result[0]['emotion'][dominant_emotion] / 100.0,
+                "all_emotions": {k: float(v) for k, v in result[0]['emotion'].items()}
+            }
+        return {"emotion": "neutral", "confidence": 0.0}
+    
     def _calculate_gaze(self, face_landmarks, img_shape: Tuple[int, int, int]) -> Tuple[Optional[np.ndarray], float]:
         """Calculate gaze vector and deviation."""
         h, w, _ = img_shape
@@ -0,0 +1,140 @@
+"""
+Streaming Speech Segmenter for the OmniSense Orchestrator
+
+Cuts the raw PCM stream (16 kHz, 16-bit mono) into speech segments using
+VAD on 30 ms frames, so only speech is sent to the audio service.
+"""
+
+import logging
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # Fall back to a simple energy gate
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechSegmenter:
+    """
+    Incremental VAD endpointer.
+
+    - A segment opens when most of the pre-roll window is voiced; the pre-roll
+      frames are included so the first syllable is not lost.
+    - It closes after `silence_ms` of trailing silence.
+    - Segments longer than `max_segment_ms` are cut, and the next one starts
+      with the last `overlap_ms` of audio so no word is split at the boundary.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        aggressiveness: int = 2,
+        pre_roll_ms: int = 300,
+        silence_ms: int = 600,
+        max_segment_ms: int = 6000,
+        overlap_ms: int = 300,
+        min_speech_ms: int = 250,
+        energy_threshold: int = 500
+    ):
+        self.sample_rate = sample_rate
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.pre_roll_frames = max(1, pre_roll_ms // frame_ms)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = max(1, max_segment_ms // frame_ms)
+        self.overlap_frames = min(overlap_ms // frame_ms, self.max_frames - 1)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.energy_threshold = energy_threshold
+
+        self.vad = webrtcvad.Vad(aggressiveness) if webrtcvad else None
+        if self.vad is None:
+            logger.warning("webrtcvad not installed, using energy-based VAD")
+
+        self.pending = bytearray()
+        self.ring = deque(maxlen=self.pre_roll_frames)
+        self.frames: List[bytes] = []
+        # Speech flags of the last frames, i.e. of the overlap a cut carries over
+        self.recent = deque(maxlen=self.overlap_frames)
+        self.triggered = False
+        self.voiced_count = 0
+        self.silence_run = 0
+
+    def _is_speech(self, frame: bytes) -> bool:
+        if self.vad is not None:
+            return self.vad.is_speech(frame, self.sample_rate)
+        samples = np.frombuffer(frame, dtype=np.int16)
+        return int(np.max(np.abs(samples))) > self.energy_threshold
+
+    def feed(self, pcm: bytes) -> List[bytes]:
+        """Add PCM bytes; return any speech segments completed by them."""
+        self.pending.extend(pcm)
+        segments = []
+
+        while len(self.pending) >= self.frame_bytes:
+            frame = bytes(self.pending[:self.frame_bytes])
+            del self.pending[:self.frame_bytes]
+            speech = self._is_speech(frame)
+
+            if not self.triggered:
+                self.ring.append((frame, speech))
+                voiced = sum(1 for _, s in self.ring if s)
+                if len(self.ring) == self.ring.maxlen and voiced > 0.6 * self.ring.maxlen:
+                    # Speech start: include the pre-roll
+                    self.triggered = True
+                    self.frames = [f for f, _ in self.ring]
+                    self.recent.extend(s for _, s in self.ring)
+                    self.voiced_count = voiced
+                    self.silence_run = 0
+                    self.ring.clear()
+                continue
+
+            self.frames.append(frame)
+            self.recent.append(speech)
+            if speech:
+                self.voiced_count += 1
+                self.silence_run = 0
+            else:
+                self.silence_run += 1
+
+            if self.silence_run >= self.silence_frames:
+                # Endpoint: drop most of the trailing silence
+                keep = len(self.frames) - self.silence_run + min(self.silence_run, 5)
+                segment = self._close(self.frames[:keep])
+                if segment:
+                    segments.append(segment)
+                self.triggered = False
+                self.frames = []
+                self.recent.clear()
+            elif len(self.frames) >= self.max_frames:
+                # Max length: cut, and carry the tail over into the next segment
+                segment = self._close(self.frames)
+                if segment:
+                    segments.append(segment)
+                self.frames = self.frames[len(self.frames) - self.overlap_frames:] if self.overlap_frames else []
+                # The carried frames count, so a short tail after the cut is not dropped as noise
+                self.voiced_count = sum(self.recent)
+
+        return segments
+
+    def flush(self) -> Optional[bytes]:
+        """Close any open segment and reset; the orchestrator calls it on disconnect."""
+        segment = self._close(self.frames) if self.triggered else None
+        self.triggered = False
+        self.frames = []
+        self.recent.clear()
+        self.ring.clear()
+        self.pending.clear()
+        return segment
+
+    def _close(self, frames: List[bytes]) -> Optional[bytes]:
+        voiced = self.voiced_count
+        self.voiced_count = 0
+        self.silence_run = 0
+        if voiced < self.min_speech_frames:
+            return None
+        return b"".join(frames)
@@ -0,0 +1,120 @@
+"""
+Backend Benchmark - remote microservices vs local in-process agents
+
+Sends the same JPEG frame N times through both inference backends and reports
+per-call latency for the gesture (MediaPipe) and emotion (DeepFace) paths.
+
+- remote: POST raw bytes to the running mediapipe / deepface services
+- local:  LocalInferenceBackend (the service's landmark pipeline and VisionAgent
+          in worker processes)
+
+Requires the models to be installed, and the services to be running for the
+remote mode. Run from the backend directory:
+    python benchmarks/backend_benchmark.py --image face.jpg --frames 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_backend import LocalInferenceBackend  # noqa: E402
+
+MEDIAPIPE_URL = "http://localhost:8002"
+DEEPFACE_URL = "http://localhost:8003"
+
+
+def load_frame(path: str) -> bytes:
+    """JPEG bytes of the given image, or of a synthetic 640x480 frame."""
+    if path:
+        img = cv2.imread(path)
+        if img is None:
+            raise SystemExit(f"Cannot read image: {path}")
+    else:
+        img = np.zeros((480, 640, 3), np.uint8)
+        img[:] = np.linspace(0, 255, 640, dtype=np.uint8)[None, :, None]
+    img = cv2.resize(img, (640, 480))
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return buf.tobytes()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+    }
+
+
+async def bench_remote(frame: bytes, n: int) -> Dict[str, List[float]]:
+    headers = {"Content-Type": "application/octet-stream", "X-Session-Id": "bench"}
+    timings = {"mediapipe": [], "deepface": []}
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        for service, url in (("mediapipe", MEDIAPIPE_URL), ("deepface", DEEPFACE_URL)):
+            await client.post(f"{url}/analyze", content=frame, headers=headers)  # warmup
+            for _ in range(n):
+                start = time.perf_counter()
+                response = await client.post(f"{url}/analyze", content=frame, headers=headers)
+                response.json()
+                timings[service].append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_local(frame: bytes, n: int) -> Dict[str, List[float]]:
+    backend = LocalInferenceBackend(vision_workers=1, emotion_workers=1, audio_workers=1)
+    timings = {"mediapipe": [], "deepface": []}
+    try:
+        await backend.warmup()
+        for service in timings:
+            await backend.run(service, frame, "bench")  # warmup
+            for _ in range(n):
+                start = time.perf_counter()
+                await backend.run(service, frame, "bench")
+                timings[service].append(time.perf_counter() - start)
+    finally:
+        backend.shutdown()
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default="", help="Image to use (default: synthetic frame)")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--mode", choices=["both", "remote", "local"], default="both")
+    args = parser.parse_args()
+
+    frame = load_frame(args.image)
+    print(f"Frame: {len(frame)} bytes, {args.frames} calls per service\n")
+
+    results = {}
+    if args.mode in ("both", "remote"):
+        results["remote"] = await bench_remote(frame, args.frames)
+    if args.mode in ("both", "local"):
+        results["local"] = await bench_local(frame, args.frames)
+
+    print(f"{'backend':<8} {'service':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for backend, timings in results.items():
+        for service, samples in timings.items():
+            s = summarize(samples)
+            print(f"{backend:<8} {service:<10} {s['mean']:9.1f} {s['p50']:9.1f} {s['p95']:9.1f}")
+
+    if len(results) == 2:
+        print()
+        for service in ("mediapipe", "deepface"):
+            remote = summarize(results["remote"][service])["mean"]
+            local = summarize(results["local"][service])["mean"]
+            print(f"{service}: local saves {remote - local:.1f} ms per call ({(remote - local) / remote * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+Frame Ring Benchmark - JPEG over HTTP vs shared-memory frame ring
+
+Emulates one orchestrator fanning each frame out to two co-located services
+(mediapipe + deepface), with the services running in their own processes on
+loopback and doing no inference, so only the transport cost is measured:
+- http: the JPEG is POSTed to both services, each decodes it
+- shm:  the orchestrator decodes once into a FrameRing slot and POSTs an empty
+        request with the X-Frame-* headers; the services map the slot
+
+Reports frames per second at the given concurrency and the CPU time per frame
+summed over the three processes. Run from the backend directory:
+    python benchmarks/frame_ring_benchmark.py --frames 2000 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from typing import List
+
+import cv2
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_ring import FrameRef, FrameRing, FrameRingReader  # noqa: E402
+
+
+def make_service_app() -> FastAPI:
+    app = FastAPI()
+    reader = FrameRingReader()
+
+    @app.post("/analyze")
+    async def analyze(request: Request):
+        frame_ref = FrameRef.from_headers(request.headers)
+        if frame_ref is not None:
+            img = reader.view(frame_ref)
+        else:
+            img = cv2.imdecode(np.frombuffer(await request.body(), np.uint8), cv2.IMREAD_COLOR)
+        # Touch the pixels, as a model input step would
+        return {"mean": float(img[::16, ::16].mean())}
+
+    @app.get("/cpu")
+    async def cpu():
+        return {"seconds": time.process_time()}
+
+    return app
+
+
+def serve(port: int):
+    uvicorn.run(make_service_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def synthetic_jpeg(width: int, height: int) -> bytes:
+    img = np.zeros((height, width, 3), np.uint8)
+    img[:] = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+    cv2.circle(img, (width // 2, height // 2), height // 4, (40, 180, 220), -1)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return buf.tobytes()
+
+
+async def services_cpu(client: httpx.AsyncClient, urls: List[str]) -> float:
+    responses = await asyncio.gather(*(client.get(f"{url}/cpu") for url in urls))
+    return sum(r.json()["seconds"] for r in responses)
+
+
+async def run(mode: str, jpeg: bytes, urls: List[str], frames: int, concurrency: int, slots: int):
+    ring = FrameRing(slots=slots) if mode == "shm" else None
+    headers = {"Content-Type": "application/octet-stream"}
+    try:
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency * 2)) as client:
+            async def one_frame():
+                if ring is None:
+                    await asyncio.gather(*(client.post(f"{url}/analyze", content=jpeg, headers=headers) for url in urls))
+                    return
+                img = await asyncio.to_thread(cv2.imdecode, np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                ref = ring.write(img, users=len(urls))
+                try:
+                    await asyncio.gather(*(client.post(f"{url}/analyze", content=b"", headers={**headers, **ref.headers()})
+                                           for url in urls))
+                finally:
+                    for _ in urls:
+                        ring.release(ref)
+
+            async def worker(count: int):
+                for _ in range(count):
+                    await one_frame()
+
+            # Warmup
+            await worker(20)
+
+            cpu_before = time.process_time() + await services_cpu(client, urls)
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(frames // concurrency) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() + await services_cpu(client, urls) - cpu_before
+    finally:
+        if ring is not None:
+            ring.close()
+    done = frames // concurrency * concurrency
+    return done / elapsed, cpu / done
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Frames in flight")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--slots", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8102, help="First service port (two are used)")
+    args = parser.parse_args()
+
+    jpeg = synthetic_jpeg(args.width, args.height)
+    ports = [args.port, args.port + 1]
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    services = [multiprocessing.Process(target=serve, args=(port,), daemon=True) for port in ports]
+    for service in services:
+        service.start()
+    try:
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await services_cpu(client, urls)
+                    break
+                except httpx.HTTPError:
+                    await asyncio.sleep(0.1)
+
+        print(f"{args.width}x{args.height} frames ({len(jpeg)} byte JPEG), 2 services, "
+              f"{args.frames} frames, {args.concurrency} in flight\n")
+        print(f"{'mode':<6} {'frames/s':>9} {'CPU ms/frame':>13}")
+        results = {}
+        for mode in ("http", "shm"):
+            fps, cpu = await run(mode, jpeg, urls, args.frames, args.concurrency, args.slots)
+            results[mode] = cpu
+            print(f"{mode:<6} {fps:>9.1f} {cpu * 1e3:>13.2f}")
+        saved = results["http"] - results["shm"]
+        print(f"\nshm saves {saved * 1e3:.2f} ms CPU per frame ({saved / results['http'] * 100:.1f}%)")
+    finally:
+        for service in services:
+            service.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Landmark Benchmark - per-frame feature and serialization cost in mediapipe_service
+
+Times one frame's worth of landmark handling (2 hands + 1 refined face mesh,
+21 + 21 + 478 points) three ways:
+- legacy: attribute access per landmark, {"x","y","z"} dicts, jsonable_encoder
+- arrays: (N, 3) float32 arrays, vectorized hand features, dict response
+- packed: same arrays, packed base64 float32 response
+
+Uses real MediaPipe protobuf landmark lists when mediapipe is installed,
+plain Python objects otherwise. Run from the backend directory:
+    python benchmarks/landmark_benchmark.py --frames 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services", "mediapipe_service"))
+
+from landmark_arrays import hand_features, landmark_dicts, landmarks_to_array, pack_landmarks  # noqa: E402
+
+try:
+    from mediapipe.framework.formats import landmark_pb2
+except ImportError:
+    landmark_pb2 = None
+
+
+def fake_landmarks(count: int):
+    points = [(random.random(), random.random(), random.random() * 0.1) for _ in range(count)]
+    if landmark_pb2 is not None:
+        landmark_list = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in points:
+            landmark_list.landmark.add(x=x, y=y, z=z)
+        return landmark_list
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in points])
+
+
+def legacy_features(landmarks):
+    """The per-attribute feature code GesturePipeline used before."""
+    thumb_tip = landmarks.landmark[4]
+    index_tip = landmarks.landmark[8]
+    palm_center_x = (landmarks.landmark[5].x + landmarks.landmark[9].x + landmarks.landmark[17].x) / 3
+    fingers = [1 if abs(thumb_tip.x - palm_center_x) > 0.05 else 0]
+    for tip, pip in zip([8, 12, 16, 20], [6, 10, 14, 18]):
+        fingers.append(1 if landmarks.landmark[tip].y < landmarks.landmark[pip].y else 0)
+    thumb_index_dist = np.sqrt((thumb_tip.x - index_tip.x) ** 2 + (thumb_tip.y - index_tip.y) ** 2)
+    return fingers, thumb_index_dist, landmarks.landmark[0].x
+
+
+def legacy_dicts(landmark_lists):
+    return [[{"x": float(p.x), "y": float(p.y), "z": float(p.z)} for p in lm.landmark] for lm in landmark_lists]
+
+
+def run_legacy(hands, faces):
+    start = time.perf_counter()
+    legacy_features(hands[0])
+    features = time.perf_counter()
+    result = {"hand_landmarks": legacy_dicts(hands), "face_landmarks": legacy_dicts(faces)}
+    body = json.dumps(jsonable_encoder(result))
+    return features - start, time.perf_counter() - features, len(body)
+
+
+def run_arrays(hands, faces, serialize):
+    start = time.perf_counter()
+    hand_arrays = [landmarks_to_array(h) for h in hands]
+    face_arrays = [landmarks_to_array(f) for f in faces]
+    hand_features(hand_arrays[0])
+    features = time.perf_counter()
+    result = {"hand_landmarks": serialize(hand_arrays), "face_landmarks": serialize(face_arrays)}
+    body = json.dumps(result)
+    return features - start, time.perf_counter() - features, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=1000)
+    args = parser.parse_args()
+
+    hands = [fake_landmarks(21), fake_landmarks(21)]
+    faces = [fake_landmarks(478)]
+    print(f"Landmarks: {'mediapipe protobuf' if landmark_pb2 else 'python objects'}, {args.frames} frames\n")
+
+    modes = {
+        "legacy": lambda: run_legacy(hands, faces),
+        "arrays": lambda: run_arrays(hands, faces, landmark_dicts),
+        "packed": lambda: run_arrays(hands, faces, pack_landmarks),
+    }
+    print(f"{'mode':<8} {'extract+features us':>20} {'serialize us':>13} {'total us':>9} {'bytes':>7}")
+    for name, run in modes.items():
+        run()  # warmup
+        samples = [run() for _ in range(args.frames)]
+        feature_us = sum(s[0] for s in samples) / len(samples) * 1e6
+        serialize_us = sum(s[1] for s in samples) / len(samples) * 1e6
+        print(f"{name:<8} {feature_us:>20.1f} {serialize_us:>13.1f} {feature_us + serialize_us:>9.1f} {samples[0][2]:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Load Generator - ramp concurrent /ws clients until the orchestrator saturates
+
+Each step opens N connections that stream JPEG frames (and optionally PCM
+audio) at a target fps with jitter, measures them for a fixed window, then
+closes them and moves to the next N. Per step it reports answered fps, the
+frame -> UI_COMMAND latency distribution (pooled and per connection),
+rejected connections and the server-side error counters from /metrics.
+
+A step is saturated when connections answer less than --min-answer-ratio of
+the frames they send, p95 latency exceeds --slo-ms, or the server rejects or
+drops connections; the first saturated step is reported as the saturation
+point. Run offline against benchmarks/stub_services.py:
+    python benchmarks/stub_services.py --mediapipe-ms 15 --jitter-ms 5 &
+    uvicorn main:app --port 8000 &
+    python benchmarks/load_generator.py --start 1 --step 4 --max 40 --fps 15
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import cv2
+import httpx
+import numpy as np
+import websockets
+
+from replay import control_message, metrics_url, percentiles
+
+SAMPLE_RATE = 16000
+AUDIO_CHUNK_MS = 100
+SERVER_COUNTERS = [
+    "frames.dropped", "frames.stale", "frames.processed",
+    "mediapipe.errors", "mediapipe.timeouts", "mediapipe.short_circuited",
+    "deepface.errors", "deepface.timeouts", "deepface.short_circuited",
+    "audio.requests", "audio.errors", "audio.timeouts", "audio.short_circuited"
+]
+
+
+def synthetic_frames(count: int, image: str) -> List[bytes]:
+    """Pre-encoded JPEG frames: the given image, or moving gradients, shifted per frame."""
+    if image:
+        base = cv2.imread(image)
+        if base is None:
+            raise SystemExit(f"Cannot read image: {image}")
+        base = cv2.resize(base, (640, 480))
+    else:
+        base = np.zeros((480, 640, 3), np.uint8)
+        base[:] = np.linspace(0, 255, 640, dtype=np.uint8)[None, :, None]
+    frames = []
+    for i in range(count):
+        img = np.roll(base, i * 8, axis=1)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        frames.append(b"\x00" + buf.tobytes())
+    return frames
+
+
+def synthetic_speech(seconds: float = 4.0) -> List[bytes]:
+    """16 kHz int16 PCM chunks: 1.5 s of voiced-like signal, then silence."""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    voiced = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 8))
+    voiced *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    signal = np.where(t < 1.5, voiced * 6000, 0.0).astype(np.int16).tobytes()
+    chunk = SAMPLE_RATE * AUDIO_CHUNK_MS // 1000 * 2
+    return [b"\x01" + signal[i:i + chunk] for i in range(0, len(signal), chunk)]
+
+
+class ClientStats:
+    def __init__(self):
+        self.sent = 0
+        self.latencies: List[float] = []
+        self.error: Optional[str] = None
+
+
+async def run_client(url: str, name: str, frames: List[bytes], audio: List[bytes],
+                     fps: float, jitter: float, stop: asyncio.Event) -> ClientStats:
+    stats = ClientStats()
+    sent_at: Dict[int, float] = {}
+    try:
+        async with websockets.connect(f"{url}?session_id={name}", max_size=None) as ws:
+            await ws.send(control_message({"type": "COMMAND_POLICY", "policy": "repeat", "interval": 0}))
+
+            async def receive():
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        continue
+                    data = json.loads(message)
+                    if data.get("type") == "UI_COMMAND" and data.get("source") == "GESTURE":
+                        started = sent_at.pop(data.get("frame"), None)
+                        if started is not None:
+                            stats.latencies.append(time.perf_counter() - started)
+
+            async def send_audio():
+                i = 0
+                while True:
+                    await ws.send(audio[i % len(audio)])
+                    i += 1
+                    await asyncio.sleep(AUDIO_CHUNK_MS / 1000)
+
+            receiver = asyncio.create_task(receive())
+            audio_sender = asyncio.create_task(send_audio()) if audio else None
+            # Spread connection phases so frames do not arrive in lockstep
+            await asyncio.sleep(random.uniform(0, 1 / fps))
+            interval = 1 / fps
+            next_at = time.perf_counter()
+            while not stop.is_set():
+                stats.sent += 1
+                sent_at[stats.sent] = time.perf_counter()
+                await ws.send(frames[stats.sent % len(frames)])
+                next_at += interval * (1 + random.uniform(-jitter, jitter))
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                if receiver.done():
+                    break
+
+            # Give the last frames a moment to come back
+            await asyncio.sleep(0.5)
+            if audio_sender is not None:
+                audio_sender.cancel()
+            receiver.cancel()
+            if ws.close_code is not None:
+                stats.error = f"closed by server ({ws.close_code})"
+    except (OSError, websockets.WebSocketException) as e:
+        stats.error = f"{type(e).__name__}: {e}"
+    return stats
+
+
+async def server_counters(client: httpx.AsyncClient, url: str) -> Optional[Dict[str, int]]:
+    try:
+        counters = (await client.get(url)).json()["counters"]
+    except (httpx.HTTPError, ValueError, KeyError):
+        return None
+    return {name: counters.get(name, 0) for name in SERVER_COUNTERS}
+
+
+async def run_step(args, n: int, frames: List[bytes], audio: List[bytes], client: httpx.AsyncClient) -> Dict:
+    stop = asyncio.Event()
+    run_id = uuid.uuid4().hex[:6]
+    before = await server_counters(client, metrics_url(args.url))
+    tasks = [
+        asyncio.create_task(run_client(args.url, f"load-{run_id}-{i}", frames, audio, args.fps, args.jitter, stop))
+        for i in range(n)
+    ]
+    await asyncio.sleep(args.step_seconds)
+    stop.set()
+    clients = await asyncio.gather(*tasks)
+    after = await server_counters(client, metrics_url(args.url))
+
+    latencies = [x for c in clients for x in c.latencies]
+    sent = sum(c.sent for c in clients)
+    errors = [c.error for c in clients if c.error]
+    server = {k: after[k] - before[k] for k in SERVER_COUNTERS} if before and after else {}
+    answer_ratio = len(latencies) / sent if sent else 0.0
+    p = percentiles(latencies)
+    saturated = bool(errors) or answer_ratio < args.min_answer_ratio or p["p95"] > args.slo_ms
+    return {
+        "connections": n,
+        "sent": sent,
+        "answered": len(latencies),
+        "answer_ratio": answer_ratio,
+        "answered_fps": len(latencies) / args.step_seconds,
+        "latency_ms": p,
+        "per_connection_ms": [percentiles(c.latencies) for c in clients],
+        "client_errors": errors,
+        "server": server,
+        "saturated": saturated
+    }
+
+
+def print_step(step: Dict, per_connection: bool):
+    p = step["latency_ms"]
+    server = step["server"]
+    server_errors = sum(v for k, v in server.items() if k.split(".")[1] in ("errors", "timeouts", "short_circuited"))
+    print(f"{step['connections']:>5} {step['sent']:>7} {step['answer_ratio'] * 100:>7.1f}% {step['answered_fps']:>8.1f} "
+          f"{p['p50']:>8.1f} {p['p95']:>8.1f} {p['p99']:>8.1f} {server.get('frames.dropped', 0):>8} "
+          f"{server_errors:>7} {len(step['client_errors']):>7}{'  SATURATED' if step['saturated'] else ''}")
+    if per_connection:
+        for i, c in enumerate(step["per_connection_ms"]):
+            print(f"        conn {i:<3} p50 {c['p50']:7.1f}  p95 {c['p95']:7.1f}  p99 {c['p99']:7.1f}")
+    for error in sorted(set(step["client_errors"])):
+        print(f"        client error: {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--start", type=int, default=1, help="Connections in the first step")
+    parser.add_argument("--step", type=int, default=2, help="Connections added per step")
+    parser.add_argument("--max", type=int, default=32, help="Upper bound on connections")
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=float, default=15.0, help="Frames per second per connection")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Frame interval jitter, as a fraction (0.2 = +/-20%%)")
+    parser.add_argument("--image", default="", help="Image to send (default: synthetic frames)")
+    parser.add_argument("--audio", action="store_true", help="Also stream PCM audio with periodic speech")
+    parser.add_argument("--slo-ms", type=float, default=200.0, help="p95 frame -> command latency budget")
+    parser.add_argument("--min-answer-ratio", type=float, default=0.9)
+    parser.add_argument("--per-connection", action="store_true", help="Print each connection's latency distribution")
+    parser.add_argument("--keep-going", action="store_true", help="Do not stop at the first saturated step")
+    parser.add_argument("--json", default="", help="Also write the step results to this file")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(30, args.image)
+    audio = synthetic_speech() if args.audio else []
+    print(f"{len(frames[0]) - 1} byte frames at {args.fps} fps (+/-{args.jitter * 100:.0f}%), "
+          f"{args.step_seconds}s per step{', with audio' if audio else ''}\n")
+    print(f"{'conns':>5} {'sent':>7} {'answered':>8} {'ans fps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'dropped':>8} {'srv err':>7} {'cli err':>7}")
+
+    steps = []
+    saturation = None
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        n = args.start
+        while n <= args.max:
+            step = await run_step(args, n, frames, audio, client)
+            steps.append(step)
+            print_step(step, args.per_connection)
+            if step["saturated"] and saturation is None:
+                saturation = n
+                if not args.keep_going:
+                    break
+            n += args.step
+
+    print()
+    healthy = [s["connections"] for s in steps if not s["saturated"]]
+    if saturation is None:
+        print(f"No saturation up to {steps[-1]['connections']} connections")
+    else:
+        print(f"Saturation at {saturation} connections"
+              f"{f' (last healthy step: {max(healthy)})' if healthy else ''}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "saturation": saturation, "steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Preprocess Benchmark - full decode + cvtColor vs scaled / RGB decoding
+
+Times the JPEG -> model input step for the MediaPipe side (RGB) and the
+DeepFace side (BGR) at a few camera resolutions:
+- legacy: cv2.imdecode(IMREAD_COLOR) at full size, then cvtColor to RGB
+- shared: preprocess.FrameDecoder with the default target sizes
+  (scaled decoding, direct RGB where OpenCV supports it)
+
+Run from the backend directory:
+    python benchmarks/preprocess_benchmark.py --frames 300
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess import EMOTION_INPUT_SIZE, IMREAD_COLOR_RGB, LANDMARK_INPUT_SIZE, FrameDecoder  # noqa: E402
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+
+
+def synthetic_jpeg(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return buf.tobytes()
+
+
+def legacy_rgb(data: bytes) -> np.ndarray:
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def legacy_bgr(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def mean_ms(fn, data: bytes, frames: int) -> float:
+    fn(data)  # warmup
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(data)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    landmark = FrameDecoder(LANDMARK_INPUT_SIZE, rgb=True)
+    emotion = FrameDecoder(EMOTION_INPUT_SIZE)
+    print(f"Direct RGB decoding: {'yes' if IMREAD_COLOR_RGB is not None else 'no (OpenCV < 4.10)'}, "
+          f"target sizes: MediaPipe {LANDMARK_INPUT_SIZE}, DeepFace {EMOTION_INPUT_SIZE}\n")
+    print(f"{'frame':<10} {'stage':<10} {'legacy ms':>10} {'shared ms':>10} {'output':>12}")
+    for width, height in RESOLUTIONS:
+        data = synthetic_jpeg(width, height)
+        for stage, legacy, shared in (("mediapipe", legacy_rgb, landmark.decode), ("deepface", legacy_bgr, emotion.decode)):
+            out = shared(data)
+            print(f"{f'{width}x{height}':<10} {stage:<10} {mean_ms(legacy, data, args.frames):>10.2f} "
+                  f"{mean_ms(shared, data, args.frames):>10.2f} {f'{out.shape[1]}x{out.shape[0]}':>12}")
+
+
+if __name__ == "__main__":
+    main()
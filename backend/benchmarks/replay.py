@@ -0,0 +1,162 @@
+"""
+Session Replay - re-send a recorded /ws session and measure end-to-end latency
+
+Replays a recording made with WS_RECORD_DIR set on the orchestrator, at the
+original pace or N times faster, and reports:
+- frame -> UI_COMMAND latency (p50/p95/p99), matched on the command's `frame`
+  sequence number
+- throughput (frames sent and answered per second)
+- frames dropped / skipped as stale by the orchestrator (from /metrics, so run
+  it against an otherwise idle orchestrator)
+
+The connection asks for a command on every analyzed frame (COMMAND_POLICY
+repeat, interval 0) so each processed gesture frame is measurable; recorded
+COMMAND_POLICY messages are not replayed. Run offline against
+benchmarks/stub_services.py:
+    python benchmarks/stub_services.py &
+    uvicorn main:app --port 8000 &
+    python benchmarks/replay.py recordings/abc_1700000000.omnirec --speed 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_recorder import read_recording  # noqa: E402
+
+FRAME_COUNTERS = ["frames.received", "frames.dropped", "frames.stale", "frames.processed"]
+
+
+def control_message(message: Dict) -> bytes:
+    return b"\x02" + json.dumps(message).encode("utf-8")
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 in milliseconds (nearest rank)."""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def is_policy_message(data: bytes) -> bool:
+    if data[0] != 2:
+        return False
+    try:
+        return json.loads(data[1:].decode("utf-8")).get("type") == "COMMAND_POLICY"
+    except ValueError:
+        return False
+
+
+def metrics_url(ws_url: str) -> str:
+    base = ws_url.replace("wss://", "https://").replace("ws://", "http://")
+    return base.rsplit("/ws", 1)[0] + "/metrics"
+
+
+async def frame_counters(client: httpx.AsyncClient, url: str) -> Optional[Dict[str, int]]:
+    try:
+        counters = (await client.get(url)).json()["counters"]
+    except (httpx.HTTPError, ValueError, KeyError):
+        return None
+    return {name: counters.get(name, 0) for name in FRAME_COUNTERS}
+
+
+async def replay(url: str, messages: List[Tuple[float, bytes]], speed: float, drain: float) -> Dict:
+    sent_at: Dict[int, float] = {}
+    latencies: List[float] = []
+
+    async with websockets.connect(f"{url}?session_id=replay-{uuid.uuid4().hex[:8]}", max_size=None) as ws:
+        await ws.send(control_message({"type": "COMMAND_POLICY", "policy": "repeat", "interval": 0}))
+
+        async def receive():
+            async for message in ws:
+                if isinstance(message, bytes):
+                    continue
+                data = json.loads(message)
+                if data.get("type") == "UI_COMMAND" and data.get("source") == "GESTURE":
+                    started = sent_at.pop(data.get("frame"), None)
+                    if started is not None:
+                        latencies.append(time.perf_counter() - started)
+
+        receiver = asyncio.create_task(receive())
+        seq = 0
+        start = time.perf_counter()
+        for timestamp, data in messages:
+            if is_policy_message(data):
+                continue
+            delay = start + timestamp / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if data[0] == 0:
+                # Same numbering as the orchestrator's frame slot
+                seq += 1
+                sent_at[seq] = time.perf_counter()
+            try:
+                await ws.send(data)
+            except websockets.ConnectionClosed:
+                break
+        duration = time.perf_counter() - start
+
+        # Let in-flight frames finish before closing
+        await asyncio.sleep(drain)
+        receiver.cancel()
+        close_code = ws.close_code
+
+    return {
+        "frames_sent": seq,
+        "duration": duration,
+        "latencies": latencies,
+        "unanswered": len(sent_at),
+        # Set if the orchestrator closed the connection (e.g. 1013 when full)
+        "close_code": close_code
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="File written by the orchestrator with WS_RECORD_DIR set")
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (2 = twice as fast)")
+    parser.add_argument("--drain", type=float, default=1.0, help="Seconds to wait for late results")
+    args = parser.parse_args()
+
+    messages = list(read_recording(args.recording))
+    if not messages:
+        raise SystemExit(f"Empty recording: {args.recording}")
+    print(f"Replaying {len(messages)} messages ({messages[-1][0]:.1f}s recorded) at {args.speed}x\n")
+
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        before = await frame_counters(client, metrics_url(args.url))
+        result = await replay(args.url, messages, args.speed, args.drain)
+        after = await frame_counters(client, metrics_url(args.url))
+
+    frames, duration = result["frames_sent"], result["duration"]
+    answered = len(result["latencies"])
+    p = percentiles(result["latencies"])
+    print(f"frames sent        {frames} in {duration:.2f}s ({frames / duration if duration else 0:.1f} fps)")
+    print(f"frames answered    {answered} ({answered / duration if duration else 0:.1f} fps)")
+    print(f"frame -> command   p50 {p['p50']:.1f} ms   p95 {p['p95']:.1f} ms   p99 {p['p99']:.1f} ms")
+    print(f"unanswered frames  {result['unanswered']}")
+    if before is not None and after is not None:
+        delta = {name: after[name] - before[name] for name in FRAME_COUNTERS}
+        print(f"orchestrator       dropped {delta['frames.dropped']}   stale {delta['frames.stale']}   "
+              f"processed {delta['frames.processed']}")
+    else:
+        print("orchestrator       /metrics unavailable")
+    if result["close_code"] is not None:
+        print(f"connection closed  by server, code {result['close_code']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+ROI Benchmark - full-frame MediaPipe vs ROI-tracked crops
+
+Builds a synthetic "seated user" clip from one photo (a face and/or hands):
+the photo is pasted into a larger frame and drifts slowly, with a few faster
+moves that force the crop to recentre. The same clip then goes through the
+service's detect() path (services/mediapipe_service/landmark_pipeline.py):
+- full: every frame is a full frame, one video-mode graph (ROI off)
+- roi:  RoiTracker crops with the crop / full-frame graph pair (RoiGraphs)
+
+Reports CPU time per frame (process time, so MediaPipe's own threads count),
+the share of frames with landmarks, full-frame searches and crop resets.
+Needs MediaPipe installed. Run from the backend directory:
+    python benchmarks/roi_benchmark.py --image face.jpg --target face --frames 300
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services", "mediapipe_service"))
+
+import landmark_pipeline  # noqa: E402
+from roi_tracker import RoiGraphs, RoiTracker  # noqa: E402
+
+
+def clip(photo: np.ndarray, frame_size, frames: int):
+    """RGB frames with `photo` drifting around the centre, plus a jump every 100 frames."""
+    w, h = frame_size
+    ph, pw = photo.shape[:2]
+    scale = 0.6 * h / ph
+    photo = cv2.resize(photo, (int(pw * scale), int(ph * scale)), interpolation=cv2.INTER_AREA)
+    ph, pw = photo.shape[:2]
+    for i in range(frames):
+        # Slow sway (a few pixels per frame), and a quick shift every 100 frames
+        jump = 0.15 * w if (i // 100) % 2 else 0.0
+        cx = w / 2 + 0.1 * w * math.sin(i / 40) + jump - 0.075 * w
+        cy = h / 2 + 0.05 * h * math.sin(i / 25)
+        x0 = int(np.clip(cx - pw / 2, 0, w - pw))
+        y0 = int(np.clip(cy - ph / 2, 0, h - ph))
+        frame = np.full((h, w, 3), 90, np.uint8)
+        frame[y0:y0 + ph, x0:x0 + pw] = photo
+        yield frame
+
+
+def graph_factory(target: str):
+    mp = landmark_pipeline.mp
+    if target == "face":
+        return lambda static: mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=static, max_num_faces=1, refine_landmarks=True,
+            min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    return lambda static: mp.solutions.hands.Hands(
+        static_image_mode=static, max_num_hands=2, model_complexity=0,
+        min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+def run(mode: str, frames, target: str, target_size: int, refresh_frames: int):
+    field = "multi_face_landmarks" if target == "face" else "multi_hand_landmarks"
+    roi = mode == "roi"
+    tracker = RoiTracker(target_size=target_size, refresh_frames=refresh_frames if roi else 0)
+    graphs = RoiGraphs(graph_factory(target), static_search=roi)
+    # Build both graphs before timing
+    h, w = frames[0].shape[:2]
+    graphs.for_window((0, 0, w, h), frames[0].shape)
+    graphs.for_window((0, 0, w // 2, h // 2), frames[0].shape)
+    graphs.crop_resets = 0
+
+    found = 0
+    start = time.process_time()
+    for frame in frames:
+        arrays, _ = landmark_pipeline.detect(tracker, graphs, frame, field, True)
+        found += bool(arrays)
+    cpu = time.process_time() - start
+    graphs.close()
+    return {
+        "cpu_ms": cpu / len(frames) * 1000,
+        "found": found / len(frames),
+        "full_frames": tracker.full_frames,
+        "crop_resets": graphs.crop_resets
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True, help="photo with a face (--target face) or hands")
+    parser.add_argument("--target", choices=["face", "hands"], default="face")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--target-size", type=int, default=landmark_pipeline.ROI_TARGET_SIZE)
+    parser.add_argument("--refresh-frames", type=int, default=30)
+    args = parser.parse_args()
+
+    photo = cv2.imread(args.image)
+    if photo is None:
+        sys.exit(f"Cannot read {args.image}")
+    frames = list(clip(cv2.cvtColor(photo, cv2.COLOR_BGR2RGB), (args.width, args.height), args.frames))
+
+    print(f"{args.target}, {args.frames} frames of {args.width}x{args.height}, "
+          f"crops at {args.target_size}px, full-frame search every {args.refresh_frames} frames\n")
+    print(f"{'mode':<6} {'CPU ms/frame':>13} {'found':>7} {'full frames':>12} {'crop resets':>12}")
+    for mode in ("full", "roi"):
+        r = run(mode, frames, args.target, args.target_size, args.refresh_frames)
+        print(f"{mode:<6} {r['cpu_ms']:>13.2f} {r['found']:>7.1%} {r['full_frames']:>12} {r['crop_resets']:>12}")
+
+
+if __name__ == "__main__":
+    main()
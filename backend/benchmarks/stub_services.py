@@ -0,0 +1,164 @@
+"""
+Stub Inference Services - offline stand-ins for mediapipe / deepface / audio
+
+Serves the same endpoints and response shapes as the three microservices on
+the same ports, without any model, so the orchestrator can be benchmarked
+offline. Each service sleeps for a configurable artificial latency (plus
+optional jitter) to simulate inference time.
+
+Usage (from the backend directory):
+    python benchmarks/stub_services.py --mediapipe-ms 15 --deepface-ms 120 --audio-ms 300
+
+Frames sent through the shared-memory ring (FRAME_TRANSPORT=shm) are read
+from the ring, like the real services do.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import zlib
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_ring import FrameRef, FrameRingReader, StaleFrameError  # noqa: E402
+
+GESTURES = ["FIST", "OPEN_PALM", "POINTING", "PEACE", "THUMBS_UP", "OK", "TCHAO"]
+EMOTIONS = ["neutral", "happy", "sad", "surprise", "angry"]
+
+# Static topology, same size as the real services send
+HAND_CONNECTIONS = [[i, i + 1] for i in range(20)]
+FACE_CONNECTIONS = [[i, i + 1] for i in range(124)]
+
+
+async def simulate(latency_ms: float, jitter_ms: float):
+    delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000.0)
+
+
+frame_reader = FrameRingReader()
+
+
+async def frame_seed(request: Request) -> int:
+    """
+    Deterministic per frame, so a replayed session gives the same gestures:
+    crc32 of the JPEG body, or of the decoded pixels in the frame ring.
+    """
+    frame_ref = FrameRef.from_headers(request.headers)
+    if frame_ref is None:
+        return zlib.crc32(await request.body())
+    return zlib.crc32(frame_reader.view(frame_ref))
+
+
+def landmarks(count: int, seed: int):
+    rng = random.Random(seed)
+    return [{"x": rng.random(), "y": rng.random(), "z": rng.random() * 0.1} for _ in range(count)]
+
+
+def make_mediapipe_app(latency_ms: float, jitter_ms: float, face: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/analyze")
+    async def analyze(request: Request):
+        tasks = set(request.headers.get("x-tasks", "hands,face,iris").split(","))
+        try:
+            seed = await frame_seed(request)
+        except StaleFrameError as e:
+            return {"error": str(e)}
+        await simulate(latency_ms, jitter_ms)
+        result = {}
+        if "hands" in tasks:
+            result = {
+                "gesture": GESTURES[seed % len(GESTURES)],
+                "command_trigger": True,
+                "hand_landmarks": [landmarks(21, seed)],
+                "hand_connections": HAND_CONNECTIONS
+            }
+        if face and "face" in tasks:
+            result["face_landmarks"] = [landmarks(478 if "iris" in tasks else 468, seed + 1)]
+            result["face_connections"] = FACE_CONNECTIONS
+        if face and "iris" in tasks:
+            # The mesh is not sent for gaze, only this object
+            x, y = (seed % 7 - 3) / 10, (seed % 5 - 2) / 10
+            result["gaze"] = {"vector": [x, y], "deviation": round(abs(x) * 60, 2),
+                              "calibrated": True, "progress": 1.0, "blink": False}
+        return result
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "mediapipe", "stub": True}
+
+    return app
+
+
+def make_deepface_app(latency_ms: float, jitter_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/analyze")
+    async def analyze(request: Request):
+        try:
+            seed = await frame_seed(request)
+        except StaleFrameError as e:
+            return {"error": str(e), "emotion": "neutral", "confidence": 0.0}
+        await simulate(latency_ms, jitter_ms)
+        emotion = EMOTIONS[(seed >> 8) % len(EMOTIONS)]
+        return {
+            "emotion": emotion,
+            "confidence": 0.9,
+            "all_emotions": {e: (90.0 if e == emotion else 2.5) for e in EMOTIONS}
+        }
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "deepface", "stub": True}
+
+    return app
+
+
+def make_audio_app(latency_ms: float, jitter_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/transcribe")
+    async def transcribe(request: Request):
+        await request.body()
+        await simulate(latency_ms, jitter_ms)
+        return {"transcript": "next", "intent": "NAVIGATE", "entity": "NEXT_SECTION"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "audio", "stub": True}
+
+    return app
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mediapipe-ms", type=float, default=15.0)
+    parser.add_argument("--deepface-ms", type=float, default=120.0)
+    parser.add_argument("--audio-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter added to every latency")
+    parser.add_argument("--no-face", action="store_true", help="Do not return face landmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    apps = [
+        (make_mediapipe_app(args.mediapipe_ms, args.jitter_ms, not args.no_face), 8002),
+        (make_deepface_app(args.deepface_ms, args.jitter_ms), 8003),
+        (make_audio_app(args.audio_ms, args.jitter_ms), 8001),
+    ]
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host=args.host, port=port, log_level="warning"))
+        for app, port in apps
+    ]
+    print(f"Stub services on {args.host}: mediapipe:8002 ({args.mediapipe_ms}ms), "
+          f"deepface:8003 ({args.deepface_ms}ms), audio:8001 ({args.audio_ms}ms)")
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
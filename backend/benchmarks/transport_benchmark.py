@@ -0,0 +1,80 @@
+"""
+Transport Benchmark - multipart/form-data vs raw application/octet-stream
+
+Measures the per-request overhead of the two request formats accepted by the
+inference services, in-process (ASGI transport, no network), so the number
+reported is encoding + parsing cost only. Model time is excluded.
+
+Usage:
+    python benchmarks/transport_benchmark.py --size 40000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import time
+
+import httpx
+from fastapi import FastAPI, File, Request, UploadFile
+
+app = FastAPI()
+
+@app.post("/multipart")
+async def multipart_endpoint(file: UploadFile = File(...)):
+    contents = await file.read()
+    return {"size": len(contents)}
+
+@app.post("/raw")
+async def raw_endpoint(request: Request):
+    contents = await request.body()
+    return {"size": len(contents)}
+
+async def run(mode: str, payload: bytes, n: int) -> float:
+    """Return mean seconds per request for the given mode."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "X-Session-Id": "bench"
+        }
+        
+        async def once():
+            if mode == "multipart":
+                r = await client.post(
+                    "/multipart",
+                    files={"file": ("frame.jpg", io.BytesIO(payload), "image/jpeg")}
+                )
+            else:
+                r = await client.post("/raw", content=payload, headers=headers)
+            assert r.json()["size"] == len(payload)
+        
+        # Warmup
+        for _ in range(50):
+            await once()
+        
+        start = time.perf_counter()
+        for _ in range(n):
+            await once()
+        return (time.perf_counter() - start) / n
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=40000, help="Payload size in bytes (640x480 JPEG q=0.7 is ~40KB)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    
+    payload = os.urandom(args.size)
+    multipart = await run("multipart", payload, args.requests)
+    raw = await run("raw", payload, args.requests)
+    saved = multipart - raw
+    
+    print(f"Payload: {args.size} bytes, {args.requests} requests per mode")
+    print(f"  multipart : {multipart * 1e6:8.1f} us/request")
+    print(f"  raw       : {raw * 1e6:8.1f} us/request")
+    print(f"  saved     : {saved * 1e6:8.1f} us/request ({saved / multipart * 100:.1f}%)")
+    print(f"At {args.fps} fps per stream: {saved * args.fps * 1e3:.1f} ms CPU saved per second per stream")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Worker Scaling Benchmark - mediapipe_service throughput vs graph worker count
+
+Drives the service's GraphWorkers directly (no HTTP) with N concurrent
+sessions, each sending its frames in order like a client does, and reports
+frames per second for every worker count, with the speedup over one worker
+and the parallel efficiency (speedup / workers).
+
+With --stub (or when MediaPipe is not installed) the graphs are replaced by a
+stand-in that burns a fixed amount of CPU per call (--stub-ms) and detects
+nothing, so the sweep measures the worker plumbing (process hop, decode,
+per-session state) and the core scaling, not model accuracy. The motion gate
+is turned off, since every session repeats the same frame.
+
+Run from the backend directory:
+    python benchmarks/worker_scaling_benchmark.py --workers 1,2,4 --sessions 16
+    python benchmarks/worker_scaling_benchmark.py --stub --stub-ms 8
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+import types
+
+import cv2
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services", "mediapipe_service")
+sys.path.insert(0, SERVICE_DIR)
+
+# Every session sends the same frame: measure the graphs, not the gate
+os.environ["MOTION_GATE_THRESHOLD"] = "0"
+
+# Decided before main (and mediapipe) is imported; the worker processes
+# inherit it through the environment
+if "--stub" in sys.argv or importlib.util.find_spec("mediapipe") is None:
+    ms = sys.argv[sys.argv.index("--stub-ms") + 1] if "--stub-ms" in sys.argv else "8"
+    os.environ.setdefault("SCALING_STUB_MS", ms)
+STUB_MS = float(os.getenv("SCALING_STUB_MS", "0"))
+
+
+class StubGraph:
+    """Stand-in for a Hands / FaceMesh graph: fixed CPU time per frame, no detection."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def process(self, img):
+        deadline = time.process_time() + STUB_MS / 1000
+        while time.process_time() < deadline:
+            pass
+        return types.SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None, multi_face_landmarks=None)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install_stub():
+    """A `mediapipe` module exposing only what landmark_pipeline uses, backed by StubGraph."""
+    stub = types.ModuleType("mediapipe")
+    stub.solutions = types.SimpleNamespace(
+        hands=types.SimpleNamespace(Hands=StubGraph, HAND_CONNECTIONS=[(0, 1)]),
+        face_mesh=types.SimpleNamespace(FaceMesh=StubGraph, FACEMESH_CONTOURS=[(0, 1)])
+    )
+    sys.modules["mediapipe"] = stub
+
+
+# Runs again in spawned worker processes, so they get the same graphs
+if STUB_MS > 0:
+    install_stub()
+
+from main import GraphWorkers  # noqa: E402
+
+
+def test_frame(image: str) -> bytes:
+    img = cv2.imread(image) if image else None
+    if img is None:
+        rng = np.random.default_rng(0)
+        img = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8), (0, 0), 3)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return buf.tobytes()
+
+
+async def sweep_point(workers: int, sessions: int, frames: int, frame: bytes, tasks: set) -> float:
+    """Frames per second with `workers` graph workers and `sessions` concurrent sessions."""
+    pool = GraphWorkers(workers)
+    try:
+        # Start the processes and build every session's graphs before timing
+        await pool.stats()
+        await asyncio.gather(*(pool.analyze(frame, f"s{i}", tasks, False) for i in range(sessions)))
+
+        async def client(i: int):
+            for _ in range(frames):
+                await pool.analyze(frame, f"s{i}", tasks, False)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(sessions)))
+        return sessions * frames / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)) or "1")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=30, help="frames per session")
+    parser.add_argument("--tasks", default="hands,face")
+    parser.add_argument("--image", default="", help="JPEG to send (default: synthetic 640x480)")
+    parser.add_argument("--stub", action="store_true", help="stand-in graphs instead of MediaPipe")
+    parser.add_argument("--stub-ms", type=float, default=8.0, help="CPU time per stand-in graph call")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s), {args.sessions} sessions x {args.frames} frames, tasks {args.tasks}, "
+          f"graphs: {f'stub ({STUB_MS:g} ms)' if STUB_MS > 0 else 'MediaPipe'}\n")
+    print(f"{'workers':>7} {'frames/s':>9} {'speedup':>8} {'efficiency':>11}")
+    frame = test_frame(args.image)
+    tasks = {t.strip() for t in args.tasks.split(",")}
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        fps = await sweep_point(workers, args.sessions, args.frames, frame, tasks)
+        baseline = baseline or fps / workers
+        speedup = fps / baseline
+        print(f"{workers:>7} {fps:>9.1f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+"""
+Shared-Memory Frame Ring for co-located services
+
+Optional transport (FRAME_TRANSPORT=shm) for when the orchestrator and the
+inference services share a host: the orchestrator decodes each JPEG once into
+a slot of a multiprocessing.shared_memory ring, and the HTTP request to each
+service carries only the slot reference (X-Frame-* headers, empty body). The
+services map the slot as a NumPy array without copying or decoding.
+
+Slots are leased: the writer only reuses a slot once every service call that
+was given it has finished. Each slot also carries a sequence number, checked
+by readers after use, so a frame overwritten under a reader (e.g. after an
+orchestrator-side timeout) is detected instead of returning torn results.
+
+Layout: a 64-byte ring header (magic, slot count, slot stride), then repeated
+slots of [64-byte header: u64 seq, u32 height, u32 width, u32 channels]
+[height * width * channels bytes of BGR pixels].
+"""
+
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"OMNIRING"
+RING_HEADER = struct.Struct("<8sII")
+SLOT_HEADER = struct.Struct("<QIII")
+# Both headers are padded to 64 bytes so pixel data stays aligned
+HEADER_SIZE = 64
+
+
+class StaleFrameError(Exception):
+    """The slot no longer holds the referenced frame."""
+
+
+class FrameRef(NamedTuple):
+    """Reference to one frame in a ring, as sent to the services."""
+    ring: str
+    slot: int
+    seq: int
+
+    def headers(self) -> Dict[str, str]:
+        return {"X-Frame-Ring": self.ring, "X-Frame-Slot": str(self.slot), "X-Frame-Seq": str(self.seq)}
+
+    @classmethod
+    def from_headers(cls, headers) -> Optional["FrameRef"]:
+        ring = headers.get("x-frame-ring")
+        if not ring:
+            return None
+        return cls(ring, int(headers["x-frame-slot"]), int(headers["x-frame-seq"]))
+
+
+def _slot_stride(capacity: int) -> int:
+    # Keep every slot 64-byte aligned
+    return HEADER_SIZE + (capacity + 63) // 64 * 64
+
+
+class FrameRing:
+    """Writer side, owned by the orchestrator (single event loop, no locking)."""
+
+    def __init__(self, slots: int = 16, max_width: int = 1280, max_height: int = 720, channels: int = 3):
+        self.slots = slots
+        self.capacity = max_width * max_height * channels
+        self.stride = _slot_stride(self.capacity)
+        self.shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + self.stride * slots)
+        RING_HEADER.pack_into(self.shm.buf, 0, MAGIC, slots, self.stride)
+        self.name = self.shm.name
+        self.users = [0] * slots
+        self.next_slot = 0
+        self.seq = 0
+
+        # Counters
+        self.written = 0
+        self.full = 0
+
+    def write(self, img: np.ndarray, users: int) -> Optional[FrameRef]:
+        """
+        Copy a decoded frame into a free slot leased to `users` readers.
+        None if the frame is too large or every slot is still in use
+        (the caller then falls back to sending the JPEG).
+        """
+        if img.nbytes > self.capacity or img.ndim != 3:
+            return None
+        for i in range(self.slots):
+            slot = (self.next_slot + i) % self.slots
+            if self.users[slot] == 0:
+                break
+        else:
+            self.full += 1
+            return None
+        self.next_slot = (slot + 1) % self.slots
+
+        offset = HEADER_SIZE + slot * self.stride
+        # seq 0 marks the slot as being written
+        SLOT_HEADER.pack_into(self.shm.buf, offset, 0, 0, 0, 0)
+        pixels = np.ndarray(img.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset + HEADER_SIZE)
+        pixels[...] = img
+        del pixels
+        self.seq += 1
+        h, w, c = img.shape
+        SLOT_HEADER.pack_into(self.shm.buf, offset, self.seq, h, w, c)
+
+        self.users[slot] = users
+        self.written += 1
+        return FrameRef(self.name, slot, self.seq)
+
+    def release(self, ref: FrameRef):
+        """One reader is done with the frame."""
+        if self.users[ref.slot] > 0:
+            self.users[ref.slot] -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "slots": self.slots,
+            "in_use": sum(1 for u in self.users if u),
+            "written": self.written,
+            "full": self.full
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameRingReader:
+    """Reader side, used by the services; rings are attached once and cached."""
+
+    def __init__(self):
+        self.rings: Dict[str, Tuple[shared_memory.SharedMemory, int]] = {}
+
+    def _attach(self, name: str) -> Tuple[shared_memory.SharedMemory, int]:
+        ring = self.rings.get(name)
+        if ring is None:
+            shm = shared_memory.SharedMemory(name=name)
+            # The orchestrator owns the segment: do not unlink it when this process exits
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+            magic, _, stride = RING_HEADER.unpack_from(shm.buf, 0)
+            if magic != MAGIC:
+                shm.close()
+                raise StaleFrameError(f"{name} is not a frame ring")
+            ring = self.rings[name] = (shm, stride)
+        return ring
+
+    def view(self, ref: FrameRef) -> np.ndarray:
+        """Zero-copy BGR view of the referenced frame."""
+        shm, stride = self._attach(ref.ring)
+        offset = HEADER_SIZE + ref.slot * stride
+        seq, h, w, c = SLOT_HEADER.unpack_from(shm.buf, offset)
+        if seq != ref.seq:
+            raise StaleFrameError(f"slot {ref.slot} holds frame {seq}, not {ref.seq}")
+        return np.ndarray((h, w, c), dtype=np.uint8, buffer=shm.buf, offset=offset + HEADER_SIZE)
+
+    def still_valid(self, ref: FrameRef) -> bool:
+        """True if the frame was not overwritten while it was being used."""
+        shm, stride = self._attach(ref.ring)
+        return SLOT_HEADER.unpack_from(shm.buf, HEADER_SIZE + ref.slot * stride)[0] == ref.seq
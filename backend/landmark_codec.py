@@ -0,0 +1,136 @@
+"""
+Binary Landmark Codec for the OmniSense Orchestrator
+
+Packs hand and face landmarks into compact binary WebSocket messages instead
+of JSON lists of {"x", "y", "z"} dicts. The connection topology is sent once
+per connection. See "Flux binaire des landmarks" in TECHNICAL_DOCUMENTATION.md
+for the wire format.
+"""
+
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Message types (first byte)
+MSG_LANDMARKS = 0x10
+MSG_TOPOLOGY = 0x11
+
+# Landmark flags
+FLAG_DELTA = 0x01
+FLAG_INT16 = 0x02
+FLAG_INT8 = 0x04  # delta values fit in int8
+
+# Group kinds
+KIND_HAND = 0
+KIND_FACE = 1
+
+# int16 quantization: value = q / INT16_SCALE
+INT16_SCALE = 16384.0
+
+HEADER = struct.Struct("<BBHHH")    # type, flags, seq, group count, reserved
+GROUP_HEADER = struct.Struct("<HH")  # kind, point count (landmarks) / edge count (topology)
+TOPOLOGY_HEADER = struct.Struct("<BBH")  # type, reserved, group count
+
+
+def landmark_groups(vision_data: Dict) -> List[Tuple[int, np.ndarray]]:
+    """Extract (kind, (N, 3) float32 array) for every hand and face."""
+    groups = []
+    for kind, key in ((KIND_HAND, "hand_landmarks"), (KIND_FACE, "face_landmarks")):
+        for points in vision_data.get(key) or []:
+            coords = np.array([[p["x"], p["y"], p["z"]] for p in points], dtype=np.float32)
+            groups.append((kind, coords.reshape(-1, 3)))
+    return groups
+
+
+class LandmarkEncoder:
+    """
+    Per-connection landmark encoder.
+
+    - encoding: "int16" (quantized, 1/16384 resolution) or "float16"
+    - delta: send differences against the previous frame's quantized values
+      (int8 when small enough, else int16), with a full keyframe every
+      `keyframe_interval` frames or when the layout changes. Ignored for float16.
+    """
+
+    def __init__(self, encoding: str = "int16", delta: bool = False, keyframe_interval: int = 30):
+        if encoding not in ("int16", "float16"):
+            raise ValueError(f"Unknown landmark encoding: {encoding}")
+        self.encoding = encoding
+        self.delta = delta and encoding == "int16"
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.sent_topology = set()
+        self.prev_layout: Optional[List[Tuple[int, int]]] = None
+        self.prev_values: Optional[np.ndarray] = None
+        self.since_keyframe = 0
+
+    def topology_message(self, vision_data: Dict) -> Optional[bytes]:
+        """Connections for any kind not yet sent on this connection."""
+        parts = []
+        for kind, key in ((KIND_HAND, "hand_connections"), (KIND_FACE, "face_connections")):
+            connections = vision_data.get(key)
+            if kind in self.sent_topology or not connections:
+                continue
+            edges = np.asarray(connections, dtype=np.uint16).reshape(-1, 2)
+            parts.append(GROUP_HEADER.pack(kind, len(edges)) + edges.astype("<u2").tobytes())
+            self.sent_topology.add(kind)
+
+        if not parts:
+            return None
+        return TOPOLOGY_HEADER.pack(MSG_TOPOLOGY, 0, len(parts)) + b"".join(parts)
+
+    def encode(self, vision_data: Dict) -> bytes:
+        """Encode the landmarks of one frame (zero groups when none are visible)."""
+        groups = landmark_groups(vision_data)
+        if not groups:
+            self.prev_layout = None
+            self.prev_values = None
+            self.seq = (self.seq + 1) & 0xFFFF
+            return HEADER.pack(MSG_LANDMARKS, 0, self.seq, 0, 0)
+
+        layout = [(kind, len(coords)) for kind, coords in groups]
+        coords = np.concatenate([c for _, c in groups])
+
+        flags = 0
+        if self.encoding == "int16":
+            flags |= FLAG_INT16
+            values = np.clip(np.rint(coords * INT16_SCALE), -32768, 32767).astype(np.int32)
+            payload, dtype = values, "<i2"
+            keyframe = (
+                not self.delta
+                or layout != self.prev_layout
+                or self.since_keyframe >= self.keyframe_interval
+            )
+            if not keyframe:
+                diff = values - self.prev_values
+                max_diff = np.abs(diff).max()
+                if max_diff <= 32767:
+                    payload = diff
+                    flags |= FLAG_DELTA
+                    if max_diff <= 127:
+                        dtype = "<i1"
+                        flags |= FLAG_INT8
+            if flags & FLAG_DELTA:
+                self.since_keyframe += 1
+            else:
+                self.since_keyframe = 0
+            self.prev_values = values
+        else:
+            payload, dtype = coords, "<f2"
+
+        # One (count, 3) block per group, padded to an even length so every
+        # group header stays 2-byte aligned for typed-array views
+        blocks = []
+        offset = 0
+        for kind, count in layout:
+            block = payload[offset:offset + count].astype(dtype).tobytes()
+            if len(block) % 2:
+                block += b"\x00"
+            blocks.append(GROUP_HEADER.pack(kind, count) + block)
+            offset += count
+
+        self.prev_layout = layout
+        self.seq = (self.seq + 1) & 0xFFFF
+
+        return HEADER.pack(MSG_LANDMARKS, flags, self.seq, len(groups), 0) + b"".join(blocks)
@@ -0,0 +1,146 @@
+"""
+Local Inference Backend for the OmniSense Orchestrator
+
+Runs the inference in worker processes on the orchestrator host
+(INFERENCE_BACKEND=local) instead of calling the three microservices over
+HTTP. Frames stay as raw bytes end to end: no multipart encoding, no loopback
+hop and no JSON re-parsing.
+
+Landmarks go through mediapipe_service's own per-session pipeline
+(landmark_pipeline.py), so "local" returns exactly what "remote" does;
+emotion and speech use the VisionAgent / AudioAgent.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# landmark_pipeline and its helpers live in the MediaPipe service (appended,
+# so backend modules keep precedence over the service's main.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "services", "mediapipe_service"))
+
+# --- Worker process side (one agent instance / session pool per process) ---
+
+_vision_agent = None
+_audio_agent = None
+
+
+def _get_vision_agent():
+    global _vision_agent
+    if _vision_agent is None:
+        from agents.vision_agent import VisionAgent
+        _vision_agent = VisionAgent()
+    return _vision_agent
+
+
+def _get_audio_agent():
+    global _audio_agent
+    if _audio_agent is None:
+        from agents.audio_agent import AudioAgent
+        _audio_agent = AudioAgent()
+    return _audio_agent
+
+
+def _warmup(kind: str) -> bool:
+    if kind == "audio":
+        _get_audio_agent()
+    elif kind == "landmarks":
+        import landmark_pipeline  # noqa: F401 (loads MediaPipe; graphs are built per session)
+    else:
+        _get_vision_agent()
+    return True
+
+
+def _init_landmark_worker(workers: int):
+    """Each vision worker keeps its share of the MediaPipe sessions warm."""
+    from landmark_pipeline import configure_worker
+    configure_worker(workers)
+
+
+def _analyze_gesture(payload: bytes, session_id: str, tasks: Optional[FrozenSet[str]]) -> Dict:
+    """Same pipeline and per-session state (tracking, gesture votes, gaze calibration) as mediapipe_service."""
+    from landmark_pipeline import ALL_TASKS, analyze_image
+    return analyze_image(payload, session_id, set(tasks) if tasks is not None else set(ALL_TASKS), False)
+
+
+def _analyze_emotion(payload: bytes) -> Dict:
+    return _get_vision_agent().analyze_emotion(payload)
+
+
+def _transcribe(payload: bytes) -> Dict:
+    return _get_audio_agent().transcribe_segment(payload)
+
+
+def _landmark_timings() -> Dict:
+    """Decode / model latency histograms of this worker's landmark pipeline."""
+    from landmark_pipeline import worker_timings
+    return worker_timings()
+
+
+def _vision_timings() -> Dict:
+    """Decode / model latency histograms of this worker's VisionAgent."""
+    return _get_vision_agent().metrics.snapshot([])["latency"]
+
+
+# --- Orchestrator side ---
+
+class LocalInferenceBackend:
+    """
+    Managed process pools for in-process inference.
+
+    MediaPipe keeps tracking state between frames, so gesture analysis uses
+    single-process executors with session affinity (a session always lands on
+    the same worker, which keeps one state per session). DeepFace and Wav2Vec2
+    are stateless and share a pool each, so a slow emotion or speech call never
+    queues behind gesture frames.
+    """
+
+    def __init__(self, vision_workers: int = 2, emotion_workers: int = 1, audio_workers: int = 1):
+        self.vision_pools: List[ProcessPoolExecutor] = [
+            ProcessPoolExecutor(max_workers=1, initializer=_init_landmark_worker, initargs=(max(1, vision_workers),))
+            for _ in range(max(1, vision_workers))
+        ]
+        self.emotion_pool = ProcessPoolExecutor(max_workers=max(1, emotion_workers))
+        self.audio_pool = ProcessPoolExecutor(max_workers=max(1, audio_workers))
+
+    def _vision_pool(self, session_id: str) -> ProcessPoolExecutor:
+        return self.vision_pools[zlib.crc32(session_id.encode()) % len(self.vision_pools)]
+
+    async def warmup(self):
+        """Load the models in every worker before accepting traffic."""
+        loop = asyncio.get_running_loop()
+        jobs = [loop.run_in_executor(pool, _warmup, "landmarks") for pool in self.vision_pools]
+        jobs.append(loop.run_in_executor(self.emotion_pool, _warmup, "vision"))
+        jobs.append(loop.run_in_executor(self.audio_pool, _warmup, "audio"))
+        await asyncio.gather(*jobs)
+        logger.info(f"Local backend ready ({len(self.vision_pools)} vision worker(s))")
+
+    async def run(self, service: str, payload: bytes, session_id: str,
+                  tasks: Optional[FrozenSet[str]] = None) -> Dict:
+        """Same contract as the HTTP services: raw bytes (and X-Tasks) in, result dict out."""
+        loop = asyncio.get_running_loop()
+        if service == "mediapipe":
+            return await loop.run_in_executor(self._vision_pool(session_id), _analyze_gesture, payload, session_id, tasks)
+        if service == "deepface":
+            return await loop.run_in_executor(self.emotion_pool, _analyze_emotion, payload)
+        if service == "audio":
+            return await loop.run_in_executor(self.audio_pool, _transcribe, payload)
+        raise ValueError(f"Unknown service: {service}")
+
+    async def timings(self) -> Dict:
+        """Per-stage latencies (decode vs models) of every vision worker and of one emotion worker."""
+        loop = asyncio.get_running_loop()
+        vision = [loop.run_in_executor(pool, _landmark_timings) for pool in self.vision_pools]
+        emotion = loop.run_in_executor(self.emotion_pool, _vision_timings)
+        *vision_timings, emotion_timings = await asyncio.gather(*vision, emotion)
+        return {"vision_workers": vision_timings, "emotion_worker": emotion_timings}
+
+    def shutdown(self):
+        for pool in [*self.vision_pools, self.emotion_pool, self.audio_pool]:
+            pool.shutdown(wait=False, cancel_futures=True)
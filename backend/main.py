@@ -6,14 +6,29 @@ Coordinates all microservices and manages WebSocket connections.
 """
 
 import os
+import re
+import json
+import time
 import asyncio
 import logging
 import warnings
-from typing import Dict
+from contextlib import asynccontextmanager
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Optional, Tuple
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
-import io
+import uuid
+import numpy as np
+
+from audio_segmenter import SpeechSegmenter
+from landmark_codec import LandmarkEncoder
+from metrics import Metrics
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from local_backend import LocalInferenceBackend
+from session_recorder import SessionRecorder
+from frame_ring import FrameRef, FrameRing, StaleFrameError
+from preprocess import LANDMARK_INPUT_SIZE, FrameDecoder
 
 warnings.filterwarnings("ignore")
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
@@ -21,7 +36,127 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("OmniSense")
 
-app = FastAPI()
+# Service URLs
+MEDIAPIPE_URL = "http://localhost:8002"
+DEEPFACE_URL = "http://localhost:8003"
+AUDIO_URL = "http://localhost:8001"
+
+# Inference backend: "remote" (HTTP microservices) or "local" (agents in a
+# process pool on this host)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "remote")
+LOCAL_VISION_WORKERS = int(os.getenv("LOCAL_VISION_WORKERS", "2"))
+LOCAL_EMOTION_WORKERS = int(os.getenv("LOCAL_EMOTION_WORKERS", "1"))
+LOCAL_AUDIO_WORKERS = int(os.getenv("LOCAL_AUDIO_WORKERS", "1"))
+
+# Frame transport to the vision services: "http" (JPEG in the request body) or
+# "shm" (decoded once into a shared-memory ring, same host only, see frame_ring.py)
+FRAME_TRANSPORT = os.getenv("FRAME_TRANSPORT", "http")
+FRAME_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", "32"))
+FRAME_RING_MAX_WIDTH = int(os.getenv("FRAME_RING_MAX_WIDTH", "1280"))
+FRAME_RING_MAX_HEIGHT = int(os.getenv("FRAME_RING_MAX_HEIGHT", "720"))
+
+# Per-service deadlines (seconds). DeepFace is much slower than MediaPipe,
+# so it gets its own budget and never holds up the gesture path.
+MEDIAPIPE_DEADLINE = float(os.getenv("MEDIAPIPE_DEADLINE", "1.0"))
+DEEPFACE_DEADLINE = float(os.getenv("DEEPFACE_DEADLINE", "3.0"))
+AUDIO_DEADLINE = float(os.getenv("AUDIO_DEADLINE", "10.0"))
+HEALTH_DEADLINE = 2.0
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "2.0"))
+
+# Circuit breakers: open after N consecutive failures, probe again after a pause
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "5.0"))
+
+# Shared HTTP pool limits for orchestrator -> service traffic
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+
+# Adaptive emotion sampling (DeepFace calls per second)
+EMOTION_BASE_HZ = float(os.getenv("EMOTION_BASE_HZ", "1.0"))
+EMOTION_BOOST_HZ = float(os.getenv("EMOTION_BOOST_HZ", "5.0"))
+EMOTION_MOTION_THRESHOLD = float(os.getenv("EMOTION_MOTION_THRESHOLD", "0.04"))
+EMOTION_BOOST_SECONDS = float(os.getenv("EMOTION_BOOST_SECONDS", "1.5"))
+
+# Speech segmentation (VAD endpointing on 30 ms frames)
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+VAD_PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "600"))
+VAD_MAX_SEGMENT_MS = int(os.getenv("VAD_MAX_SEGMENT_MS", "6000"))
+VAD_OVERLAP_MS = int(os.getenv("VAD_OVERLAP_MS", "300"))
+
+# Per-client session registry
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "300"))
+# Client-chosen session ids end up in file names (recordings, timeline spill)
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Gesture commands: "edge" (transitions only), "repeat" (re-send every
+# GESTURE_REPEAT_SECONDS while held) or "hold" (one HOLD after that delay)
+GESTURE_COMMAND_POLICY = os.getenv("GESTURE_COMMAND_POLICY", "edge")
+GESTURE_REPEAT_SECONDS = float(os.getenv("GESTURE_REPEAT_SECONDS", "1.0"))
+
+# Session recording
+MAX_TIMELINE_EVENTS = int(os.getenv("MAX_TIMELINE_EVENTS", "1000"))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "")
+
+# When set, every message a client sends to /ws is recorded here for replay
+WS_RECORD_DIR = os.getenv("WS_RECORD_DIR", "")
+
+# Frames that waited longer than this in the ingest slot are skipped
+STALE_FRAME_SECONDS = float(os.getenv("STALE_FRAME_SECONDS", "0.5"))
+
+# Analysis tasks a client can ask for (TASKS control message); the default is all of them
+VISION_TASKS = ("hands", "face", "iris", "emotion")
+MEDIAPIPE_TASKS = frozenset(("hands", "face", "iris"))
+DEFAULT_TASKS = frozenset(
+    t for t in os.getenv("DEFAULT_TASKS", ",".join(VISION_TASKS)).split(",") if t in VISION_TASKS
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one pooled HTTP client for the lifetime of the application."""
+    app.state.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(10.0, connect=2.0)
+    )
+    logger.info(f"HTTP pool ready (max={HTTP_MAX_CONNECTIONS}, keepalive={HTTP_MAX_KEEPALIVE})")
+    
+    app.state.local_backend = None
+    if INFERENCE_BACKEND == "local":
+        app.state.local_backend = LocalInferenceBackend(
+            LOCAL_VISION_WORKERS, LOCAL_EMOTION_WORKERS, LOCAL_AUDIO_WORKERS
+        )
+        await app.state.local_backend.warmup()
+    
+    app.state.frame_ring = None
+    if FRAME_TRANSPORT == "shm" and app.state.local_backend is None:
+        app.state.frame_ring = FrameRing(FRAME_RING_SLOTS, FRAME_RING_MAX_WIDTH, FRAME_RING_MAX_HEIGHT)
+        logger.info(f"Shared-memory frame ring {app.state.frame_ring.name} ({FRAME_RING_SLOTS} slots)")
+    try:
+        yield
+    finally:
+        if app.state.local_backend is not None:
+            app.state.local_backend.shutdown()
+        if app.state.frame_ring is not None:
+            app.state.frame_ring.close()
+        await app.state.http_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-stage latency histograms and counters (/metrics)
+metrics = Metrics()
+SERVICES = ["mediapipe", "deepface", "audio"]
+
+# One circuit breaker per downstream service
+breakers = {
+    name: CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+    for name in SERVICES
+}
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,76 +166,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Service URLs
-MEDIAPIPE_URL = "http://localhost:8002"
-DEEPFACE_URL = "http://localhost:8003"
-AUDIO_URL = "http://localhost:8001"
-
 class SessionManager:
-    """Manages recording of session data (emotions, gestures)."""
-    def __init__(self):
+    """
+    Manages recording of session data (emotions, gestures).
+    
+    Counts are updated as events arrive and repeated values are run-length
+    compressed in a bounded timeline, so memory stays flat over long sessions
+    and building the report does not depend on session length. The raw
+    timeline can optionally be spilled to an append-only JSONL file.
+    """
+    def __init__(self, session_id: str = "", max_timeline: int = None, spill_dir: str = None):
+        self.session_id = session_id
+        self.max_timeline = max_timeline or MAX_TIMELINE_EVENTS
+        self.spill_dir = spill_dir if spill_dir is not None else SESSION_SPILL_DIR
         self.active = False
         self.start_time = 0
-        self.emotions_log = []
-        self.gestures_log = []
-        self.events_timeline = []
+        self.emotion_counts = {}
+        self.gesture_counts = {}
+        self.events_timeline = deque(maxlen=self.max_timeline)
+        self.open_runs = {}  # event type -> current timeline entry
+        self.spill_file = None
+        self.spill_path = None
     
     def start_session(self):
         self.active = True
-        import time
         self.start_time = time.time()
-        self.emotions_log = []
-        self.gestures_log = []
-        self.events_timeline = []
+        self.emotion_counts = {}
+        self.gesture_counts = {}
+        self.events_timeline = deque(maxlen=self.max_timeline)
+        self.open_runs = {}
+        self._open_spill()
         logger.info("Session STARTED")
 
     def stop_session(self):
         if not self.active:
             return None
         self.active = False
-        import time
         duration = time.time() - self.start_time
+        self._close_spill()
         
-        # Calculate stats
-        emotion_counts = {}
-        for e in self.emotions_log:
-            emotion_counts[e] = emotion_counts.get(e, 0) + 1
-            
-        gesture_counts = {}
-        for g in self.gestures_log:
-            gesture_counts[g] = gesture_counts.get(g, 0) + 1
-            
         report = {
             "duration_seconds": round(duration, 2),
-            "emotion_stats": emotion_counts,
-            "gesture_stats": gesture_counts,
-            "timeline": self.events_timeline
+            "emotion_stats": dict(self.emotion_counts),
+            "gesture_stats": dict(self.gesture_counts),
+            "timeline": list(self.events_timeline)
         }
+        if self.spill_path:
+            report["raw_timeline_path"] = self.spill_path
         logger.info(f"Session STOPPED. Report: {report}")
         return report
 
     def log_emotion(self, emotion):
         if self.active:
-            self.emotions_log.append(emotion)
+            self.emotion_counts[emotion] = self.emotion_counts.get(emotion, 0) + 1
+            self._record("EMOTION", emotion)
             
     def log_gesture(self, gesture):
         if self.active:
-            self.gestures_log.append(gesture)
-            import time
-            self.events_timeline.append({
-                "time": round(time.time() - self.start_time, 2),
-                "type": "GESTURE",
-                "value": gesture
-            })
-
-session_manager = SessionManager()
+            self.gesture_counts[gesture] = self.gesture_counts.get(gesture, 0) + 1
+            self._record("GESTURE", gesture)
+    
+    def _record(self, event_type: str, value: str):
+        """Extend the current run for this event type, or start a new one."""
+        t = round(time.time() - self.start_time, 2)
+        run = self.open_runs.get(event_type)
+        if run is not None and run["value"] == value:
+            run["end"] = t
+            run["count"] += 1
+        else:
+            run = {"time": t, "end": t, "type": event_type, "value": value, "count": 1}
+            self.open_runs[event_type] = run
+            self.events_timeline.append(run)
+        
+        if self.spill_file is not None:
+            self.spill_file.write(json.dumps({"time": t, "type": event_type, "value": value}) + "\n")
+    
+    def close(self):
+        """Release the spill file when the session is discarded."""
+        self.active = False
+        self._close_spill()
+    
+    def _open_spill(self):
+        self._close_spill()
+        if not self.spill_dir:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            name = f"session_{self.session_id or 'anon'}_{int(self.start_time)}.jsonl"
+            self.spill_path = os.path.join(self.spill_dir, name)
+            self.spill_file = open(self.spill_path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Timeline spill disabled: {e}")
+            self.spill_file = None
+            self.spill_path = None
+    
+    def _close_spill(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
 
 class FusionEngine:
     """Synthesizes multimodal inputs."""
     
-    def __init__(self):
+    def __init__(self, session_manager: SessionManager):
+        self.session_manager = session_manager
         self.last_emotion = "neutral"
         self.gaze_history = []
+        
+        # Gesture command policy (edge-triggered by default)
+        self.command_policy = GESTURE_COMMAND_POLICY
+        self.command_interval = GESTURE_REPEAT_SECONDS
+        self.active_gesture = None
+        self.gesture_since = 0.0
+        self.last_command_at = 0.0
+        self.hold_sent = False
+        
+        self.reset_connection()
+    
+    def reset_connection(self):
+        """Per-connection stream settings; clients opt in again after reconnecting."""
+        # Set when the client opts in to binary landmarks (LANDMARK_FORMAT)
+        self.landmark_encoder: Optional[LandmarkEncoder] = None
+        # Landmark side channel (LANDMARK_STREAM), 0 = off
+        self.landmark_fps = 0.0
+        self.last_landmarks_at = 0.0
+        self.landmarks_visible = False
+        self.sent_connections = set()
+        # Gaze side channel (GAZE_STREAM), 0 = off
+        self.gaze_fps = 0.0
+        self.last_gaze_at = 0.0
+        # Models to run for this connection (TASKS)
+        self.tasks = DEFAULT_TASKS
+    
+    def _command_phase(self, gesture: str, now: float) -> Optional[str]:
+        """START on a gesture transition, then REPEAT/HOLD according to the policy."""
+        if gesture != self.active_gesture:
+            self.active_gesture = gesture
+            self.gesture_since = now
+            self.last_command_at = now
+            self.hold_sent = False
+            return "START"
+        if self.command_policy == "repeat" and now - self.last_command_at >= self.command_interval:
+            self.last_command_at = now
+            return "REPEAT"
+        if self.command_policy == "hold" and not self.hold_sent and now - self.gesture_since >= self.command_interval:
+            self.hold_sent = True
+            return "HOLD"
+        return None
     
     async def process_vision(self, vision_data: Dict, websocket: WebSocket):
         """Process vision results and generate UI feedback."""
@@ -110,7 +322,7 @@ class FusionEngine:
                 emotion = vision_data["emotion"]
                 
                 # Log to session
-                session_manager.log_emotion(emotion)
+                self.session_manager.log_emotion(emotion)
                 
                 if emotion != self.last_emotion:
                     self.last_emotion = emotion
@@ -123,7 +335,7 @@ class FusionEngine:
                     elif emotion in ["happy", "surprise"]:
                         ui_mode = "DYNAMIC"
                     
-                    await websocket.send_json({
+                    await self._send_json(websocket, {
                         "type": "UI_ADAPTATION",
                         "mode": ui_mode,
                         "emotion": emotion,
@@ -139,7 +351,7 @@ class FusionEngine:
                 
                 # Log to session
                 if gesture != "UNKNOWN":
-                    session_manager.log_gesture(gesture)
+                    self.session_manager.log_gesture(gesture)
 
                 if gesture == "FIST":
                     command = "SELECT_ITEM"
@@ -155,39 +367,112 @@ class FusionEngine:
                     command = "CONFIRM"
                 elif gesture == "TCHAO":
                     command = "GOODBYE"
+                elif gesture == "SWIPE_LEFT":
+                    command = "PREVIOUS_ITEM"
+                elif gesture == "SWIPE_RIGHT":
+                    command = "NEXT_ITEM"
+                elif gesture == "SWIPE_UP":
+                    command = "SCROLL_UP"
+                elif gesture == "SWIPE_DOWN":
+                    command = "SCROLL_DOWN"
+                elif gesture == "CIRCLE":
+                    command = "RESET_VIEW"
                 
-                if command:
-                    # Send gesture command with landmarks data
-                    await websocket.send_json({
+                phase = self._command_phase(gesture, time.monotonic())
+                if command and phase:
+                    # Landmarks travel on the LANDMARK_STREAM side channel
+                    await self._send_json(websocket, {
                         "type": "UI_COMMAND",
                         "source": "GESTURE",
                         "command": command,
                         "gesture": gesture,
-                        # Include landmarks for visualization
-                        "hand_landmarks": vision_data.get("hand_landmarks"),
-                        "face_landmarks": vision_data.get("face_landmarks"),
-                        "hand_connections": vision_data.get("hand_connections"),
-                        "face_connections": vision_data.get("face_connections")
+                        "phase": phase,
+                        # Sequence number of the video frame that triggered it
+                        "frame": vision_data.get("frame_seq")
                     })
             
             # Gaze alerts
             if "gaze" in vision_data:
-                deviation = vision_data["gaze"].get("deviation", 0)
-                self.gaze_history.append(deviation)
+                # Iris points are unreliable while blinking: keep those frames out
+                if not vision_data["gaze"].get("blink"):
+                    self.gaze_history.append(vision_data["gaze"].get("deviation", 0))
                 
                 if len(self.gaze_history) > 30:
                     self.gaze_history.pop(0)
                 
-                avg_deviation = sum(self.gaze_history) / len(self.gaze_history)
+                avg_deviation = sum(self.gaze_history) / len(self.gaze_history) if self.gaze_history else 0
                 
                 if avg_deviation > 15:  # Threshold
-                    await websocket.send_json({
+                    await self._send_json(websocket, {
                         "type": "GAZE_ALERT"
                     })
+                
+                await self.stream_gaze(vision_data["gaze"], websocket)
+            
+            await self.stream_landmarks(vision_data, websocket)
         
         except Exception as e:
             logger.error(f"Fusion error: {e}")
     
+    async def stream_landmarks(self, vision_data: Dict, websocket: WebSocket):
+        """Landmark side channel, rate-limited to the fps the client asked for."""
+        # Only MediaPipe results carry landmarks (DeepFace results come through here too)
+        if self.landmark_fps <= 0 or not vision_data.get("mediapipe"):
+            return
+        
+        visible = bool(vision_data.get("hand_landmarks") or vision_data.get("face_landmarks"))
+        if not visible and not self.landmarks_visible:
+            return
+        
+        now = time.monotonic()
+        # Always let the "landmarks gone" message through so the overlay clears
+        if visible and now - self.last_landmarks_at < 1.0 / self.landmark_fps:
+            return
+        self.last_landmarks_at = now
+        self.landmarks_visible = visible
+        
+        if self.landmark_encoder is not None:
+            await self.send_landmarks(vision_data, websocket)
+            return
+        
+        message = {
+            "type": "LANDMARKS",
+            "gesture": vision_data.get("gesture"),
+            "hand_landmarks": vision_data.get("hand_landmarks") or [],
+            "face_landmarks": vision_data.get("face_landmarks") or []
+        }
+        # Topology is static: send it once per connection
+        for key in ("hand_connections", "face_connections"):
+            if vision_data.get(key) and key not in self.sent_connections:
+                message[key] = vision_data[key]
+                self.sent_connections.add(key)
+        await self._send_json(websocket, message)
+    
+    async def stream_gaze(self, gaze: Dict, websocket: WebSocket):
+        """Gaze side channel (a few numbers per frame), rate-limited like the landmarks."""
+        if self.gaze_fps <= 0 or not gaze:
+            return
+        now = time.monotonic()
+        if now - self.last_gaze_at < 1.0 / self.gaze_fps:
+            return
+        self.last_gaze_at = now
+        await self._send_json(websocket, {"type": "GAZE_DATA", **gaze})
+    
+    async def send_landmarks(self, vision_data: Dict, websocket: WebSocket):
+        """Send binary landmarks, preceded by the topology the first time."""
+        topology = self.landmark_encoder.topology_message(vision_data)
+        if topology:
+            await self._send_bytes(websocket, topology)
+        await self._send_bytes(websocket, self.landmark_encoder.encode(vision_data))
+    
+    async def _send_json(self, websocket: WebSocket, message: Dict):
+        with metrics.timer("send"):
+            await websocket.send_json(message)
+    
+    async def _send_bytes(self, websocket: WebSocket, data: bytes):
+        with metrics.timer("send"):
+            await websocket.send_bytes(data)
+    
     async def process_audio(self, audio_data: Dict, websocket: WebSocket):
         """Process audio results."""
         try:
@@ -199,7 +484,7 @@ class FusionEngine:
                 # Context Check (mock)
                 logger.info(f"Step 8: Decision Engine | Validating {intent} on {entity}...")
                 
-                await websocket.send_json({
+                await self._send_json(websocket, {
                     "type": "UI_COMMAND",
                     "source": "VOICE",
                     "command": intent,
@@ -209,57 +494,492 @@ class FusionEngine:
         except Exception as e:
             logger.error(f"Audio fusion error: {e}")
 
-fusion = FusionEngine()
+class ClientSession:
+    """Per-client state: one SessionManager/FusionEngine pair."""
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.session_manager = SessionManager(session_id)
+        self.fusion = FusionEngine(self.session_manager)
+        self.connections = 0
+        self.last_seen = time.monotonic()
+
+class SessionRegistry:
+    """
+    Owns the ClientSession of every connected client, keyed by session id.
+    
+    Sessions without an open connection are evicted after SESSION_IDLE_SECONDS,
+    and the registry never holds more than MAX_SESSIONS entries.
+    """
+    
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions: "OrderedDict[str, ClientSession]" = OrderedDict()
+    
+    def acquire(self, session_id: str) -> Optional[ClientSession]:
+        """Get or create the session for a new connection. None if full."""
+        self.evict_idle()
+        
+        client = self.sessions.get(session_id)
+        if client is None:
+            if len(self.sessions) >= self.max_sessions and not self._evict_oldest_idle():
+                return None
+            client = ClientSession(session_id)
+            self.sessions[session_id] = client
+        
+        self.sessions.move_to_end(session_id)
+        client.connections += 1
+        client.last_seen = time.monotonic()
+        return client
+    
+    def release(self, client: ClientSession):
+        client.connections -= 1
+        client.last_seen = time.monotonic()
+        self.evict_idle()
+    
+    def evict_idle(self):
+        now = time.monotonic()
+        expired = [
+            sid for sid, client in self.sessions.items()
+            if client.connections <= 0 and now - client.last_seen > self.idle_seconds
+        ]
+        for sid in expired:
+            self.sessions.pop(sid).session_manager.close()
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle session(s)")
+    
+    def _evict_oldest_idle(self) -> bool:
+        # Sessions are kept in LRU order
+        for sid, client in self.sessions.items():
+            if client.connections <= 0:
+                self.sessions.pop(sid).session_manager.close()
+                return True
+        return False
+    
+    def __len__(self):
+        return len(self.sessions)
+
+registry = SessionRegistry()
+
+def safe_session_id(requested: Optional[str]) -> str:
+    """The client's ?session_id= if it is a safe id, else a new random one."""
+    if requested and SESSION_ID_PATTERN.fullmatch(requested):
+        return requested
+    if requested:
+        logger.warning("Invalid session_id from client, using a new session")
+    return uuid.uuid4().hex
+
+def raw_headers(session_id: str, tasks: Optional[FrozenSet[str]] = None) -> Dict[str, str]:
+    """Headers for the raw octet-stream protocol spoken with the services."""
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-Session-Id": session_id
+    }
+    if tasks is not None:
+        headers["X-Tasks"] = ",".join(sorted(tasks))
+    return headers
+
+class ServiceError(Exception):
+    """A service answered, but with an error body instead of a result."""
+
+async def call_service(http_client: httpx.AsyncClient, service: str, url: str, payload: bytes,
+                       session_id: str, deadline: float, tasks: Optional[FrozenSet[str]] = None,
+                       frame_ref: Optional[FrameRef] = None) -> Dict:
+    """
+    Run a service on a raw payload through its circuit breaker: a POST to the
+    microservice, or the in-process agents when INFERENCE_BACKEND=local.
+    `tasks` (sent as X-Tasks) lets the service skip the models nobody asked for.
+    With `frame_ref` the decoded frame is in the shared-memory ring and only
+    the reference is sent.
+    Raises CircuitOpenError without calling the service while the circuit is
+    open, ServiceError (counted as a failure) for an {"error": ...} body, and
+    StaleFrameError (no verdict) when the ring frame was overwritten first.
+    """
+    breaker = breakers[service]
+    if not breaker.allow():
+        metrics.incr(f"{service}.short_circuited")
+        raise CircuitOpenError(service)
+    
+    try:
+        with metrics.track(service):
+            local_backend = app.state.local_backend
+            if local_backend is not None:
+                result = await asyncio.wait_for(
+                    local_backend.run(service, payload, session_id, tasks),
+                    timeout=deadline
+                )
+            else:
+                headers = raw_headers(session_id, tasks)
+                if frame_ref is not None:
+                    headers.update(frame_ref.headers())
+                    payload = b""
+                response = await asyncio.wait_for(
+                    http_client.post(
+                        url,
+                        content=payload,
+                        headers=headers,
+                        timeout=deadline
+                    ),
+                    timeout=deadline
+                )
+                response.raise_for_status()
+                result = response.json()
+            # The services report model errors as a 200 with an error body
+            if "error" in result and not result.get("stale"):
+                raise ServiceError(f"{service}: {result['error']}")
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    
+    if result.get("stale"):
+        # The frame lost its ring slot: says nothing about the service
+        breaker.release()
+        metrics.incr(f"{service}.stale_frames")
+        raise StaleFrameError(result["error"])
+    breaker.record_success()
+    return result
+
+async def analyze_gesture(http_client: httpx.AsyncClient, payload: bytes, session_id: str,
+                          tasks: FrozenSet[str], frame_ref: Optional[FrameRef] = None) -> Dict:
+    """Run MediaPipe on a frame within its deadline (`tasks` as sent in X-Tasks)."""
+    return await call_service(
+        http_client, "mediapipe", f"{MEDIAPIPE_URL}/analyze", payload, session_id, MEDIAPIPE_DEADLINE,
+        tasks, frame_ref
+    )
+
+# Ring frames serve both MediaPipe and DeepFace: decoded (BGR) at the larger of their input sizes
+ring_decoder = FrameDecoder(LANDMARK_INPUT_SIZE)
+
+async def share_frame(ring: FrameRing, payload: bytes, users: int) -> Optional[FrameRef]:
+    """
+    Decode a JPEG once (off the event loop) into the shared-memory ring for
+    `users` service calls. None means the calls fall back to the JPEG body.
+    """
+    with metrics.timer("decode"):
+        img = await asyncio.to_thread(ring_decoder.decode, payload)
+    if img is None:
+        return None
+    frame_ref = ring.write(img, users)
+    if frame_ref is None:
+        metrics.incr("frame_ring.fallbacks")
+    return frame_ref
+
+class EmotionScheduler:
+    """
+    Decides which frames go to DeepFace for one session.
+    
+    Emotion changes on a scale of seconds, so DeepFace runs at a base rate and
+    the last result is reused in between. Large expression motion in the
+    MediaPipe face landmarks temporarily raises the rate.
+    """
+    
+    # Mouth corners, lips, brows and eyelids
+    EXPRESSION_LANDMARKS = [61, 291, 13, 14, 70, 105, 107, 336, 334, 300, 159, 145, 386, 374]
+    # Outer eye corners, used to normalize for face size
+    EYE_CORNERS = (33, 263)
+    
+    def __init__(self):
+        self.base_interval = 1.0 / EMOTION_BASE_HZ
+        self.boost_interval = 1.0 / EMOTION_BOOST_HZ
+        self.last_dispatch = 0.0
+        self.boost_until = 0.0
+        self.prev_shape: Optional[np.ndarray] = None
+        self.last_result: Dict = {}
+        
+        # Counters
+        self.dispatched = 0
+        self.reused = 0
+    
+    def due(self, now: float) -> bool:
+        """True if this frame should be sent to DeepFace."""
+        interval = self.boost_interval if now < self.boost_until else self.base_interval
+        return now - self.last_dispatch >= interval
+    
+    def mark_dispatched(self, now: float):
+        self.last_dispatch = now
+        self.dispatched += 1
+    
+    def observe_landmarks(self, face_landmarks, now: float):
+        """Raise the sampling rate when the expression moves a lot."""
+        if not face_landmarks:
+            self.prev_shape = None
+            return
+        
+        points = face_landmarks[0]
+        try:
+            shape = np.array(
+                [[points[i]["x"], points[i]["y"]] for i in self.EXPRESSION_LANDMARKS],
+                dtype=np.float32
+            )
+            left, right = points[self.EYE_CORNERS[0]], points[self.EYE_CORNERS[1]]
+        except (IndexError, KeyError, TypeError):
+            return
+        
+        # Remove head translation and scale so only expression changes remain
+        eye_distance = np.hypot(left["x"] - right["x"], left["y"] - right["y"]) + 1e-6
+        shape = (shape - shape.mean(axis=0)) / eye_distance
+        
+        if self.prev_shape is not None:
+            motion = float(np.mean(np.linalg.norm(shape - self.prev_shape, axis=1)))
+            if motion > EMOTION_MOTION_THRESHOLD:
+                self.boost_until = now + EMOTION_BOOST_SECONDS
+        self.prev_shape = shape
+    
+    def stats(self) -> Dict:
+        return {"dispatched": self.dispatched, "reused": self.reused}
+
+async def analyze_emotion(http_client: httpx.AsyncClient, payload: bytes, session_id: str,
+                          scheduler: EmotionScheduler, fusion: FusionEngine, websocket: WebSocket,
+                          frame_ref: Optional[FrameRef] = None):
+    """Run DeepFace on a frame and merge the emotion into fusion when it lands."""
+    try:
+        df_result = await call_service(
+            http_client, "deepface", f"{DEEPFACE_URL}/analyze", payload, session_id, DEEPFACE_DEADLINE,
+            frame_ref=frame_ref
+        )
+        
+        if "emotion" in df_result:
+            scheduler.last_result = {
+                key: df_result[key] for key in ("emotion", "confidence", "all_emotions") if key in df_result
+            }
+        await fusion.process_vision(df_result, websocket)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # Optional - never break the gesture flow. Error answers and lost ring
+        # frames land here too, so the last emotion stays in place
+        pass
+
+class LatestFrameSlot:
+    """
+    Single-slot ingest buffer for one connection.
+    
+    The receive loop overwrites the slot with every new frame, so the
+    analysis task always picks up the newest one and older frames are dropped.
+    """
+    
+    def __init__(self):
+        self.frame: Optional[bytes] = None
+        self.received_at = 0.0
+        self.seq = 0
+        self.event = asyncio.Event()
+        
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.stale = 0
+    
+    def put(self, frame: bytes):
+        metrics.incr("frames.received")
+        if self.frame is not None:
+            self.dropped += 1
+            metrics.incr("frames.dropped")
+        self.frame = frame
+        self.received_at = time.monotonic()
+        self.received += 1
+        self.seq = self.received
+        self.event.set()
+    
+    async def get(self) -> Tuple[bytes, float, int]:
+        """Wait for the newest frame: (frame, received_at, sequence number)."""
+        while self.frame is None:
+            self.event.clear()
+            await self.event.wait()
+        frame, received_at, seq = self.frame, self.received_at, self.seq
+        self.frame = None
+        return frame, received_at, seq
+    
+    def stats(self) -> Dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "stale": self.stale
+        }
+
+async def vision_worker(slot: LatestFrameSlot, http_client: httpx.AsyncClient, session_id: str,
+                        scheduler: EmotionScheduler, fusion: FusionEngine, websocket: WebSocket):
+    """Background analysis loop: always works on the newest frame in the slot."""
+    emotion_task = None
+    try:
+        while True:
+            payload, received_at, seq = await slot.get()
+            
+            waited = time.monotonic() - received_at
+            metrics.observe("frame_queue", waited)
+            if waited > STALE_FRAME_SECONDS:
+                slot.stale += 1
+                metrics.incr("frames.stale")
+                continue
+            
+            # Only the services the client asked for (TASKS) are called
+            tasks = fusion.tasks
+            
+            # Dispatch DeepFace first so it runs alongside MediaPipe, but only
+            # when the scheduler says so. One emotion request in flight at most.
+            now = time.monotonic()
+            run_emotion = (
+                "emotion" in tasks
+                and (emotion_task is None or emotion_task.done())
+                and scheduler.due(now)
+            )
+            # The scheduler watches the face mesh for expression motion, so
+            # "emotion" runs it even when the client does not want it back
+            mediapipe_tasks = tasks & MEDIAPIPE_TASKS
+            if "emotion" in tasks:
+                mediapipe_tasks |= {"face"}
+            run_mediapipe = bool(mediapipe_tasks)
+            
+            # Co-located services read the decoded frame from shared memory
+            frame_ref = None
+            ring = app.state.frame_ring
+            if ring is not None and (run_emotion or run_mediapipe):
+                frame_ref = await share_frame(ring, payload, int(run_emotion) + int(run_mediapipe))
+            
+            if run_emotion:
+                scheduler.mark_dispatched(now)
+                emotion_task = asyncio.create_task(
+                    analyze_emotion(http_client, payload, session_id, scheduler, fusion, websocket, frame_ref)
+                )
+                if frame_ref is not None:
+                    # Also runs if the task is cancelled before it starts
+                    emotion_task.add_done_callback(lambda _, ref=frame_ref: ring.release(ref))
+            elif "emotion" in tasks:
+                scheduler.reused += 1
+            
+            if not run_mediapipe:
+                slot.processed += 1
+                metrics.incr("frames.processed")
+                continue
+            
+            # Gesture results go to fusion as soon as MediaPipe answers
+            try:
+                mp_result = await analyze_gesture(http_client, payload, session_id, mediapipe_tasks, frame_ref)
+                # No hand means the held gesture (if any) has been released
+                if "hands" in tasks:
+                    mp_result.setdefault("gesture", "UNKNOWN")
+                mp_result["mediapipe"] = True
+                mp_result["frame_seq"] = seq
+                if mp_result.get("reused"):
+                    # Near-static frame, answered by the service's motion gate
+                    metrics.incr("mediapipe.reused")
+                scheduler.observe_landmarks(mp_result.get("face_landmarks"), time.monotonic())
+                if "face" not in tasks:
+                    # Only fetched for the scheduler
+                    mp_result.pop("face_landmarks", None)
+                    mp_result.pop("face_connections", None)
+                
+                # Reuse the last emotion between DeepFace samples
+                if not run_emotion and "emotion" in tasks:
+                    mp_result = {**scheduler.last_result, **mp_result}
+                with metrics.timer("fusion"):
+                    await fusion.process_vision(mp_result, websocket)
+            except CircuitOpenError:
+                # MediaPipe is down: fail fast instead of waiting on its deadline
+                pass
+            except StaleFrameError:
+                # Ring slot reused before MediaPipe read it: no result for this frame
+                pass
+            except ServiceError as e:
+                # Never hand an error answer to fusion (a missing gesture releases the held one)
+                logger.warning(f"Vision error: {e}")
+            except asyncio.TimeoutError:
+                logger.warning("MediaPipe deadline exceeded, frame skipped")
+            except Exception as e:
+                logger.error(f"Vision error: {e}")
+            finally:
+                if frame_ref is not None:
+                    ring.release(frame_ref)
+            
+            slot.processed += 1
+            metrics.incr("frames.processed")
+    finally:
+        if emotion_task is not None:
+            emotion_task.cancel()
+
+async def transcribe_buffer(http_client: httpx.AsyncClient, audio: bytes, session_id: str,
+                            fusion: FusionEngine, websocket: WebSocket):
+    """Send an accumulated audio buffer to the audio service."""
+    try:
+        logger.info(f"Processing speech segment: {len(audio)} bytes ({len(audio) / 32000:.2f}s)")
+        audio_result = await call_service(
+            http_client, "audio", f"{AUDIO_URL}/transcribe", audio, session_id, AUDIO_DEADLINE
+        )
+        
+        await fusion.process_audio(audio_result, websocket)
+    except asyncio.CancelledError:
+        raise
+    except CircuitOpenError:
+        logger.warning("Audio service circuit open, speech segment skipped")
+    except Exception as e:
+        logger.error(f"Audio error: {e}")
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    logger.info("Client connected")
     
-    http_client = httpx.AsyncClient(timeout=10.0)
-    audio_buffer = bytearray()
-    BUFFER_THRESHOLD = 48000  # ~1.5 seconds of audio (16kHz * 2 bytes * 1.5)
+    # Clients may pass ?session_id= to resume their state after a reconnect
+    session_id = safe_session_id(websocket.query_params.get("session_id"))
+    client = registry.acquire(session_id)
+    if client is None:
+        logger.warning("Session registry full, rejecting client")
+        await websocket.close(code=1013)
+        return
+    fusion = client.fusion
+    session_manager = client.session_manager
+    # Landmark streaming is opted in per connection
+    fusion.reset_connection()
+    logger.info(f"Client connected ({session_id}, {len(registry)} sessions)")
+    
+    http_client = websocket.app.state.http_client
+    segmenter = SpeechSegmenter(
+        aggressiveness=VAD_AGGRESSIVENESS,
+        pre_roll_ms=VAD_PRE_ROLL_MS,
+        silence_ms=VAD_SILENCE_MS,
+        max_segment_ms=VAD_MAX_SEGMENT_MS,
+        overlap_ms=VAD_OVERLAP_MS
+    )
+    audio_tasks = set()
+    
+    recorder = None
+    
+    # Decouple receiving from analysis
+    frame_slot = LatestFrameSlot()
+    emotion_scheduler = EmotionScheduler()
+    worker = asyncio.create_task(
+        vision_worker(frame_slot, http_client, session_id, emotion_scheduler, fusion, websocket)
+    )
     
     try:
+        # Inside the try: the session must be released whatever happens from here
+        if WS_RECORD_DIR:
+            try:
+                os.makedirs(WS_RECORD_DIR, exist_ok=True)
+                recorder = SessionRecorder(os.path.join(WS_RECORD_DIR, f"{session_id}_{int(time.time())}.omnirec"))
+            except OSError as e:
+                logger.error(f"WebSocket recording disabled: {e}")
+        
         while True:
             data = await websocket.receive_bytes()
+            received_at = time.perf_counter()
+            if recorder is not None:
+                recorder.write(data)
             
             data_type = data[0]
             payload = data[1:]
             
             if data_type == 0:  # Video
-                # Call MediaPipe
-                try:
-                    mp_response = await http_client.post(
-                        f"{MEDIAPIPE_URL}/analyze",
-                        files={"file": ("frame.jpg", io.BytesIO(payload), "image/jpeg")}
-                    )
-                    mp_result = mp_response.json()
-                    
-                    # Call DeepFace (Optional - Don't block Gesture Lab if this fails)
-                    df_result = {}
-                    try:
-                        df_response = await http_client.post(
-                            f"{DEEPFACE_URL}/analyze",
-                            files={"file": ("frame.jpg", io.BytesIO(payload), "image/jpeg")}
-                        )
-                        if df_response.status_code == 200:
-                            df_result = df_response.json()
-                    except Exception as df_error:
-                        # Log but continue (don't break gesture flow)
-                        # logger.warning(f"DeepFace skipped: {df_error}")
-                        pass
-                    
-                    combined = {**mp_result, **df_result}
-                    await fusion.process_vision(combined, websocket)
-                    
-                except Exception as e:
-                    logger.error(f"Vision error: {e}")
+                # Latest frame wins - analysis happens in vision_worker
+                frame_slot.put(payload)
             
             elif data_type == 2: # JSON Control Message
                 # Handle control messages like START/STOP SESSION
                 try:
-                    import json
                     message = json.loads(payload.decode('utf-8'))
                     if message.get("type") == "SESSION_CONTROL":
                         action = message.get("action")
@@ -272,57 +992,106 @@ async def websocket_endpoint(websocket: WebSocket):
                                     "type": "SESSION_REPORT",
                                     "report": report
                                 })
+                    elif message.get("type") == "LANDMARK_FORMAT":
+                        if message.get("format") == "binary":
+                            fusion.landmark_encoder = LandmarkEncoder(
+                                encoding=message.get("encoding", "int16"),
+                                delta=bool(message.get("delta", False))
+                            )
+                        else:
+                            fusion.landmark_encoder = None
+                    elif message.get("type") == "LANDMARK_STREAM":
+                        fusion.landmark_fps = max(0.0, float(message.get("fps", 0)))
+                    elif message.get("type") == "GAZE_STREAM":
+                        fusion.gaze_fps = max(0.0, float(message.get("fps", 0)))
+                    elif message.get("type") == "COMMAND_POLICY":
+                        if message.get("policy") in ("edge", "repeat", "hold"):
+                            fusion.command_policy = message["policy"]
+                        if "interval" in message:
+                            fusion.command_interval = max(0.0, float(message["interval"]))
+                    elif message.get("type") == "TASKS":
+                        fusion.tasks = frozenset(t for t in message.get("tasks", []) if t in VISION_TASKS)
                 except Exception as e:
                     logger.error(f"Control message error: {e}")
 
             elif data_type == 1:  # Audio
-                # Buffer audio
-                audio_buffer.extend(payload)
-                
-                if len(audio_buffer) >= BUFFER_THRESHOLD:
-                    try:
-                        # Send accumulated buffer
-                        logger.info(f"Probcessing audio buffer: {len(audio_buffer)} bytes")
-                        audio_response = await http_client.post(
-                            f"{AUDIO_URL}/transcribe",
-                            files={"file": ("audio.pcm", io.BytesIO(audio_buffer), "application/octet-stream")}
-                        )
-                        audio_result = audio_response.json()
-                        
-                        await fusion.process_audio(audio_result, websocket)
-                        
-                        # Clear buffer (sliding window could be better but clear is safer for commands)
-                        audio_buffer.clear()
-                        
-                    except Exception as e:
-                        logger.error(f"Audio error: {e}")
-                        # Keep buffer or clear? Clear to avoid stuck bad state
-                        audio_buffer.clear()
+                # Only completed speech segments are sent for transcription,
+                # in the background so receiving never waits on it.
+                for segment in segmenter.feed(payload):
+                    audio_task = asyncio.create_task(
+                        transcribe_buffer(http_client, segment, session_id, fusion, websocket)
+                    )
+                    audio_tasks.add(audio_task)
+                    audio_task.add_done_callback(audio_tasks.discard)
+            
+            metrics.observe("ws_receive", time.perf_counter() - received_at)
     
     except WebSocketDisconnect:
         logger.info("Client disconnected")
     finally:
-        await http_client.aclose()
+        worker.cancel()
+        for task in audio_tasks:
+            task.cancel()
+        # Released before awaiting anything: a cancelled handler (server
+        # shutdown) must not leave the session marked as connected
+        registry.release(client)
+        if recorder is not None:
+            recorder.close()
+            logger.info(f"Recorded {recorder.count} messages to {recorder.path}")
+        # The socket is gone, so a transcript of the open segment could not be delivered
+        unsent = segmenter.flush()
+        if unsent:
+            logger.info(f"Discarded open speech segment on disconnect ({len(unsent) / 32000:.2f}s)")
+        await asyncio.gather(worker, *audio_tasks, return_exceptions=True)
+        logger.info(f"Frame stats: {frame_slot.stats()} | Emotion sampling: {emotion_scheduler.stats()}")
+
+# Last /health result, reused for HEALTH_CACHE_TTL seconds
+health_cache = {"at": 0.0, "status": None}
+health_lock = asyncio.Lock()
+
+async def probe_service(client: httpx.AsyncClient, url: str) -> Dict:
+    try:
+        response = await client.get(f"{url}/health", timeout=HEALTH_DEADLINE)
+        return response.json()
+    except Exception:
+        return {"status": "offline"}
 
 @app.get("/health")
 async def health():
-    """Health check for all services."""
-    async with httpx.AsyncClient() as client:
-        services = {
-            "mediapipe": MEDIAPIPE_URL,
-            "deepface": DEEPFACE_URL,
-            "audio": AUDIO_URL
-        }
-        
-        status = {}
-        for name, url in services.items():
-            try:
-                response = await client.get(f"{url}/health", timeout=2.0)
-                status[name] = response.json()
-            except:
-                status[name] = {"status": "offline"}
-        
-        return {"orchestrator": "healthy", "services": status}
+    """Health check for all services (probed concurrently, cached briefly)."""
+    async with health_lock:
+        if health_cache["status"] is None or time.monotonic() - health_cache["at"] > HEALTH_CACHE_TTL:
+            client = app.state.http_client
+            services = {
+                "mediapipe": MEDIAPIPE_URL,
+                "deepface": DEEPFACE_URL,
+                "audio": AUDIO_URL
+            }
+            
+            if app.state.local_backend is not None:
+                results = [{"status": "local"}] * len(services)
+            else:
+                results = await asyncio.gather(*(probe_service(client, url) for url in services.values()))
+            health_cache["status"] = dict(zip(services.keys(), results))
+            health_cache["at"] = time.monotonic()
+    
+    return {
+        "orchestrator": "healthy",
+        "backend": INFERENCE_BACKEND,
+        "sessions": len(registry),
+        "services": health_cache["status"],
+        "circuits": {name: breaker.snapshot() for name, breaker in breakers.items()}
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage latency histograms, frame counters and service error rates."""
+    snapshot = {"sessions": len(registry), **metrics.snapshot(SERVICES)}
+    if app.state.frame_ring is not None:
+        snapshot["frame_ring"] = app.state.frame_ring.stats()
+    if app.state.local_backend is not None:
+        snapshot["local_backend"] = await app.state.local_backend.timings()
+    return snapshot
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,119 @@
+"""
+Pipeline Metrics for the OmniSense Orchestrator
+
+In-process latency histograms and counters, exposed by the /metrics endpoint.
+"""
+
+import asyncio
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +inf)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate quantiles."""
+
+    def __init__(self, buckets_ms: List[float] = BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": {
+                **{f"le_{b}": c for b, c in zip(self.buckets_ms, self.counts)},
+                "le_inf": self.counts[-1]
+            }
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms plus named counters."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def incr(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time a block into the stage histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def track(self, service: str):
+        """Time a service round-trip and count its requests, errors and timeouts."""
+        start = time.perf_counter()
+        self.incr(f"{service}.requests")
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.incr(f"{service}.timeouts")
+            raise
+        except Exception:
+            self.incr(f"{service}.errors")
+            raise
+        finally:
+            self.observe(service, time.perf_counter() - start)
+
+    def error_rates(self, services: List[str]) -> Dict:
+        rates = {}
+        for service in services:
+            requests = self.counters.get(f"{service}.requests", 0)
+            failures = self.counters.get(f"{service}.errors", 0) + self.counters.get(f"{service}.timeouts", 0)
+            rates[service] = round(failures / requests, 4) if requests else 0.0
+        return rates
+
+    def snapshot(self, services: List[str]) -> Dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "latency": {stage: h.snapshot() for stage, h in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "error_rates": self.error_rates(services)
+        }
@@ -0,0 +1,118 @@
+"""
+Motion Gate for the inference services
+
+A seated user is still most of the time, and consecutive frames then give the
+same landmarks, gesture and emotion. Each session keeps a tiny grayscale
+thumbnail of the last frame that went through the models; a new frame that
+stays close to it reuses the previous result (marked "reused": true) instead
+of running inference.
+
+Frames are compared block by block and the most changed block decides: a hand
+entering or closing covers a few percent of the frame, which a whole-frame
+mean dilutes below camera noise, while it moves one block's mean a lot.
+
+The reference is the last *inferred* frame, not the previous one, so a slow
+drift still adds up and reopens the gate. Inference is also forced once the
+reused result is `refresh_ms` old, whatever the service's frame rate.
+"""
+
+from collections import OrderedDict
+import time
+from typing import Dict, Hashable, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    - threshold: largest block mean absolute gray-level difference (0-1) below
+      which a frame counts as static (0 = gate off)
+    - refresh_ms: age of the last inferred result after which inference is forced (0 = gate off)
+    - size: side of the grayscale thumbnail the frames are compared on
+    - blocks: blocks per thumbnail side (16 blocks of 4x4 thumbnail pixels by default)
+    """
+
+    def __init__(self, threshold: float = 0.03, refresh_ms: float = 1000, size: int = 64, blocks: int = 16):
+        self.threshold = threshold
+        self.refresh_ms = refresh_ms
+        self.size = size
+        self.blocks = blocks
+        self.reference: Optional[np.ndarray] = None
+        self.result: Optional[Dict] = None
+        self.key: Hashable = None
+        self.inferred_at = 0.0
+        self._pending: Optional[np.ndarray] = None
+
+        # Counters
+        self.inferred = 0
+        self.reused = 0
+
+    def thumbnail(self, img: np.ndarray, rgb: bool = False) -> np.ndarray:
+        # Downsample first: the color conversion then touches size * size pixels only
+        small = cv2.resize(img, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+
+    def motion(self, thumb: np.ndarray) -> float:
+        """Mean absolute difference (0-1) of the most changed block against the reference."""
+        diff = cv2.absdiff(thumb, self.reference)
+        per_block = cv2.resize(diff, (self.blocks, self.blocks), interpolation=cv2.INTER_AREA)
+        return float(per_block.max()) / 255.0
+
+    def reuse(self, img: np.ndarray, key: Hashable = None, rgb: bool = False) -> Optional[Dict]:
+        """
+        The previous result, marked reused, if this frame barely differs from
+        the last inferred one; None means run inference (then call store).
+        `key` identifies the request options the result depends on (tasks,
+        response format): a different key never reuses. `img` is BGR unless `rgb`.
+        """
+        if self.threshold <= 0 or self.refresh_ms <= 0:
+            return None
+        thumb = self.thumbnail(img, rgb)
+        if (self.result is not None and key == self.key
+                and (time.monotonic() - self.inferred_at) * 1000 < self.refresh_ms):
+            if self.motion(thumb) < self.threshold:
+                self.reused += 1
+                return {**self.result, "reused": True}
+        self._pending = thumb
+        return None
+
+    def store(self, result: Dict, key: Hashable = None):
+        """Remember the result inferred on the frame last passed to reuse()."""
+        self.reference = self._pending
+        self.result = result
+        self.key = key
+        self.inferred_at = time.monotonic()
+        self.inferred += 1
+
+    def reset(self):
+        self.reference = None
+        self.result = None
+
+
+class MotionGatePool:
+    """One MotionGate per session id, with LRU eviction (for services without other session state)."""
+
+    def __init__(self, max_sessions: int, threshold: float, refresh_ms: float):
+        self.max_sessions = max(1, max_sessions)
+        self.threshold = threshold
+        self.refresh_ms = refresh_ms
+        self.gates = OrderedDict()  # session_id -> MotionGate, oldest first
+
+    def get(self, session_id: str) -> MotionGate:
+        gate = self.gates.get(session_id)
+        if gate is None:
+            while len(self.gates) >= self.max_sessions:
+                self.gates.popitem(last=False)
+            gate = self.gates[session_id] = MotionGate(self.threshold, self.refresh_ms)
+        else:
+            self.gates.move_to_end(session_id)
+        return gate
+
+    def stats(self) -> Dict:
+        gates = list(self.gates.values())
+        return {
+            "sessions": len(gates),
+            "inferred": sum(g.inferred for g in gates),
+            "reused": sum(g.reused for g in gates)
+        }
@@ -0,0 +1,108 @@
+"""
+Shared Frame Preprocessing for the vision models
+
+One place for the JPEG -> array step of mediapipe_service, deepface_service
+and VisionAgent:
+- scaled decoding: libjpeg decodes straight to 1/2, 1/4 or 1/8 size
+  (IMREAD_REDUCED_*), picked so the frame still covers the model's target
+  input size; far cheaper than a full decode followed by a resize
+- direct RGB decoding (IMREAD_COLOR_RGB, OpenCV >= 4.10) for MediaPipe, with a
+  conversion into a reused buffer on older OpenCV or for BGR ring frames
+- per-stage timing into a metrics.Metrics ("decode", then the caller's model
+  stages), so decode time can be compared with model time
+
+Arrays returned from a reused buffer are only valid until the next call on
+the same decoder.
+"""
+
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from metrics import Metrics
+
+# Older OpenCV has no RGB decode flag
+IMREAD_COLOR_RGB = getattr(cv2, "IMREAD_COLOR_RGB", None)
+
+# Scale bits of IMREAD_REDUCED_*; combined with a color flag they give
+# IMREAD_REDUCED_COLOR_n (BGR) or the RGB equivalent
+REDUCED_BITS = {1: 0, 2: 16, 4: 32, 8: 64}
+
+# Longest frame side each model family needs. MediaPipe crops hands / face
+# out of the frame (see roi_tracker.py), so it keeps more pixels than DeepFace,
+# whose face detector and 48x48 emotion model are fine with a small frame.
+LANDMARK_INPUT_SIZE = 640
+EMOTION_INPUT_SIZE = 320
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the JPEG header, without decoding; None if not a JPEG."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker in SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def reduction_for(size: Optional[Tuple[int, int]], target_size: int) -> int:
+    """Largest decode divisor (1, 2, 4, 8) that keeps the longest side >= target_size."""
+    if size is None or target_size <= 0:
+        return 1
+    longest = max(size)
+    for factor in (8, 4, 2):
+        if longest // factor >= target_size:
+            return factor
+    return 1
+
+
+class FrameDecoder:
+    """
+    - target_size: longest side the models need (0 = full resolution)
+    - rgb: decode to RGB (MediaPipe) instead of BGR (OpenCV / DeepFace)
+    - metrics: where "decode" times go (None = not timed)
+    """
+
+    def __init__(self, target_size: int = 0, rgb: bool = False, metrics: Optional[Metrics] = None):
+        self.target_size = target_size
+        self.rgb = rgb
+        self.metrics = metrics
+        self._rgb_buffer: Optional[np.ndarray] = None
+
+    def decode(self, data: bytes) -> Optional[np.ndarray]:
+        """JPEG (or any format OpenCV reads) -> HxWx3 uint8 array, None if unreadable."""
+        start = time.perf_counter()
+        size = jpeg_size(data)
+        reduced = REDUCED_BITS[reduction_for(size, self.target_size)]
+        buf = np.frombuffer(data, np.uint8)
+        if self.rgb and IMREAD_COLOR_RGB is not None:
+            img = cv2.imdecode(buf, reduced | IMREAD_COLOR_RGB)
+        else:
+            img = cv2.imdecode(buf, reduced | cv2.IMREAD_COLOR)
+            if img is not None and self.rgb:
+                img = self.to_rgb(img)
+        if self.metrics is not None:
+            self.metrics.observe("decode", time.perf_counter() - start)
+        return img
+
+    def to_rgb(self, img_bgr: np.ndarray) -> np.ndarray:
+        """BGR -> RGB into a buffer reused across frames of the same shape."""
+        if self._rgb_buffer is None or self._rgb_buffer.shape != img_bgr.shape:
+            self._rgb_buffer = np.empty_like(img_bgr)
+        return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
@@ -0,0 +1,31 @@
+"""
+Request parsing shared by the microservices (mediapipe, deepface, audio)
+
+The orchestrator speaks a raw protocol to the services: the payload is the
+application/octet-stream body and the client session is in X-Session-Id.
+Browser / legacy clients post a multipart "file" upload and may name their
+session with ?session_id=.
+"""
+
+from fastapi import HTTPException, Request
+
+
+async def read_payload(request: Request) -> bytes:
+    """
+    Read the request body as bytes.
+    Accepts a raw application/octet-stream body (orchestrator fast path)
+    or a multipart upload with a "file" field (browser / legacy clients).
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None:
+            raise HTTPException(status_code=400, detail="Missing 'file' field")
+        return await upload.read()
+    return await request.body()
+
+
+def session_id_of(request: Request) -> str:
+    """Client session from the X-Session-Id header (or ?session_id=); legacy callers share "default"."""
+    return request.headers.get("x-session-id") or request.query_params.get("session_id") or "default"
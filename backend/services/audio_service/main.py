@@ -3,7 +3,7 @@ Audio Microservice - Speech Recognition Optimized
 Port: 8001
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 import torch
@@ -11,10 +11,16 @@ from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC
 import webrtcvad
 import librosa
 import logging
+import os
+import sys
 from typing import Tuple, Optional
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 
+# Request parsing is shared with the other services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from service_request import read_payload  # noqa: E402
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -57,9 +63,8 @@ logger.info("Intent classifier initialized.")
 
 # --- Helper Functions ---
 
-def read_audio(file: UploadFile) -> Tuple[np.ndarray, int]:
+def read_audio(contents: bytes) -> Tuple[np.ndarray, int]:
     """Read audio - handles both file formats (via librosa) and raw PCM Int16"""
-    contents = file.file.read()
     try:
         # Try as structured audio file first (wav, mp3, etc.)
         audio, sr = librosa.load(librosa.io.BytesIO(contents), sr=16000, mono=True)
@@ -123,10 +128,10 @@ def detect_intent(transcription: str) -> Tuple[Optional[str], Optional[str]]:
 # --- API Routes ---
 
 @app.post("/transcribe")
-async def transcribe(file: UploadFile = File(...)):
-    # Accept any binary data (PCM from orchestrator)
+async def transcribe(request: Request):
+    # Accept any binary data (raw PCM from orchestrator, or multipart upload)
     try:
-        audio, sr = read_audio(file)
+        audio, sr = read_audio(await read_payload(request))
         if len(audio) == 0 or not is_speech(audio, sr):
             logger.info("No speech detected in audio.")
             return {"transcript": "", "intent": None, "entity": None}
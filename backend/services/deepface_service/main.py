@@ -3,12 +3,20 @@ DeepFace Microservice - Emotion Detection
 Port: 8003
 """
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import numpy as np
 from deepface import DeepFace
 import logging
+import os
+import sys
+
+# frame_ring.py is shared with the orchestrator (FRAME_TRANSPORT=shm, same host)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from frame_ring import FrameRef, FrameRingReader, StaleFrameError  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from motion_gate import MotionGatePool  # noqa: E402
+from preprocess import EMOTION_INPUT_SIZE, FrameDecoder  # noqa: E402
+from service_request import read_payload, session_id_of  # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,46 +31,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Shared-memory rings attached by this process
+frame_reader = FrameRingReader()
+
+# Per-stage timings (decode, emotion); JPEG frames are decoded at the smallest
+# 1/2^n scale whose longest side still covers DEEPFACE_DECODE_SIZE (0 = full)
+metrics = Metrics()
+DECODE_SIZE = int(os.getenv("DEEPFACE_DECODE_SIZE", str(EMOTION_INPUT_SIZE)))
+decoder = FrameDecoder(DECODE_SIZE, metrics=metrics)
+
+# Motion gate per session (X-Session-Id): a near-static face keeps its last
+# emotion, re-analyzed at least every MOTION_GATE_REFRESH_MS
+gates = MotionGatePool(
+    max_sessions=int(os.getenv("DEEPFACE_MAX_SESSIONS", os.getenv("MAX_SESSIONS", "500"))),
+    threshold=float(os.getenv("MOTION_GATE_THRESHOLD", "0.03")),
+    refresh_ms=float(os.getenv("MOTION_GATE_REFRESH_MS", "1000"))
+)
+
 @app.post("/analyze")
-async def analyze_emotion(file: UploadFile = File(...)):
-    """Detect emotion from image."""
+async def analyze_emotion(request: Request):
+    """
+    Detect emotion from image: the request body, or a decoded frame in the
+    orchestrator's shared-memory ring (X-Frame-* headers, empty body).
+    """
     try:
+        # Task mask (X-Tasks): nothing to do if emotion was not requested
+        tasks = request.headers.get("x-tasks")
+        if tasks is not None and "emotion" not in tasks.split(","):
+            return {}
+        
         # Read image
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame_ref = FrameRef.from_headers(request.headers)
+        if frame_ref is not None:
+            img = frame_reader.view(frame_ref)
+        else:
+            img = decoder.decode(await read_payload(request))
         
         if img is None:
             return {"error": "Invalid image"}
         
+        # Near-static frame: previous emotion, marked "reused"
+        gate = gates.get(session_id_of(request))
+        reused = gate.reuse(img)
+        if reused is not None:
+            return reused
+        
         # Run DeepFace
-        result = DeepFace.analyze(
-            img_path=img,
-            actions=['emotion'],
-            enforce_detection=False,
-            detector_backend='opencv',
-            silent=True
-        )
+        with metrics.timer("emotion"):
+            result = DeepFace.analyze(
+                img_path=img,
+                actions=['emotion'],
+                enforce_detection=False,
+                detector_backend='opencv',
+                silent=True
+            )
+        
+        # The frame was read in place: make sure it was not replaced meanwhile
+        if frame_ref is not None and not frame_reader.still_valid(frame_ref):
+            return {"error": "Frame overwritten", "stale": True}
         
         if result and len(result) > 0:
             dominant_emotion = result[0]['dominant_emotion']
             confidence = result[0]['emotion'][dominant_emotion] / 100.0
             
-            return {
+            response = {
                 "emotion": dominant_emotion,
                 "confidence": confidence,
                 "all_emotions": result[0]['emotion']
             }
+        else:
+            response = {"emotion": "neutral", "confidence": 0.0}
+        gate.store(response)
+        return response
         
-        return {"emotion": "neutral", "confidence": 0.0}
-        
+    except StaleFrameError as e:
+        # Lost a race for the orchestrator's ring slot: not a service failure
+        return {"error": str(e), "stale": True}
     except Exception as e:
         logger.error(f"Error: {e}")
-        return {"error": str(e), "emotion": "neutral", "confidence": 0.0}
+        # No made-up emotion: the orchestrator drops error answers
+        return {"error": str(e)}
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "deepface"}
+    return {"status": "healthy", "service": "deepface", "motion_gate": gates.stats()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage latency histograms: decode vs emotion model time."""
+    return {"decode_size": DECODE_SIZE, "latency": metrics.snapshot([])["latency"]}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,127 @@
+"""
+Gaze estimation for the MediaPipe service
+
+Computed from the refined face mesh (478 points) the service already runs for
+the "iris" task, so clients get a small `gaze` object instead of the mesh.
+
+Both eyes are handled in one pass: the iris centre's offset from the eye
+centre, projected on the eye axis (so head roll does not count) and divided
+by half the eye width, averaged over the two eyes. Blinks (lids closed) are
+left out of calibration, since the iris landmarks are unreliable then.
+
+Calibration is per session: the baseline is the median of a window of recent
+offsets. The first `calibration_frames` frames fill it; afterwards only frames
+close to the baseline (looking at the screen) enter it, so the baseline
+follows posture drift without being dragged by glances away. The median is
+robust to the occasional bad frame in the window.
+"""
+
+import math
+from typing import Dict
+
+import numpy as np
+
+# Refined mesh indices, one row per eye (subject's right, then left)
+IRIS = np.array([[469, 470, 471, 472], [474, 475, 476, 477]])
+EYE_CORNERS = np.array([[33, 133], [362, 263]])
+EYE_LIDS = np.array([[159, 145], [386, 374]])
+REFINED_POINTS = 478
+
+# Lid gap below this fraction of the eye width is a blink
+BLINK_OPENNESS = 0.12
+
+# Offsets are in half eye widths: an iris shifted by one half width is
+# rotated by about asin(EYE_HALF_WIDTH_MM / EYEBALL_RADIUS_MM)
+EYE_HALF_WIDTH_MM = 15.0
+EYEBALL_RADIUS_MM = 12.0
+
+
+def eye_offsets(face: np.ndarray, frame_shape) -> np.ndarray:
+    """
+    (2, 3) per eye: [x offset, y offset, openness] of one (478, 3) face in
+    normalized image coordinates. Offsets are in half eye widths, x along
+    the eye axis, y perpendicular to it (downwards positive).
+    """
+    h, w = frame_shape[:2]
+    # Square pixels, so the eye axis angle is the real one
+    points = face[:, :2] * np.array([w / h, 1.0], dtype=np.float32)
+
+    iris = points[IRIS].mean(axis=1)                   # (2, 2)
+    corners = points[EYE_CORNERS]                      # (2, 2, 2)
+    center = corners.mean(axis=1)
+    axis = corners[:, 1] - corners[:, 0]
+    width = np.linalg.norm(axis, axis=1) + 1e-6
+    axis = axis / width[:, None]
+    normal = np.stack([-axis[:, 1], axis[:, 0]], axis=1)
+    # Both eyes share the image's x direction
+    axis *= np.sign(axis[:, :1] + 1e-9)
+    normal *= np.sign(normal[:, 1:] + 1e-9)
+
+    delta = iris - center
+    half = width / 2
+    lids = points[EYE_LIDS]
+    openness = np.linalg.norm(lids[:, 0] - lids[:, 1], axis=1) / width
+    return np.stack([(delta * axis).sum(axis=1) / half, (delta * normal).sum(axis=1) / half, openness], axis=1)
+
+
+class GazeEstimator:
+    """
+    - calibration_frames: frames (not blinking) before the baseline is trusted
+    - window: offsets kept for the running median baseline
+    - accept_deviation: after calibration, offsets further than this (half
+      eye widths) from the baseline do not enter the window
+    """
+
+    def __init__(self, calibration_frames: int = 30, window: int = 90, accept_deviation: float = 0.15):
+        self.calibration_frames = calibration_frames
+        self.accept_deviation = accept_deviation
+        self.samples = np.zeros((window, 2), np.float32)
+        self.head = 0
+        self.count = 0
+        self.accepted = 0
+        self.baseline = np.zeros(2, np.float32)
+
+    @property
+    def calibrated(self) -> bool:
+        return self.accepted >= self.calibration_frames
+
+    def _add(self, offset: np.ndarray):
+        self.samples[self.head] = offset
+        self.head = (self.head + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+        self.accepted += 1
+        self.baseline = np.median(self.samples[:self.count], axis=0)
+
+    def update(self, face: np.ndarray, frame_shape) -> Dict:
+        """
+        Gaze of one face, for the response:
+        - vector: [x, y] offset from the calibrated baseline, in half eye widths
+        - deviation: approximate angle from the baseline, in degrees
+        - calibrated / progress: calibration state (progress 0-1)
+        - blink: lids closed on both eyes (offset unreliable)
+        """
+        if len(face) < REFINED_POINTS:
+            return {}
+        eyes = eye_offsets(face, frame_shape)
+        blink = bool((eyes[:, 2] < BLINK_OPENNESS).all())
+        offset = eyes[:, :2].mean(axis=0)
+
+        if not blink:
+            if not self.calibrated:
+                self._add(offset)
+            elif np.hypot(*(offset - self.baseline)) <= self.accept_deviation:
+                self._add(offset)
+
+        vector = offset - self.baseline if self.calibrated else np.zeros(2)
+        rotation = min(1.0, math.hypot(*vector) * EYE_HALF_WIDTH_MM / EYEBALL_RADIUS_MM)
+        return {
+            "vector": [round(float(v), 4) for v in vector],
+            "deviation": round(math.degrees(math.asin(rotation)), 2),
+            "calibrated": self.calibrated,
+            "progress": round(min(1.0, self.accepted / self.calibration_frames), 2),
+            "blink": blink
+        }
+
+    def reset(self):
+        self.head = self.count = self.accepted = 0
+        self.baseline[:] = 0
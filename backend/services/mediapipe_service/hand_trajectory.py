@@ -0,0 +1,153 @@
+"""
+Hand trajectories for dynamic gestures
+
+Each tracked hand keeps a fixed-size NumPy ring of its last frames: landmarks
+normalized to the hand (wrist at the origin, divided by the hand size) and
+the palm centre's motion. The window features a dynamic gesture needs are
+running sums over that ring, updated in O(1) per frame (add the new step,
+subtract the one falling out):
+- displacement: net palm motion, in hand sizes (swipes)
+- path: distance travelled, in hand sizes
+- turning: signed angle swept by the direction of motion (circles)
+- reversals: horizontal direction changes (waves)
+
+Distances are in hand sizes (wrist to middle-finger MCP), so the thresholds
+do not depend on how far the user sits from the camera. Directions are in
+image coordinates (y grows downwards).
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+WRIST = 0
+MIDDLE_MCP = 9
+PALM = [0, 5, 9, 17]
+
+# Palm steps shorter than this (hand sizes) are landmark jitter: they move
+# the palm but do not define a direction
+MIN_STEP = 0.05
+
+# Swipe: at least this far, along a mostly straight path that barely turns
+# (an arc of a circle gesture is straight enough otherwise)
+SWIPE_DISTANCE = 1.5
+SWIPE_STRAIGHTNESS = 0.75
+SWIPE_MAX_TURNING = np.pi / 4
+# Circle: direction of motion sweeps this angle, over this much path
+CIRCLE_TURNING = 1.5 * np.pi
+CIRCLE_PATH = 2.0
+# Wave: this many left/right reversals, over this much path
+WAVE_REVERSALS = 2
+WAVE_PATH = 1.5
+
+
+class HandTrajectory:
+    """
+    - capacity: frames in the window (about 1 s at 15 fps by default)
+    - min_frames: frames needed before any dynamic gesture is reported
+    """
+
+    def __init__(self, capacity: int = 16, min_frames: int = 4):
+        self.capacity = capacity
+        self.min_frames = min_frames
+        self.points = np.zeros((capacity, 21, 3), np.float32)  # hand-normalized landmarks
+        self.steps = np.zeros((capacity, 2))                  # palm motion from the previous frame
+        self.lengths = np.zeros(capacity)
+        self.turns = np.zeros(capacity)
+        self.flips = np.zeros(capacity)                       # 1 where the x direction reversed
+        self.reset()
+
+    def reset(self):
+        """Forget the window (hand lost, or a dynamic gesture was just reported)."""
+        self.steps[:] = 0
+        self.lengths[:] = 0
+        self.turns[:] = 0
+        self.flips[:] = 0
+        self.head = 0
+        self.count = 0
+        self.last_center: Optional[np.ndarray] = None
+        self.last_direction: Optional[tuple] = None  # last step longer than MIN_STEP
+        self.last_dir_x = 0
+        # Running sums over the window
+        self.displacement = np.zeros(2)
+        self.path = 0.0
+        self.turning = 0.0
+        self.reversals = 0.0
+
+    def push(self, points: np.ndarray):
+        """Add one (21, 3) hand, in normalized image coordinates."""
+        # Per-frame scalars use math: NumPy call overhead dominates on 2-vectors
+        wx, wy = float(points[WRIST, 0]), float(points[WRIST, 1])
+        scale = math.hypot(float(points[MIDDLE_MCP, 0]) - wx, float(points[MIDDLE_MCP, 1]) - wy) or 1e-6
+        center = points[PALM, :2].mean(axis=0)
+        if self.last_center is None:
+            sx = sy = 0.0
+        else:
+            sx = float(center[0] - self.last_center[0]) / scale
+            sy = float(center[1] - self.last_center[1]) / scale
+        length = math.hypot(sx, sy)
+
+        turn = 0.0
+        flip = 0.0
+        if length > MIN_STEP:
+            if self.last_direction is not None:
+                dx, dy = self.last_direction
+                turn = math.atan2(dx * sy - dy * sx, dx * sx + dy * sy)
+            self.last_direction = (sx, sy)
+        if abs(sx) > MIN_STEP:
+            dir_x = 1 if sx > 0 else -1
+            flip = float(self.last_dir_x == -dir_x)
+            self.last_dir_x = dir_x
+
+        slot = self.head
+        if self.count == self.capacity:
+            # The oldest step leaves the window
+            self.displacement -= self.steps[slot]
+            self.path -= self.lengths[slot]
+            self.turning -= self.turns[slot]
+            self.reversals -= self.flips[slot]
+        np.divide(points - points[WRIST], scale, out=self.points[slot])
+        self.steps[slot] = (sx, sy)
+        self.lengths[slot] = length
+        self.turns[slot] = turn
+        self.flips[slot] = flip
+        self.displacement += (sx, sy)
+        self.path += length
+        self.turning += turn
+        self.reversals += flip
+
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.last_center = center
+        if self.head == 0:
+            # Once per lap: resync the running sums, so float error never builds up
+            self.displacement = self.steps.sum(axis=0)
+            self.path = float(self.lengths.sum())
+            self.turning = float(self.turns.sum())
+            self.reversals = float(self.flips.sum())
+
+    def window(self) -> np.ndarray:
+        """Hand-normalized landmarks of the window, oldest first: (count, 21, 3)."""
+        order = (np.arange(self.count) + self.head - self.count) % self.capacity
+        return self.points[order]
+
+    def detect(self, open_hand: bool) -> Optional[str]:
+        """
+        Dynamic gesture completed in the window, if any: SWIPE_LEFT / RIGHT /
+        UP / DOWN, CIRCLE, or TCHAO (wave, open hand only).
+        """
+        if self.count < self.min_frames:
+            return None
+        distance = math.hypot(*self.displacement)
+        if (distance >= SWIPE_DISTANCE and distance >= SWIPE_STRAIGHTNESS * self.path
+                and abs(self.turning) < SWIPE_MAX_TURNING):
+            dx, dy = self.displacement
+            if abs(dx) >= abs(dy):
+                return "SWIPE_RIGHT" if dx > 0 else "SWIPE_LEFT"
+            return "SWIPE_DOWN" if dy > 0 else "SWIPE_UP"
+        if abs(self.turning) >= CIRCLE_TURNING and self.path >= CIRCLE_PATH:
+            return "CIRCLE"
+        if open_hand and self.reversals >= WAVE_REVERSALS and self.path >= WAVE_PATH:
+            return "TCHAO"
+        return None
@@ -0,0 +1,110 @@
+"""
+Landmark arrays for the MediaPipe service
+
+MediaPipe returns landmarks as protobuf objects; they are converted once per
+frame into (N, 3) float32 arrays, and everything downstream (gesture features,
+serialization) works on the arrays.
+"""
+
+import base64
+from typing import Dict, List
+
+import numpy as np
+
+# Hand landmark indices
+WRIST = 0
+THUMB_TIP = 4
+INDEX_TIP = 8
+FINGER_TIPS = [8, 12, 16, 20]
+FINGER_PIPS = [6, 10, 14, 18]
+PALM_MCPS = [5, 9, 17]
+
+# Thumb tip this far (normalized x) from the palm centre counts as extended
+THUMB_EXTENDED_DISTANCE = 0.05
+
+# Thumb and index tips closer than this (normalized) form the OK circle
+OK_DISTANCE = 0.05
+
+# Static gestures, by index (classify_hands returns indices into this list)
+STATIC_GESTURES = ["UNKNOWN", "FIST", "THUMBS_UP", "OK", "PEACE", "OPEN_PALM", "POINTING", "TWO_FINGERS"]
+
+
+def landmarks_to_array(landmark_list) -> np.ndarray:
+    """NormalizedLandmarkList -> (N, 3) float32 array of x, y, z."""
+    return np.array([(p.x, p.y, p.z) for p in landmark_list.landmark], dtype=np.float32)
+
+
+def hands_features(hands: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Geometric features of (H, 21, 3) hands, all hands in one pass:
+    - fingers: (H, 5) extended state of thumb, index, middle, ring, pinky
+    - thumb_index_dist: (H,) 2D distance between thumb and index tips
+    - wrist_x: (H,) horizontal wrist position
+    """
+    palm_center_x = hands[:, PALM_MCPS, 0].mean(axis=1)
+    thumb = np.abs(hands[:, THUMB_TIP, 0] - palm_center_x) > THUMB_EXTENDED_DISTANCE
+    # Tip above PIP (assuming the hand is upright)
+    others = hands[:, FINGER_TIPS, 1] < hands[:, FINGER_PIPS, 1]
+    tips = hands[:, THUMB_TIP, :2] - hands[:, INDEX_TIP, :2]
+    return {
+        "fingers": np.concatenate([thumb[:, None], others], axis=1),
+        "thumb_index_dist": np.hypot(tips[:, 0], tips[:, 1]),
+        "wrist_x": hands[:, WRIST, 0]
+    }
+
+
+def hand_features(points: np.ndarray) -> Dict:
+    """Features of one (21, 3) hand, as plain Python values (see hands_features)."""
+    features = hands_features(points[None])
+    return {
+        "fingers": features["fingers"][0].astype(int).tolist(),
+        "thumb_index_dist": float(features["thumb_index_dist"][0]),
+        "wrist_x": float(features["wrist_x"][0])
+    }
+
+
+def classify_hands(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Static gesture of every hand, as (H,) indices into STATIC_GESTURES.
+    Rules are checked in priority order; the first match wins.
+    """
+    fingers = features["fingers"]
+    thumb, index, middle, ring, pinky = fingers.T
+    total = fingers.sum(axis=1)
+    rules = [
+        ("FIST", total == 0),
+        # Only the thumb extended
+        ("THUMBS_UP", thumb & (total == 1)),
+        # Thumb and index tips together, forming a circle
+        ("OK", (features["thumb_index_dist"] < OK_DISTANCE) & (total >= 3)),
+        # Index and middle extended, ring and pinky folded
+        ("PEACE", index & middle & ~ring & ~pinky),
+        ("OPEN_PALM", total == 5),
+        ("POINTING", index & (total == 1)),
+        ("TWO_FINGERS", index & middle & (total == 2)),
+    ]
+    return np.select([rule for _, rule in rules], [STATIC_GESTURES.index(name) for name, _ in rules], default=0)
+
+
+def landmark_dicts(arrays: List[np.ndarray]) -> List[List[Dict[str, float]]]:
+    """Default response schema: one list of {"x","y","z"} dicts per hand / face."""
+    return [[{"x": x, "y": y, "z": z} for x, y, z in points.tolist()] for points in arrays]
+
+
+def pack_landmarks(arrays: List[np.ndarray]) -> Dict:
+    """
+    Packed response schema: all hands (or faces) in one base64 string of
+    little-endian float32, x y z interleaved, shape [count, points, 3].
+    """
+    stacked = np.stack(arrays).astype("<f4", copy=False)
+    return {
+        "shape": list(stacked.shape),
+        "dtype": "float32",
+        "data": base64.b64encode(stacked.tobytes()).decode("ascii")
+    }
+
+
+def unpack_landmarks(packed: Dict) -> np.ndarray:
+    """Inverse of pack_landmarks (for clients)."""
+    data = np.frombuffer(base64.b64decode(packed["data"]), dtype="<f4")
+    return data.reshape(packed["shape"])
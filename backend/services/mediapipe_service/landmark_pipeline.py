@@ -0,0 +1,457 @@
+"""
+Landmark Pipeline - per-session MediaPipe analysis
+
+Everything between a frame and its /analyze result: motion gate, ROI-tracked
+Hands / FaceMesh graphs, gesture classification and temporal validation,
+gaze. State lives in a SessionPool keyed by client session, one per process:
+the service's graph workers (main.GraphWorkers) and the orchestrator's local
+backend (INFERENCE_BACKEND=local) both run analyze_image on it.
+"""
+
+import logging
+import math
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple, Union
+
+import mediapipe as mp
+import numpy as np
+
+from gaze import GazeEstimator
+from hand_trajectory import HandTrajectory
+from landmark_arrays import STATIC_GESTURES, classify_hands, hands_features, landmark_dicts, landmarks_to_array, pack_landmarks
+from roi_tracker import RoiGraphs, RoiTracker
+
+# Shared with the orchestrator (frame ring, metrics, motion gate, decoding)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from frame_ring import FrameRef, FrameRingReader, StaleFrameError  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from motion_gate import MotionGate  # noqa: E402
+from preprocess import LANDMARK_INPUT_SIZE, FrameDecoder  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# MediaPipe solutions (one Hands / FaceMesh graph per session, see SessionPool)
+mp_hands = mp.solutions.hands
+mp_face_mesh = mp.solutions.face_mesh
+
+# Static topology, built once (FACEMESH_CONTOURS for a cleaner look)
+HAND_CONNECTIONS = [[a, b] for a, b in mp_hands.HAND_CONNECTIONS]
+FACE_CONNECTIONS = [[a, b] for a, b in mp_face_mesh.FACEMESH_CONTOURS]
+
+# ROI tracking: crop to the last hands / face, downsampled to ROI_TARGET_SIZE,
+# with a full-frame search every ROI_REFRESH_FRAMES frames (0 = always full frame).
+# Off by default: MediaPipe warps its input to fixed-size model tensors, so on
+# frames decoded to MEDIAPIPE_DECODE_SIZE a crop costs the same graph time plus
+# the crop itself (benchmarks/roi_benchmark.py)
+ROI_TARGET_SIZE = int(os.getenv("ROI_TARGET_SIZE", "320"))
+ROI_FULL_FRAME_SIZE = int(os.getenv("ROI_FULL_FRAME_SIZE", "0"))
+ROI_REFRESH_FRAMES = int(os.getenv("ROI_REFRESH_FRAMES", "0"))
+ROI_EXPAND = float(os.getenv("ROI_EXPAND", "0.5"))
+
+# Motion gate: a frame whose most changed grayscale block differs from the
+# last inferred frame by less than MOTION_GATE_THRESHOLD reuses its result,
+# for at most MOTION_GATE_REFRESH_MS (0 = always run the models)
+MOTION_GATE_THRESHOLD = float(os.getenv("MOTION_GATE_THRESHOLD", "0.03"))
+MOTION_GATE_REFRESH_MS = float(os.getenv("MOTION_GATE_REFRESH_MS", "1000"))
+
+# JPEG frames are decoded (to RGB) at the smallest 1/2^n scale whose longest
+# side still covers this size (0 = full resolution)
+DECODE_SIZE = int(os.getenv("MEDIAPIPE_DECODE_SIZE", str(LANDMARK_INPUT_SIZE)))
+
+# Models a request can ask for (X-Tasks)
+ALL_TASKS = {"hands", "face", "iris"}
+
+# Sessions kept warm across all worker processes; each worker keeps its share
+# (worker_share), the least recently used session is evicted beyond it. Every
+# session holds its own graphs (2 to 4 with ROI), so the default stays small
+MAX_SESSIONS = int(os.getenv("MEDIAPIPE_MAX_SESSIONS", "64"))
+# Sessions without a frame for this long are closed, like the orchestrator's
+# registry does for disconnected clients
+SESSION_IDLE_SECONDS = float(os.getenv("MEDIAPIPE_SESSION_IDLE_SECONDS", os.getenv("SESSION_IDLE_SECONDS", "300")))
+
+
+class HandState:
+    """
+    Temporal state of one hand, kept across frames by handedness label:
+    trajectory window (dynamic gestures), static-gesture vote window and cooldown.
+    """
+
+    def __init__(self, history_size: int):
+        self.trajectory = HandTrajectory()
+        self.gesture_history = deque(maxlen=history_size)  # static gesture indices
+        # Running vote: occurrences of each static gesture in gesture_history
+        self.counts = np.zeros(len(STATIC_GESTURES), dtype=np.int64)
+        self.cooldown_counter = 0
+        self.last_confirmed_gesture = "UNKNOWN"
+
+    def clear_votes(self):
+        self.gesture_history.clear()
+        self.counts[:] = 0
+
+    def vote(self, gesture: int) -> int:
+        """Add one frame's static gesture; return the window's leader (its count is in self.counts)."""
+        if len(self.gesture_history) == self.gesture_history.maxlen:
+            self.counts[self.gesture_history[0]] -= 1
+        self.gesture_history.append(gesture)
+        self.counts[gesture] += 1
+        return int(self.counts.argmax())
+
+
+class GesturePipeline:
+    def __init__(self):
+        # 6. Validation Temporelle Configuration
+        self.history_size = 5 # Number of frames for smoothing
+        self.min_votes = 4 # Confidence threshold (e.g., 4/5 frames must match)
+        self.cooldown_frames = 10 # Frames a dynamic gesture stays reported
+        self.hands: Dict[str, HandState] = {}
+
+    def process(self, hands: np.ndarray, labels: List[str]) -> List[str]:
+        """
+        Execute steps 4, 5, 6 of the pipeline on (H, 21, 3) hands, one
+        gesture per hand; `labels` (handedness) tie each hand to its state.
+        4. Analyse Géométrique
+        5. Classification Geste (statique, puis dynamique sur la trajectoire)
+        6. Validation Temporelle
+        """
+        # --- 4. Analyse Géométrique (all hands in one pass) ---
+        # Fingers States (0 = Folded, 1 = Extended), thumb-index distance
+        features = hands_features(hands)
+        
+        # --- 5. Classification Geste ---
+        static = classify_hands(features)
+        open_hand = features["fingers"].sum(axis=1) >= 4
+        
+        # Two hands with the same label still get a state each
+        keys = [label if label not in labels[:i] else f"{label}{i}" for i, label in enumerate(labels)]
+        
+        gestures = []
+        for i, key in enumerate(keys):
+            state = self.hands.get(key)
+            if state is None:
+                state = self.hands[key] = HandState(self.history_size)
+            
+            # 5b. Dynamic gestures (swipes, circle, wave) from the trajectory window
+            state.trajectory.push(hands[i])
+            dynamic = state.trajectory.detect(bool(open_hand[i]))
+            gestures.append(self._validate(state, int(static[i]), dynamic))
+        
+        # Hands that left the frame start over when they come back
+        for key in [k for k in self.hands if k not in keys]:
+            del self.hands[key]
+        return gestures
+
+    def _validate(self, state: HandState, static: int, dynamic: Optional[str]) -> str:
+        # --- 6. Validation Temporelle ---
+        # Dynamic gestures are already integrated over the trajectory window:
+        # no vote, reported for the cooldown, then the window starts over
+        if dynamic is not None:
+            state.trajectory.reset()
+            state.clear_votes()
+            state.cooldown_counter = self.cooldown_frames
+            state.last_confirmed_gesture = dynamic
+            return dynamic
+        
+        # 6a. Cooldown check
+        if state.cooldown_counter > 0:
+            state.cooldown_counter -= 1
+            return state.last_confirmed_gesture
+        
+        # 6b. History Smoothing (running counts, no Counter rebuilt per frame)
+        leader = state.vote(static)
+        if len(state.gesture_history) == self.history_size and state.counts[leader] >= self.min_votes:
+            state.last_confirmed_gesture = STATIC_GESTURES[leader]
+        return state.last_confirmed_gesture
+
+    def reset(self):
+        """No hand in the frame."""
+        self.hands.clear()
+
+
+def handedness_of(multi_handedness, count: int) -> List[Tuple[str, float]]:
+    """
+    (label, score) of each detected hand, as reported by MediaPipe ("Left" /
+    "Right", assuming a mirrored, selfie-view image).
+    """
+    handedness = []
+    for i in range(count):
+        if multi_handedness and i < len(multi_handedness):
+            classification = multi_handedness[i].classification[0]
+            handedness.append((classification.label, float(classification.score)))
+        else:
+            handedness.append(("Unknown", 0.0))
+    return handedness
+
+def new_roi_tracker() -> RoiTracker:
+    return RoiTracker(
+        expand=ROI_EXPAND,
+        target_size=ROI_TARGET_SIZE,
+        full_frame_size=ROI_FULL_FRAME_SIZE,
+        refresh_frames=ROI_REFRESH_FRAMES
+    )
+
+
+def new_roi_graphs(factory) -> RoiGraphs:
+    # With ROI off every frame is a full frame: the search graph tracks (video mode)
+    return RoiGraphs(factory, static_search=ROI_REFRESH_FRAMES > 0)
+
+
+def detect(tracker: RoiTracker, graphs: RoiGraphs, img, results_field: str, rgb: bool):
+    """
+    Run a MediaPipe graph on the tracker's window (its crop or full-frame
+    graph) and return full-frame (N, 3) landmark arrays, with the graph's
+    results (handedness etc.). A miss inside the crop retries on the full
+    frame at once.
+    """
+    while True:
+        img_rgb, window = tracker.prepare(img, rgb)
+        results = graphs.for_window(window, img.shape).process(img_rgb)
+        landmark_lists = getattr(results, results_field) or []
+        arrays = [landmarks_to_array(lm) for lm in landmark_lists]
+        if arrays or RoiTracker.is_full(window, img.shape):
+            break
+        tracker.reset()
+    tracker.to_frame(arrays, window, img.shape)
+    tracker.update(arrays, img.shape)
+    return arrays, results
+
+
+class SessionState:
+    """
+    Everything that must not be shared between clients: the gesture smoothing
+    history, MediaPipe's tracker (in video mode, Hands / FaceMesh track
+    from the previous frame's landmarks instead of re-running detection)
+    the motion gate's last inferred frame and the gaze calibration.
+    Graphs are built on first use, so a hands-only client never loads FaceMesh;
+    each comes as a crop / full-frame pair (RoiGraphs).
+    """
+
+    def __init__(self):
+        self.pipeline = GesturePipeline()
+        self.hand_roi = new_roi_tracker()
+        self.face_roi = new_roi_tracker()
+        self.gate = MotionGate(MOTION_GATE_THRESHOLD, MOTION_GATE_REFRESH_MS)
+        self.gaze = GazeEstimator()
+        self._hands: Optional[RoiGraphs] = None
+        self._face_meshes: Dict[bool, RoiGraphs] = {}  # refine_landmarks -> FaceMesh graphs
+        self.last_used = time.monotonic()
+
+    @property
+    def hands(self) -> RoiGraphs:
+        if self._hands is None:
+            self._hands = new_roi_graphs(lambda static: mp_hands.Hands(
+                static_image_mode=static,
+                max_num_hands=2,  # Support 2 hands for better detection
+                model_complexity=0,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            ))
+        return self._hands
+
+    def face_mesh(self, refine: bool) -> RoiGraphs:
+        """FaceMesh with (478 points, iris) or without (468 points) the refinement model."""
+        if refine not in self._face_meshes:
+            self._face_meshes[refine] = new_roi_graphs(lambda static: mp_face_mesh.FaceMesh(
+                static_image_mode=static,
+                max_num_faces=1,
+                refine_landmarks=refine,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            ))
+        return self._face_meshes[refine]
+
+    def graphs(self) -> List[RoiGraphs]:
+        return [g for g in (self._hands, *self._face_meshes.values()) if g is not None]
+
+    def close(self):
+        for graphs in self.graphs():
+            graphs.close()
+
+
+class SessionPool:
+    """Per-session state keyed by X-Session-Id, with idle and LRU eviction."""
+
+    def __init__(self, max_sessions: int, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()  # session_id -> SessionState, least recently used first
+        self.evictions = 0
+        self.idle_evictions = 0
+
+    def evict_idle(self):
+        """Close the sessions that got no frame for idle_seconds (the oldest come first)."""
+        now = time.monotonic()
+        while self.sessions:
+            session_id, state = next(iter(self.sessions.items()))
+            if now - state.last_used <= self.idle_seconds:
+                break
+            del self.sessions[session_id]
+            state.close()
+            self.idle_evictions += 1
+            logger.info(f"Closed idle session {session_id}")
+
+    def get(self, session_id: str) -> SessionState:
+        self.evict_idle()
+        state = self.sessions.get(session_id)
+        if state is None:
+            while len(self.sessions) >= self.max_sessions:
+                evicted_id, evicted = self.sessions.popitem(last=False)
+                evicted.close()
+                self.evictions += 1
+                logger.info(f"Evicted session {evicted_id}")
+            state = self.sessions[session_id] = SessionState()
+        else:
+            self.sessions.move_to_end(session_id)
+        state.last_used = time.monotonic()
+        return state
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+sessions = SessionPool(MAX_SESSIONS)
+
+
+def worker_share(workers: int) -> int:
+    """Per-process session cap when sessions are hashed over `workers` processes (25% headroom for uneven hashing)."""
+    return max(1, math.ceil(MAX_SESSIONS * 1.25 / max(1, workers)))
+
+
+def evict_idle_sessions() -> int:
+    """Periodic sweep, for workers that get no frames to trigger it; sessions left."""
+    sessions.evict_idle()
+    return len(sessions)
+
+
+def configure_worker(workers: int):
+    """Process pool initializer: this worker keeps its share of the sessions warm."""
+    sessions.max_sessions = worker_share(workers)
+
+
+# Shared-memory rings attached by this process
+frame_reader = FrameRingReader()
+
+# Per-stage timings of this process: decode, hands, face
+metrics = Metrics()
+decoder = FrameDecoder(DECODE_SIZE, rgb=True, metrics=metrics)
+
+
+def analyze_image(source: Union[bytes, FrameRef], session_id: str, tasks: set, packed: bool) -> Dict:
+    """
+    Full Pipeline (runs in a worker process), on a JPEG or on a decoded
+    frame in the orchestrator's shared-memory ring:
+    1. Capture (FastAPI), motion gate (near-static frame: previous result, "reused": true)
+    2. Detection Main & Face (MediaPipe)
+    3. Extraction (Landmarks)
+    4. Analyse (Geometry)
+    5. Classification
+    6. Validation
+    7. Action
+    """
+    try:
+        # --- 1. Capture Vidéo (ring frames are BGR, JPEGs decode straight to RGB) ---
+        if isinstance(source, FrameRef):
+            img, rgb = frame_reader.view(source), False
+        else:
+            img, rgb = decoder.decode(source), True
+        
+        if img is None:
+            return {"error": "Invalid image"}
+        
+        state = sessions.get(session_id)
+        pipeline = state.pipeline
+        
+        # The result depends on the tasks and the response format too
+        gate_key = (frozenset(tasks), packed)
+        reused = state.gate.reuse(img, gate_key, rgb)
+        if reused is not None:
+            if isinstance(source, FrameRef) and not frame_reader.still_valid(source):
+                return {"error": "Frame overwritten", "stale": True}
+            return reused
+        serialize = pack_landmarks if packed else landmark_dicts
+        
+        result = {"landmark_format": "packed"} if packed else {}
+        gesture_out = "UNKNOWN"
+        
+        # --- 2, 3. Détection Main (ROI), extraction (one (21, 3) array per hand) ---
+        hand_arrays = []
+        if "hands" in tasks:
+            with metrics.timer("hands"):
+                hand_arrays, hand_results = detect(state.hand_roi, state.hands, img, "multi_hand_landmarks", rgb)
+        
+        if hand_arrays:
+            result["hand_landmarks"] = serialize(hand_arrays)
+            
+            # Hand connections for drawing
+            result["hand_connections"] = HAND_CONNECTIONS
+            
+            # --- 4, 5, 6. Analyse, Classification, Validation (every hand) ---
+            handedness = handedness_of(getattr(hand_results, "multi_handedness", None), len(hand_arrays))
+            gestures = pipeline.process(np.stack(hand_arrays), [label for label, _ in handedness])
+            result["hands"] = [
+                {"handedness": label, "score": score, "gesture": gesture}
+                for (label, score), gesture in zip(handedness, gestures)
+            ]
+            
+            # Primary gesture: the first hand's, or the other hand's if the first has none
+            gesture_out = next((g for g in gestures if g != "UNKNOWN"), "UNKNOWN")
+            result["gesture"] = gesture_out
+            
+            # --- 7. Action Logique (Mapping done in Orchestrator) ---
+            if gesture_out != "UNKNOWN":
+                result["command_trigger"] = True
+                
+        else:
+            # Reset history if no hand detected
+            pipeline.reset()
+        
+        # --- 2b. Détection Visage (ROI; iris needs the refined mesh) ---
+        face_arrays = []
+        if tasks & {"face", "iris"}:
+            face_mesh = state.face_mesh(refine="iris" in tasks)
+            with metrics.timer("face"):
+                face_arrays, _ = detect(state.face_roi, face_mesh, img, "multi_face_landmarks", rgb)
+        
+        if face_arrays and "face" in tasks:
+            result["face_landmarks"] = serialize(face_arrays)
+            
+            # Face connections for drawing (use contours subset to avoid overwhelming frontend)
+            result["face_connections"] = FACE_CONNECTIONS
+        
+        # --- 4b. Regard (iris): a small gaze object, the mesh is not sent for it ---
+        if face_arrays and "iris" in tasks:
+            result["gaze"] = state.gaze.update(face_arrays[0], img.shape)
+        
+        # The frame was read in place: make sure it was not replaced meanwhile
+        if isinstance(source, FrameRef) and not frame_reader.still_valid(source):
+            return {"error": "Frame overwritten", "stale": True}
+        state.gate.store(result, gate_key)
+        return result
+        
+    except StaleFrameError as e:
+        # Lost a race for the orchestrator's ring slot: not a service failure
+        return {"error": str(e), "stale": True}
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return {"error": str(e)}
+
+def worker_stats() -> Dict:
+    """Session, ROI and motion gate counters of the calling worker process."""
+    states = list(sessions.sessions.values())
+    return {
+        "sessions": len(sessions),
+        "evictions": sessions.evictions,
+        "idle_evictions": sessions.idle_evictions,
+        "roi_frames": sum(st.hand_roi.roi_frames + st.face_roi.roi_frames for st in states),
+        "full_frames": sum(st.hand_roi.full_frames + st.face_roi.full_frames for st in states),
+        "crop_resets": sum(g.crop_resets for st in states for g in st.graphs()),
+        "inferred": sum(st.gate.inferred for st in states),
+        "reused": sum(st.gate.reused for st in states)
+    }
+
+
+def worker_timings() -> Dict:
+    """Per-stage latency histograms of the calling worker process."""
+    return metrics.snapshot([])["latency"]
@@ -3,17 +3,53 @@ MediaPipe Microservice - Gesture Detection Only
 Port: 8002
 """
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import numpy as np
-import mediapipe as mp
+from fastapi.responses import JSONResponse
+import asyncio
 import logging
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Union
+
+# The per-session pipeline (also run in-process by the orchestrator's local backend)
+from landmark_pipeline import (
+    ALL_TASKS, DECODE_SIZE, MAX_SESSIONS, SESSION_IDLE_SECONDS, analyze_image, configure_worker,
+    evict_idle_sessions, worker_share, worker_stats, worker_timings
+)
+
+# frame_ring.py / service_request.py are shared with the orchestrator and the other services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from frame_ring import FrameRef  # noqa: E402
+from service_request import read_payload, session_id_of  # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.workers = GraphWorkers(WORKERS)
+    # Start the processes before the first frame arrives
+    await app.state.workers.stats()
+    logger.info(f"MediaPipe service ready ({len(app.state.workers.pools)} graph worker(s))")
+    sweeper = asyncio.create_task(sweep_idle_sessions(app.state.workers))
+    yield
+    sweeper.cancel()
+    app.state.workers.shutdown()
+
+async def sweep_idle_sessions(workers: "GraphWorkers"):
+    """Close idle sessions on workers that no longer receive frames (each frame sweeps its own worker)."""
+    while True:
+        await asyncio.sleep(max(1.0, SESSION_IDLE_SECONDS / 4))
+        try:
+            await workers.sweep()
+        except Exception as e:
+            logger.error(f"Session sweep failed: {e}")
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,256 +59,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MediaPipe Hands
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(
-    max_num_hands=2,  # Support 2 hands for better detection
-    model_complexity=0,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+# Graph worker processes (sessions are spread across them)
+WORKERS = int(os.getenv("MEDIAPIPE_WORKERS") or min(4, os.cpu_count() or 1))
 
-# Initialize MediaPipe Face Mesh
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
 
-# Initialize MediaPipe Drawing
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+def tasks_of(request: Request) -> set:
+    """
+    Models to run, from the X-Tasks header (or ?tasks=), comma separated:
+    "hands", "face" (468-point mesh), "iris" (refined 478-point mesh, gaze;
+    the mesh itself is only returned with "face").
+    Missing means all of them.
+    """
+    raw = request.headers.get("x-tasks") or request.query_params.get("tasks")
+    if raw is None:
+        return set(ALL_TASKS)
+    return {t.strip() for t in raw.split(",")} & ALL_TASKS
 
-# Pipeline State (Global for simplicity in this microservice instance)
-from collections import deque, Counter
 
-class GesturePipeline:
-    def __init__(self):
-        # 6. Validation Temporelle Configuration
-        self.history_size = 5 # Number of frames for smoothing
-        self.gesture_history = deque(maxlen=self.history_size)
-        self.cooldown_frames = 10
-        self.cooldown_counter = 0
-        # Track wrist position for TCHAO (wave) detection
-        self.wrist_history = deque(maxlen=10)
-        self.last_wrist_x = None
-        self.last_confirmed_gesture = "UNKNOWN"
+def landmark_format_of(request: Request) -> str:
+    """
+    Landmark response schema, from the X-Landmark-Format header (or ?format=):
+    - "dicts" (default): one list of {"x","y","z"} per hand / face
+    - "packed": {"shape", "dtype", "data"} with base64 float32, see landmark_arrays.pack_landmarks
+    """
+    return request.headers.get("x-landmark-format") or request.query_params.get("format") or "dicts"
 
-    def process(self, landmarks, img_shape):
-        """
-        Execute steps 4, 5, 6 of the pipeline.
-        4. Analyse Géométrique
-        5. Classification Geste
-        6. Validation Temporelle
-        """
-        h, w, _ = img_shape
-        
-        # --- 4. Analyse Géométrique ---
-        # Extract meaningful geometric features (distances, states)
-        thumb_tip = landmarks.landmark[4]
-        index_tip = landmarks.landmark[8]
-        middle_tip = landmarks.landmark[12]
-        ring_tip = landmarks.landmark[16]
-        pinky_tip = landmarks.landmark[20]
-        wrist = landmarks.landmark[0]
-        
-        # Fingers States (0 = Folded, 1 = Extended)
-        fingers = []
-        
-        # Thumb: Compare x-distance to wrist (simplified for right hand/camera mirror)
-        # Using simple check: is tip far from palm center?
-        # A more robust check for general purpose:
-        thumb_extended = False
-        # Calculate pseudo-palm center (average of MCPs)
-        palm_center_x = (landmarks.landmark[5].x + landmarks.landmark[9].x + landmarks.landmark[17].x) / 3
-        if abs(thumb_tip.x - palm_center_x) > 0.05: # Arbitrary threshold for extension
-            thumb_extended = True
-        fingers.append(1 if thumb_extended else 0)
 
-        # Other 4 fingers: Tip y < PIP y (assuming hand is upright)
-        tips = [8, 12, 16, 20]
-        pips = [6, 10, 14, 18]
-        for tip, pip in zip(tips, pips):
-            if landmarks.landmark[tip].y < landmarks.landmark[pip].y:
-                fingers.append(1)
-            else:
-                fingers.append(0)
-                
-        # --- 5. Classification Geste ---
-        raw_gesture = "UNKNOWN"
-        total_extended = sum(fingers)
-        
-        # Calculate distances for OK gesture detection
-        thumb_index_dist = np.sqrt(
-            (thumb_tip.x - index_tip.x)**2 + 
-            (thumb_tip.y - index_tip.y)**2
-        )
-        
-        # Track wrist movement for TCHAO (wave) detection
-        current_wrist_x = wrist.x
-        wrist_movement = 0
-        if self.last_wrist_x is not None:
-            wrist_movement = abs(current_wrist_x - self.last_wrist_x)
-        self.last_wrist_x = current_wrist_x
-        self.wrist_history.append(wrist_movement)
-        avg_wrist_movement = sum(self.wrist_history) / len(self.wrist_history) if self.wrist_history else 0
-        
-        # Rule-based classification (priority order matters)
-        if total_extended == 0:
-            raw_gesture = "FIST"
-        
-        # THUMBS_UP: Only thumb extended
-        elif fingers[0] == 1 and sum(fingers[1:]) == 0:
-            raw_gesture = "THUMBS_UP"
-        
-        # OK: Thumb and index close together (forming circle)
-        elif thumb_index_dist < 0.05 and total_extended >= 3:
-            raw_gesture = "OK"
-        
-        # PEACE: Index and middle finger extended, others folded
-        elif fingers[1] == 1 and fingers[2] == 1 and fingers[3] == 0 and fingers[4] == 0:
-            raw_gesture = "PEACE"
-        
-        # TCHAO: Open palm with lateral movement
-        elif total_extended == 5 and avg_wrist_movement > 0.02:
-            raw_gesture = "TCHAO"
-        
-        # OPEN_PALM: All fingers extended, no movement
-        elif total_extended == 5:
-            raw_gesture = "OPEN_PALM"
-        
-        # POINTING: Index only extended
-        elif fingers[1] == 1 and total_extended == 1:
-            raw_gesture = "POINTING"
-        
-        # TWO_FINGERS: Index and middle extended (but not PEACE pattern)
-        elif fingers[1] == 1 and fingers[2] == 1 and total_extended == 2:
-            raw_gesture = "TWO_FINGERS"
-            
-        # --- 6. Validation Temporelle ---
-        # 6a. Cooldown check
-        if self.cooldown_counter > 0:
-            self.cooldown_counter -= 1
-            return self.last_confirmed_gesture
-            
-        # 6b. History Smoothing
-        self.gesture_history.append(raw_gesture)
-        
-        if len(self.gesture_history) == self.history_size:
-            # Get most common gesture in history
-            most_common, count = Counter(self.gesture_history).most_common(1)[0]
-            
-            # Confidence threshold (e.g., 4/5 frames must match)
-            if count >= 4:
-                new_gesture = most_common
-                
-                # If gesture changed to something significant, trigger cooldown?
-                # For this MVP, we just return the stabilized gesture
-                self.last_confirmed_gesture = new_gesture
-                return new_gesture
-                
-        return self.last_confirmed_gesture
+class GraphWorkers:
+    """
+    MediaPipe graphs are not thread-safe, so they run in worker processes: one
+    single-process executor per worker, each with its own SessionPool. A
+    session always lands on the same worker (crc32 of its id), so its tracker
+    state stays there and its frames are processed in order.
+    """
+
+    def __init__(self, workers: int):
+        self.pools: List[ProcessPoolExecutor] = [
+            ProcessPoolExecutor(max_workers=1, initializer=configure_worker, initargs=(max(1, workers),))
+            for _ in range(max(1, workers))
+        ]
+
+    def _pool(self, session_id: str) -> ProcessPoolExecutor:
+        return self.pools[zlib.crc32(session_id.encode()) % len(self.pools)]
+
+    async def analyze(self, source: Union[bytes, FrameRef], session_id: str, tasks: set, packed: bool) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(session_id), analyze_image, source, session_id, tasks, packed)
+
+    async def stats(self) -> List[Dict]:
+        return await self._each(worker_stats)
+
+    async def sweep(self) -> List[int]:
+        return await self._each(evict_idle_sessions)
+
+    async def timings(self) -> List[Dict]:
+        return await self._each(worker_timings)
+
+    async def _each(self, fn) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(loop.run_in_executor(pool, fn) for pool in self.pools))
+
+    def shutdown(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
 
-# Initialize Pipeline
-pipeline = GesturePipeline()
 
 @app.post("/analyze")
-async def analyze_frame(file: UploadFile = File(...)):
+async def analyze_frame(request: Request):
     """
-    Full Pipeline:
-    1. Capture (FastAPI)
-    2. Detection Main & Face (MediaPipe)
-    3. Extraction (Landmarks)
-    4. Analyse (Geometry)
-    5. Classification
-    6. Validation
-    7. Action
+    Run the pipeline on one frame, on the worker that owns the session.
+    The frame is the request body, or a shared-memory ring slot named by the
+    X-Frame-Ring / X-Frame-Slot / X-Frame-Seq headers (empty body).
     """
     try:
-        # --- 1. Capture Vidéo ---
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            return {"error": "Invalid image"}
-        
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        result = {}
-        gesture_out = "UNKNOWN"
-        
-        # --- 2. Détection Main ---
-        hand_results = hands.process(img_rgb)
-        
-        # Serialize hand landmarks
-        if hand_results.multi_hand_landmarks:
-            hand_landmarks_list = []
-            for hand_landmarks in hand_results.multi_hand_landmarks:
-                # Convert landmarks to JSON-serializable format
-                landmarks_dict = []
-                for landmark in hand_landmarks.landmark:
-                    landmarks_dict.append({
-                        "x": float(landmark.x),
-                        "y": float(landmark.y),
-                        "z": float(landmark.z)
-                    })
-                hand_landmarks_list.append(landmarks_dict)
-            
-            result["hand_landmarks"] = hand_landmarks_list
-            
-            # Hand connections for drawing
-            result["hand_connections"] = [[conn[0], conn[1]] for conn in mp_hands.HAND_CONNECTIONS]
-            
-            # --- 3. Extraction Landmarks (first hand for gesture) ---
-            hand_landmarks = hand_results.multi_hand_landmarks[0]
-            
-            # --- 4, 5, 6. Analyse, Classification, Validation ---
-            gesture_out = pipeline.process(hand_landmarks, img.shape)
-            
-            result["gesture"] = gesture_out
-            
-            # --- 7. Action Logique (Mapping done in Orchestrator) ---
-            if gesture_out != "UNKNOWN":
-                result["command_trigger"] = True
-                
-        else:
-            # Reset history if no hand detected
-            pipeline.gesture_history.clear()
-        
-        # --- 2b. Détection Visage ---
-        face_results = face_mesh.process(img_rgb)
-        
-        if face_results.multi_face_landmarks:
-            face_landmarks_list = []
-            for face_landmarks in face_results.multi_face_landmarks:
-                # Convert face landmarks to JSON-serializable format
-                landmarks_dict = []
-                for landmark in face_landmarks.landmark:
-                    landmarks_dict.append({
-                        "x": float(landmark.x),
-                        "y": float(landmark.y),
-                        "z": float(landmark.z)
-                    })
-                face_landmarks_list.append(landmarks_dict)
-            
-            result["face_landmarks"] = face_landmarks_list
-            
-            # Face connections for drawing (use contours subset to avoid overwhelming frontend)
-            # Using FACEMESH_CONTOURS for a cleaner look
-            result["face_connections"] = [[conn[0], conn[1]] for conn in mp_face_mesh.FACEMESH_CONTOURS]
-        
-        return result
+        source = FrameRef.from_headers(request.headers) or await read_payload(request)
+        tasks = tasks_of(request)
+        if not tasks:
+            return JSONResponse({})
+        packed = landmark_format_of(request) == "packed"
+        result = await request.app.state.workers.analyze(source, session_id_of(request), tasks, packed)
+        # Plain JSON types already: skip FastAPI's recursive jsonable_encoder
+        return JSONResponse(result)
         
     except Exception as e:
         logger.error(f"Error: {e}")
         return {"error": str(e)}
 
+@app.post("/analyze_batch")
+async def analyze_batch(request: Request):
+    """
+    Several frames in one multipart request: repeated "file" parts, with an
+    optional "session_id" field per file (same order; defaults to the
+    X-Session-Id header). X-Tasks / X-Landmark-Format apply to every frame.
+    Frames run concurrently across workers and results come back in order.
+    """
+    form = await request.form()
+    files = form.getlist("file")
+    if not files:
+        raise HTTPException(status_code=400, detail="Missing 'file' field")
+    session_ids = form.getlist("session_id")
+    default_session = session_id_of(request)
+    tasks = tasks_of(request)
+    packed = landmark_format_of(request) == "packed"
+    
+    async def run(i: int, upload) -> Dict:
+        if not tasks:
+            return {}
+        session_id = session_ids[i] if i < len(session_ids) else default_session
+        try:
+            return await request.app.state.workers.analyze(await upload.read(), session_id, tasks, packed)
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return {"error": str(e)}
+    
+    results = await asyncio.gather(*(run(i, upload) for i, upload in enumerate(files)))
+    return JSONResponse({"results": list(results)})
+
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "mediapipe"}
+    workers = await app.state.workers.stats()
+    return {
+        "status": "healthy",
+        "service": "mediapipe",
+        "workers": len(workers),
+        "sessions": sum(w["sessions"] for w in workers),
+        "max_sessions": MAX_SESSIONS,
+        "max_sessions_per_worker": worker_share(len(workers)),
+        "session_idle_seconds": SESSION_IDLE_SECONDS,
+        "evictions": sum(w["evictions"] for w in workers),
+        "idle_evictions": sum(w["idle_evictions"] for w in workers),
+        "roi": {
+            "roi_frames": sum(w["roi_frames"] for w in workers),
+            "full_frames": sum(w["full_frames"] for w in workers),
+            "crop_resets": sum(w["crop_resets"] for w in workers)
+        },
+        "motion_gate": {
+            "inferred": sum(w["inferred"] for w in workers),
+            "reused": sum(w["reused"] for w in workers)
+        }
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage latency histograms (decode vs model time), one entry per graph worker."""
+    return {"decode_size": DECODE_SIZE, "workers": await app.state.workers.timings()}
 
 if __name__ == "__main__":
     import uvicorn
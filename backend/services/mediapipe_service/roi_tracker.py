@@ -0,0 +1,182 @@
+"""
+Region-of-interest tracking for the MediaPipe service
+
+For a seated user the hands and face cover a small, slowly moving part of the
+frame. Each tracker keeps a crop box around the last landmarks of one target
+(hands or face), hands the graph only that crop, downsampled to a target
+inference size, and maps the landmarks back into full-frame coordinates.
+
+The whole frame is searched again every `refresh_frames` frames (new hands,
+second hand) and whenever the target is lost.
+
+The resized / color-converted crop goes into buffers reused across frames:
+it is only valid until the next prepare() on the same tracker.
+
+In video mode a MediaPipe graph tracks from the previous input's landmarks,
+in that input's normalized coordinates, so one graph must not see full frames
+and crops in turn: RoiGraphs keeps a graph for each, and restarts the crop
+graph whenever the crop window moves.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# (x0, y0, width, height) of the processed window, in full-frame pixels
+Window = Tuple[int, int, int, int]
+
+
+class RoiTracker:
+    """
+    - expand: margin added on each side of the landmark box, as a fraction of its size
+    - min_size: smallest crop side, as a fraction of the frame's shorter side
+    - target_size: longest side of a crop given to the graph (0 = no resize)
+    - full_frame_size: same for full-frame searches (0 = no resize)
+    - refresh_frames: crop frames between two full-frame searches
+    - recenter_margin: the crop only moves when landmarks come this close
+      (fraction of the crop) to its edge, so MediaPipe's tracker sees a stable window
+    """
+
+    def __init__(self, expand: float = 0.5, min_size: float = 0.25, target_size: int = 320,
+                 full_frame_size: int = 0, refresh_frames: int = 30, recenter_margin: float = 0.1):
+        self.expand = expand
+        self.min_size = min_size
+        self.target_size = target_size
+        self.full_frame_size = full_frame_size
+        self.refresh_frames = refresh_frames
+        self.recenter_margin = recenter_margin
+        self.box: Optional[Window] = None
+        self.frames_since_full = 0
+        self._buffers = {}  # (stage, shape) -> array
+
+        # Counters
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def _buffer(self, stage: str, shape) -> np.ndarray:
+        key = (stage, shape)
+        buf = self._buffers.get(key)
+        if buf is None:
+            # Crop sizes vary with the box: keep the last few shapes only
+            if len(self._buffers) >= 8:
+                self._buffers.clear()
+            buf = self._buffers[key] = np.empty(shape, np.uint8)
+        return buf
+
+    def prepare(self, img: np.ndarray, rgb: bool = False) -> Tuple[np.ndarray, Window]:
+        """
+        RGB image to run the graph on, and the window it covers. `img` is
+        BGR (converted here, crop only) or already RGB (`rgb`).
+        """
+        h, w = img.shape[:2]
+        if self.box is None or self.frames_since_full >= self.refresh_frames:
+            window = (0, 0, w, h)
+            size = self.full_frame_size
+            self.frames_since_full = 0
+            self.full_frames += 1
+        else:
+            window = self.box
+            size = self.target_size
+            self.frames_since_full += 1
+            self.roi_frames += 1
+
+        x0, y0, cw, ch = window
+        sub = img[y0:y0 + ch, x0:x0 + cw]
+        # Uniform scale, so normalized landmark coordinates are unaffected
+        scale = size / max(cw, ch) if size else 1.0
+        if scale < 1.0:
+            rw, rh = max(1, round(cw * scale)), max(1, round(ch * scale))
+            sub = cv2.resize(sub, (rw, rh), dst=self._buffer("resize", (rh, rw, 3)), interpolation=cv2.INTER_AREA)
+        if rgb:
+            # The graph needs a contiguous image; a full frame already is
+            return np.ascontiguousarray(sub), window
+        return cv2.cvtColor(sub, cv2.COLOR_BGR2RGB, dst=self._buffer("rgb", sub.shape)), window
+
+    @staticmethod
+    def is_full(window: Window, frame_shape) -> bool:
+        return window[2] == frame_shape[1] and window[3] == frame_shape[0]
+
+    @staticmethod
+    def to_frame(arrays: List[np.ndarray], window: Window, frame_shape):
+        """Map (N, 3) landmarks normalized to the window into full-frame coordinates, in place."""
+        x0, y0, cw, ch = window
+        h, w = frame_shape[:2]
+        if (cw, ch) == (w, h):
+            return
+        for points in arrays:
+            points[:, 0] = (x0 + points[:, 0] * cw) / w
+            points[:, 1] = (y0 + points[:, 1] * ch) / h
+            # z uses the same scale as x
+            points[:, 2] *= cw / w
+
+    def update(self, arrays: List[np.ndarray], frame_shape):
+        """Follow the landmarks (full-frame coordinates); none means the track is lost."""
+        if not arrays:
+            self.box = None
+            return
+
+        h, w = frame_shape[:2]
+        points = np.concatenate(arrays)
+        x_min, y_min = points[:, 0].min() * w, points[:, 1].min() * h
+        x_max, y_max = points[:, 0].max() * w, points[:, 1].max() * h
+
+        if self.box is not None:
+            bx, by, bw, bh = self.box
+            mx, my = bw * self.recenter_margin, bh * self.recenter_margin
+            if x_min >= bx + mx and y_min >= by + my and x_max <= bx + bw - mx and y_max <= by + bh - my:
+                return
+
+        side_min = self.min_size * min(w, h)
+        bw = max((x_max - x_min) * (1 + 2 * self.expand), side_min)
+        bh = max((y_max - y_min) * (1 + 2 * self.expand), side_min)
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0 = int(np.clip(cx - bw / 2, 0, w - 1))
+        y0 = int(np.clip(cy - bh / 2, 0, h - 1))
+        x1 = int(np.clip(cx + bw / 2, x0 + 1, w))
+        y1 = int(np.clip(cy + bh / 2, y0 + 1, h))
+        self.box = (x0, y0, x1 - x0, y1 - y0)
+
+    def reset(self):
+        self.box = None
+
+
+class RoiGraphs:
+    """
+    The two graphs of one MediaPipe solution behind a RoiTracker, built on
+    first use by `factory(static_image_mode)`:
+    - search: full frames. In static image mode while ROI tracking is on
+      (searches are seconds apart, a track from the last one is stale); in
+      video mode when every frame is a full frame (ROI off)
+    - crop: crops, in video mode, reset() when the window changes
+    """
+
+    def __init__(self, factory: Callable[[bool], object], static_search: bool = True):
+        self.factory = factory
+        self.static_search = static_search
+        self._search = None
+        self._crop = None
+        self.crop_window: Optional[Window] = None
+
+        # Counters
+        self.crop_resets = 0
+
+    def for_window(self, window: Window, frame_shape):
+        """Graph to run on the image prepared for `window`."""
+        if RoiTracker.is_full(window, frame_shape):
+            if self._search is None:
+                self._search = self.factory(self.static_search)
+            return self._search
+        if self._crop is None:
+            self._crop = self.factory(False)
+        elif window != self.crop_window:
+            # Its tracking region belongs to the previous window
+            self._crop.reset()
+            self.crop_resets += 1
+        self.crop_window = window
+        return self._crop
+
+    def close(self):
+        for graph in (self._search, self._crop):
+            if graph is not None:
+                graph.close()
@@ -0,0 +1,53 @@
+"""
+WebSocket Session Recorder for the OmniSense Orchestrator
+
+Captures the raw typed binary messages a client sends to /ws (type 0 video,
+1 audio, 2 control) with their arrival time, so a session can be replayed
+later by benchmarks/replay.py.
+
+File format (little-endian):
+    b"OMNIREC1"
+    repeated: f64 seconds since start, u32 length, <length> bytes (type byte + payload)
+"""
+
+import struct
+import time
+from typing import Iterator, Tuple
+
+MAGIC = b"OMNIREC1"
+RECORD = struct.Struct("<dI")
+
+
+class SessionRecorder:
+    """Append-only recorder for one connection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start = time.monotonic()
+        self.count = 0
+
+    def write(self, data: bytes):
+        self.file.write(RECORD.pack(time.monotonic() - self.start, len(data)))
+        self.file.write(data)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, bytes]]:
+    """Yield (seconds since start, message bytes) for every recorded message."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not an OmniSense recording: {path}")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, length = RECORD.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, data
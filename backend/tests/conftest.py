@@ -0,0 +1,15 @@
+"""
+Regression tests for the backend's pure-Python modules (no models needed).
+
+Run from the backend directory: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same layout the services use: shared modules from backend/, the MediaPipe
+# service's own modules appended (backend/main.py keeps precedence)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "services", "mediapipe_service"))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import audio_segmenter
+from audio_segmenter import SpeechSegmenter
+
+RATE = 16000
+BYTES_PER_SECOND = RATE * 2
+
+
+@pytest.fixture
+def segmenter(monkeypatch):
+    """Energy-gate VAD, so the tests do not depend on webrtcvad's model."""
+    monkeypatch.setattr(audio_segmenter, "webrtcvad", None)
+    return SpeechSegmenter(
+        pre_roll_ms=300, silence_ms=600, max_segment_ms=6000, overlap_ms=300, min_speech_ms=250
+    )
+
+
+def speech(seconds: float) -> bytes:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16).tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return np.zeros(int(RATE * seconds), np.int16).tobytes()
+
+
+def seconds(segment: bytes) -> float:
+    return len(segment) / BYTES_PER_SECOND
+
+
+def test_silence_gives_nothing(segmenter):
+    assert segmenter.feed(silence(3)) == []
+    assert segmenter.flush() is None
+
+
+def test_utterance_is_endpointed(segmenter):
+    segments = segmenter.feed(silence(1) + speech(1.5) + silence(1))
+    assert len(segments) == 1
+    # The speech, the silent part of the pre-roll (at most 40% of 300 ms),
+    # 5 frames of trailing silence, and one 30 ms frame of alignment
+    assert 1.5 <= seconds(segments[0]) <= 1.5 + 0.12 + 5 * 0.03 + 0.03
+    assert segmenter.flush() is None
+
+
+def test_chunking_does_not_matter(segmenter):
+    audio = silence(0.5) + speech(1) + silence(1) + speech(0.8) + silence(1)
+    whole = segmenter.feed(audio)
+    segmenter.flush()
+    chunked = []
+    for i in range(0, len(audio), 1234):  # odd sizes, not frame aligned
+        chunked += segmenter.feed(audio[i:i + 1234])
+    assert chunked == whole and len(whole) == 2
+
+
+def test_long_speech_is_cut_with_overlap(segmenter):
+    segments = segmenter.feed(speech(8))
+    assert len(segments) == 1
+    assert seconds(segments[0]) == pytest.approx(6.0, abs=0.03)
+    rest = segmenter.flush()
+    # The next segment starts with the last 300 ms of the previous one
+    overlap = int(0.3 * BYTES_PER_SECOND)
+    assert rest[:overlap] == segments[0][-overlap:]
+    assert seconds(rest) == pytest.approx(8.0 - 6.0 + 0.3, abs=0.06)
+
+
+def test_flush_returns_the_open_segment(segmenter):
+    assert segmenter.feed(speech(1)) == []
+    segment = segmenter.flush()
+    assert seconds(segment) == pytest.approx(1.0, abs=0.06)
+    # Flushed state is clean
+    assert segmenter.flush() is None
+    assert segmenter.feed(silence(1)) == []
+
+
+def test_short_blip_is_not_speech(segmenter):
+    assert segmenter.feed(silence(0.5) + speech(0.1) + silence(1)) == []
+    assert segmenter.flush() is None
+
+
+def test_short_tail_after_a_cut_is_kept(segmenter):
+    # 150 ms of speech after the 6 s cut: shorter than min_speech_ms on its own,
+    # but it follows the carried overlap, so the last word is not lost
+    segments = segmenter.feed(speech(6.15) + silence(1))
+    assert [round(seconds(s), 1) for s in segments[:1]] == [6.0]
+    assert len(segments) == 2
+    assert seconds(segments[1]) >= 0.3 + 0.15
+    assert segmenter.flush() is None
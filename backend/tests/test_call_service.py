@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from main import ServiceError, call_service
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """A fresh mediapipe breaker that opens after 3 failures, and the HTTP backend."""
+    breaker = CircuitBreaker("mediapipe", failure_threshold=3, reset_timeout=60.0)
+    monkeypatch.setitem(main.breakers, "mediapipe", breaker)
+    monkeypatch.setattr(main.app.state, "local_backend", None, raising=False)
+    return breaker
+
+
+def client(body, status=200):
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(status, json=body)))
+
+
+def call(http_client):
+    return asyncio.run(call_service(http_client, "mediapipe", "http://mediapipe/analyze", b"jpeg", "s1", 1.0))
+
+
+def test_result_is_a_success(breaker):
+    breaker.record_failure()
+    assert call(client({"gesture": "FIST"})) == {"gesture": "FIST"}
+    assert breaker.consecutive_failures == 0
+
+
+def test_error_bodies_open_the_circuit(breaker):
+    # A model crashing on every frame answers 200 {"error": ...}
+    http_client = client({"error": "graph crashed"})
+    for _ in range(3):
+        with pytest.raises(ServiceError):
+            call(http_client)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        call(http_client)
+
+
+def test_http_errors_are_failures(breaker):
+    with pytest.raises(httpx.HTTPStatusError):
+        call(client({}, status=500))
+    assert breaker.consecutive_failures == 1
+
+
+def test_local_backend_error_bodies(breaker, monkeypatch):
+    class Backend:
+        async def run(self, service, payload, session_id, tasks=None):
+            return {"error": "Invalid image"}
+
+    monkeypatch.setattr(main.app.state, "local_backend", Backend())
+    with pytest.raises(ServiceError):
+        call(client({}))
+    assert breaker.consecutive_failures == 1
@@ -0,0 +1,88 @@
+from circuit_breaker import CircuitBreaker
+
+
+def opened(probes: int = 1) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=5.0, half_open_probes=probes)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def expire(breaker: CircuitBreaker):
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker = opened()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+    assert not breaker.allow()
+
+
+def test_half_open_lets_probes_through():
+    breaker = opened(probes=2)
+    expire(breaker)
+    assert breaker.allow() and breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.probes_in_flight == 2
+    assert not breaker.allow()
+
+
+def test_released_probe_frees_its_slot():
+    breaker = opened()
+    expire(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+    # Cancelled call: no verdict, another probe may go
+    breaker.release()
+    assert breaker.probes_in_flight == 0
+    assert breaker.allow()
+
+
+def test_release_never_goes_negative():
+    breaker = opened()
+    expire(breaker)
+    breaker.release()
+    breaker.release()
+    assert breaker.probes_in_flight == 0
+    # Closed circuit: nothing to release
+    breaker = CircuitBreaker("test")
+    breaker.release()
+    assert breaker.probes_in_flight == 0
+
+
+def test_probe_success_closes():
+    breaker = opened()
+    expire(breaker)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.probes_in_flight == 0 and breaker.consecutive_failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens():
+    breaker = opened()
+    expire(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    assert breaker.probes_in_flight == 0
+    assert not breaker.allow()
+    # A full timeout later, a fresh probe slot
+    expire(breaker)
+    assert breaker.allow()
+    assert breaker.probes_in_flight == 1
+
+
+def test_snapshot():
+    breaker = opened()
+    assert breaker.snapshot() == {"state": "open", "consecutive_failures": 3, "times_opened": 1}
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import main
+from main import FusionEngine, SessionManager
+
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def fusion(policy: str, interval: float = 1.0) -> FusionEngine:
+    engine = FusionEngine(SessionManager())
+    engine.command_policy = policy
+    engine.command_interval = interval
+    return engine
+
+
+def phases(engine: FusionEngine, frames):
+    """Phase for each (gesture, time) frame."""
+    return [engine._command_phase(gesture, now) for gesture, now in frames]
+
+
+def held(gesture: str, seconds: float, fps: int = 8, start: float = 100.0):
+    """A gesture held for `seconds` (1/8 s frames: exact in binary, like the intervals)."""
+    return [(gesture, start + i / fps) for i in range(int(seconds * fps))]
+
+
+@pytest.mark.parametrize("policy", ["edge", "repeat", "hold"])
+def test_held_gesture_starts_once(policy):
+    result = phases(fusion(policy, interval=10.0), held("FIST", 3))
+    assert result[0] == "START"
+    assert result[1:] == [None] * 23
+
+
+def test_repeat_every_interval():
+    result = phases(fusion("repeat", interval=0.5), held("FIST", 2.125))
+    fired = [(i / 8, phase) for i, phase in enumerate(result) if phase]
+    assert fired == [(0.0, "START"), (0.5, "REPEAT"), (1.0, "REPEAT"), (1.5, "REPEAT"), (2.0, "REPEAT")]
+
+
+def test_hold_fires_once():
+    result = phases(fusion("hold", interval=0.5), held("FIST", 3))
+    fired = [(i / 8, phase) for i, phase in enumerate(result) if phase]
+    assert fired == [(0.0, "START"), (0.5, "HOLD")]
+
+
+@pytest.mark.parametrize("policy", ["edge", "hold"])
+def test_transition_rearms(policy):
+    engine = fusion(policy, interval=0.5)
+    frames = held("FIST", 1) + held("UNKNOWN", 0.25, start=101.0) + held("FIST", 1, start=101.25)
+    fired = [(gesture, phase) for (gesture, _), phase in zip(frames, phases(engine, frames)) if phase]
+    expected = [("FIST", "START"), ("UNKNOWN", "START"), ("FIST", "START")]
+    if policy == "hold":
+        expected = [("FIST", "START"), ("FIST", "HOLD"), ("UNKNOWN", "START"), ("FIST", "START"), ("FIST", "HOLD")]
+    assert fired == expected
+
+
+def test_process_vision_sends_one_command_for_a_held_gesture(monkeypatch):
+    clock = iter(100.0 + i / 10 for i in range(100))
+    monkeypatch.setattr(main.time, "monotonic", lambda: next(clock))
+    engine = fusion("edge")
+    socket = Socket()
+
+    async def run():
+        for gesture in ["FIST"] * 5 + ["UNKNOWN"] + ["FIST"] * 3 + ["OPEN_PALM"]:
+            await engine.process_vision({"gesture": gesture}, socket)
+
+    asyncio.run(run())
+    # UNKNOWN has no command, but it re-arms FIST
+    assert [(m["command"], m["phase"]) for m in socket.sent] == [
+        ("SELECT_ITEM", "START"), ("SELECT_ITEM", "START"), ("PAUSE_SESSION", "START")
+    ]
@@ -0,0 +1,77 @@
+import numpy as np
+
+import main
+from main import EmotionScheduler
+
+rng = np.random.default_rng(0)
+FACE = rng.uniform(0.4, 0.6, (478, 2))
+FACE[33] = (0.4, 0.45)   # outer eye corners, 0.2 apart
+FACE[263] = (0.6, 0.45)
+
+
+def face(points=FACE, dx=0.0, scale=1.0):
+    """One face as the MediaPipe service returns it."""
+    moved = (points - 0.5) * scale + 0.5 + dx
+    return [[{"x": float(x), "y": float(y)} for x, y in moved]]
+
+
+def smile(amount):
+    points = FACE.copy()
+    points[61, 0] -= amount   # mouth corners apart
+    points[291, 0] += amount
+    points[13, 1] -= amount   # lips apart
+    points[14, 1] += amount
+    return points
+
+
+def test_base_rate():
+    scheduler = EmotionScheduler()
+    interval = 1.0 / main.EMOTION_BASE_HZ
+    assert scheduler.due(100.0)
+    scheduler.mark_dispatched(100.0)
+    assert not scheduler.due(100.0 + interval / 2)
+    assert scheduler.due(100.0 + interval)
+    assert scheduler.stats() == {"dispatched": 1, "reused": 0}
+
+
+def test_expression_motion_boosts_the_rate():
+    scheduler = EmotionScheduler()
+    scheduler.mark_dispatched(100.0)
+    scheduler.observe_landmarks(face(), 100.0)
+    scheduler.observe_landmarks(face(smile(0.05)), 100.1)
+    boost = 1.0 / main.EMOTION_BOOST_HZ
+    assert scheduler.due(100.0 + boost)
+    # The boost wears off
+    after = 100.1 + main.EMOTION_BOOST_SECONDS
+    scheduler.mark_dispatched(after)
+    assert not scheduler.due(after + boost)
+
+
+def test_head_motion_does_not_boost():
+    scheduler = EmotionScheduler()
+    scheduler.mark_dispatched(100.0)
+    scheduler.observe_landmarks(face(), 100.0)
+    # Same expression, head moved and closer to the camera
+    scheduler.observe_landmarks(face(dx=0.05, scale=1.3), 100.1)
+    assert scheduler.boost_until == 0.0
+    assert not scheduler.due(100.2)
+
+
+def test_small_expression_changes_do_not_boost():
+    scheduler = EmotionScheduler()
+    scheduler.observe_landmarks(face(), 100.0)
+    scheduler.observe_landmarks(face(smile(0.001)), 100.1)
+    assert scheduler.boost_until == 0.0
+
+
+def test_lost_face_resets_the_reference():
+    scheduler = EmotionScheduler()
+    scheduler.observe_landmarks(face(), 100.0)
+    scheduler.observe_landmarks(None, 100.1)
+    assert scheduler.prev_shape is None
+    # A different face after the gap is not taken for expression motion
+    scheduler.observe_landmarks(face(smile(0.05)), 100.2)
+    assert scheduler.boost_until == 0.0
+    # Malformed landmarks are ignored
+    scheduler.observe_landmarks([[{"x": 0.5, "y": 0.5}]], 100.3)
+    assert scheduler.prev_shape is not None
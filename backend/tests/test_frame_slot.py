@@ -0,0 +1,60 @@
+import asyncio
+
+import main
+from main import EmotionScheduler, FusionEngine, LatestFrameSlot, SessionManager
+
+
+def test_newest_frame_wins():
+    async def scenario():
+        slot = LatestFrameSlot()
+        for frame in [b"1", b"2", b"3"]:
+            slot.put(frame)
+        frame, _, seq = await slot.get()
+        assert (frame, seq) == (b"3", 3)
+        # Overwritten before being read
+        assert slot.dropped == 2 and slot.received == 3
+        
+        # A frame that was read is not counted as dropped
+        slot.put(b"4")
+        assert await slot.get() == (b"4", slot.received_at, 4)
+        assert slot.dropped == 2
+    
+    asyncio.run(scenario())
+
+
+def test_get_waits_for_a_frame():
+    async def scenario():
+        slot = LatestFrameSlot()
+        waiter = asyncio.create_task(slot.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        slot.put(b"1")
+        frame, _, seq = await asyncio.wait_for(waiter, 1)
+        assert (frame, seq) == (b"1", 1)
+    
+    asyncio.run(scenario())
+
+
+def test_stale_frames_are_skipped(monkeypatch):
+    monkeypatch.setattr(main.app.state, "frame_ring", None, raising=False)
+    
+    async def scenario():
+        slot = LatestFrameSlot()
+        fusion = FusionEngine(SessionManager(spill_dir=""))
+        # No service to call: the worker only accounts for the frame
+        fusion.tasks = frozenset()
+        worker = asyncio.create_task(
+            main.vision_worker(slot, None, "s", EmotionScheduler(), fusion, None)
+        )
+        
+        slot.put(b"old")
+        slot.received_at -= main.STALE_FRAME_SECONDS + 0.1
+        await asyncio.sleep(0.01)
+        slot.put(b"new")
+        await asyncio.sleep(0.01)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        
+        assert slot.stats() == {"received": 2, "processed": 1, "dropped": 0, "stale": 1}
+    
+    asyncio.run(scenario())
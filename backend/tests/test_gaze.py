@@ -0,0 +1,90 @@
+import numpy as np
+
+from gaze import EYE_CORNERS, EYE_LIDS, IRIS, GazeEstimator
+
+FRAME = (480, 480, 3)  # square pixels: normalized x and y share a scale
+HALF_WIDTH = 0.03
+EYE_CENTERS = np.array([[0.43, 0.4], [0.57, 0.4]])
+
+
+def face(offset_x: float = 0.0, offset_y: float = 0.0, blink: bool = False) -> np.ndarray:
+    """478-point face whose irises sit `offset` half eye widths from the eye centres."""
+    points = np.zeros((478, 3), np.float32)
+    for eye, (cx, cy) in enumerate(EYE_CENTERS):
+        points[EYE_CORNERS[eye, 0], :2] = (cx - HALF_WIDTH, cy)
+        points[EYE_CORNERS[eye, 1], :2] = (cx + HALF_WIDTH, cy)
+        gap = 0.0 if blink else 0.01
+        points[EYE_LIDS[eye, 0], :2] = (cx, cy - gap)
+        points[EYE_LIDS[eye, 1], :2] = (cx, cy + gap)
+        iris = (cx + offset_x * HALF_WIDTH, cy + offset_y * HALF_WIDTH)
+        for i, (dx, dy) in zip(IRIS[eye], ((0.005, 0), (-0.005, 0), (0, 0.005), (0, -0.005))):
+            points[i, :2] = (iris[0] + dx, iris[1] + dy)
+    return points
+
+
+def calibrate(gaze: GazeEstimator, offsets):
+    for x in offsets:
+        result = gaze.update(face(x), FRAME)
+    return result
+
+
+def test_needs_refined_mesh():
+    assert GazeEstimator().update(face()[:468], FRAME) == {}
+
+
+def test_calibration_baseline_is_the_median():
+    gaze = GazeEstimator(calibration_frames=30)
+    offsets = [0.2] * 26 + [0.9, -0.8, 0.9, 0.9]  # a few bad frames during calibration
+    result = calibrate(gaze, offsets)
+    assert result["calibrated"] and result["progress"] == 1.0
+    np.testing.assert_allclose(gaze.baseline, (0.2, 0.0), atol=1e-4)
+    # Looking where the user looked during calibration: no deviation
+    result = gaze.update(face(0.2), FRAME)
+    assert result["vector"] == [0.0, 0.0] and result["deviation"] == 0.0
+
+
+def test_not_calibrated_reports_progress_only():
+    gaze = GazeEstimator(calibration_frames=30)
+    result = calibrate(gaze, [0.5] * 15)
+    assert not result["calibrated"]
+    assert result["progress"] == 0.5
+    assert result["vector"] == [0.0, 0.0]
+
+
+def test_blinks_do_not_calibrate():
+    gaze = GazeEstimator(calibration_frames=5)
+    for _ in range(10):
+        result = gaze.update(face(0.3, blink=True), FRAME)
+    assert result["blink"] and not result["calibrated"]
+    assert gaze.accepted == 0
+
+
+def test_acceptance_window():
+    gaze = GazeEstimator(calibration_frames=10, accept_deviation=0.15)
+    calibrate(gaze, [0.0] * 10)
+
+    # A glance away is reported but does not move the baseline
+    result = gaze.update(face(0.6), FRAME)
+    assert result["vector"][0] == 0.6 and result["deviation"] > 30
+    assert gaze.accepted == 10
+
+    # Small offsets (posture drift) enter the window and the median follows
+    for _ in range(20):
+        gaze.update(face(0.1), FRAME)
+    assert gaze.accepted == 30
+    np.testing.assert_allclose(gaze.baseline, (0.1, 0.0), atol=1e-4)
+
+
+def test_vertical_offset_is_downwards_positive():
+    gaze = GazeEstimator(calibration_frames=5)
+    calibrate(gaze, [0.0] * 5)
+    result = gaze.update(face(0.0, 0.5), FRAME)
+    assert result["vector"][1] == 0.5
+
+
+def test_reset():
+    gaze = GazeEstimator(calibration_frames=5)
+    calibrate(gaze, [0.4] * 5)
+    gaze.reset()
+    assert not gaze.calibrated
+    np.testing.assert_array_equal(gaze.baseline, 0)
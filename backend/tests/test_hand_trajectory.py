@@ -0,0 +1,124 @@
+import numpy as np
+
+from hand_trajectory import HandTrajectory
+
+HAND_SIZE = 0.1  # wrist to middle-finger MCP, normalized image units
+
+rng = np.random.default_rng(0)
+TEMPLATE = rng.uniform(-0.05, 0.05, (21, 3)).astype(np.float32)
+TEMPLATE[0] = 0                       # wrist
+TEMPLATE[9] = (0, -HAND_SIZE, 0)      # middle MCP
+TEMPLATE[5] = (-0.03, -0.09, 0)       # index MCP
+TEMPLATE[17] = (0.03, -0.09, 0)       # pinky MCP
+
+
+def hand_at(x: float, y: float, scale: float = 1.0) -> np.ndarray:
+    points = TEMPLATE * scale
+    points[:, 0] += x
+    points[:, 1] += y
+    return points
+
+
+def first_gesture(path, open_hand=True, scale=1.0):
+    """Push the palm path frame by frame, like the service; first gesture reported."""
+    trajectory = HandTrajectory()
+    for x, y in path:
+        trajectory.push(hand_at(x, y, scale))
+        gesture = trajectory.detect(open_hand)
+        if gesture:
+            return gesture
+    return None
+
+
+def line(dx, dy, frames=12, start=(0.5, 0.5)):
+    return [(start[0] + i * dx, start[1] + i * dy) for i in range(frames)]
+
+
+def test_swipes():
+    assert first_gesture(line(0.02, 0)) == "SWIPE_RIGHT"
+    assert first_gesture(line(-0.02, 0)) == "SWIPE_LEFT"
+    # Image coordinates: y grows downwards
+    assert first_gesture(line(0, -0.02)) == "SWIPE_UP"
+    assert first_gesture(line(0, 0.02)) == "SWIPE_DOWN"
+
+
+def test_swipe_is_measured_in_hand_sizes():
+    # Same gesture from twice as far: half the hand, half the motion
+    assert first_gesture(line(0.01, 0), scale=0.5) == "SWIPE_RIGHT"
+    # Same motion with a twice bigger hand is too short
+    assert first_gesture(line(0.02, 0), scale=2.0) is None
+
+
+def test_circle():
+    angles = np.linspace(0, 2 * np.pi, 17)
+    path = [(0.5 + HAND_SIZE * np.cos(a), 0.5 + HAND_SIZE * np.sin(a)) for a in angles]
+    assert first_gesture(path) == "CIRCLE"
+
+
+def test_wave():
+    # Three frames right, three left, ...: 0.25 hand sizes per frame
+    xs = np.cumsum([0.025 if (i // 3) % 2 == 0 else -0.025 for i in range(15)])
+    path = [(0.5 + x, 0.5) for x in xs]
+    assert first_gesture(path) == "TCHAO"
+    # A wave needs an open hand
+    assert first_gesture(path, open_hand=False) is None
+
+
+def test_still_hand_with_jitter():
+    jitter = rng.normal(0, 0.002, (40, 2))
+    assert first_gesture([(0.5 + dx, 0.5 + dy) for dx, dy in jitter]) is None
+
+
+def test_too_few_frames():
+    trajectory = HandTrajectory(min_frames=4)
+    for x, y in line(0.2, 0, frames=3):
+        trajectory.push(hand_at(x, y))
+    assert trajectory.detect(True) is None
+
+
+def test_running_sums_match_window():
+    trajectory = HandTrajectory(capacity=16)
+    walk = np.cumsum(rng.normal(0, 0.01, (1000, 2)), axis=0) + 0.5
+    for i, (x, y) in enumerate(walk):
+        trajectory.push(hand_at(x, y))
+        # Checked mid-lap too, not only right after a resync
+        if i % 7 == 0:
+            np.testing.assert_allclose(trajectory.displacement, trajectory.steps.sum(axis=0), atol=1e-9)
+            assert abs(trajectory.path - trajectory.lengths.sum()) < 1e-9
+            assert abs(trajectory.turning - trajectory.turns.sum()) < 1e-9
+            assert abs(trajectory.reversals - trajectory.flips.sum()) < 1e-9
+
+
+def test_resync_once_per_lap():
+    trajectory = HandTrajectory(capacity=16)
+    for x, y in line(0.01, 0.005, frames=5):
+        trajectory.push(hand_at(x, y))
+    # Stand-in for accumulated float error: the next lap end overwrites it
+    trajectory.path += 1.0
+    trajectory.turning += 1.0
+    for x, y in line(0.01, 0.005, frames=11, start=(0.55, 0.525)):
+        trajectory.push(hand_at(x, y))
+    assert trajectory.head == 0
+    assert trajectory.path == float(trajectory.lengths.sum())
+    assert trajectory.turning == float(trajectory.turns.sum())
+    np.testing.assert_array_equal(trajectory.displacement, trajectory.steps.sum(axis=0))
+
+
+def test_window_is_oldest_first():
+    trajectory = HandTrajectory(capacity=4)
+    for i in range(6):
+        trajectory.push(hand_at(0.1 * i, 0.5))
+    window = trajectory.window()
+    assert window.shape == (4, 21, 3)
+    # Hand-normalized: wrist at the origin, middle MCP at one hand size
+    np.testing.assert_allclose(window[:, 0], 0, atol=1e-6)
+    np.testing.assert_allclose(window[-1, 9, :2], (0, -1), atol=1e-5)
+
+
+def test_reset_forgets_the_window():
+    trajectory = HandTrajectory()
+    for x, y in line(0.02, 0):
+        trajectory.push(hand_at(x, y))
+    trajectory.reset()
+    assert trajectory.count == 0 and trajectory.path == 0.0
+    assert trajectory.detect(True) is None
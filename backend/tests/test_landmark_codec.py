@@ -0,0 +1,145 @@
+import struct
+
+import numpy as np
+import pytest
+
+from landmark_codec import (FLAG_DELTA, FLAG_INT8, FLAG_INT16, GROUP_HEADER, HEADER, INT16_SCALE, KIND_FACE,
+                            KIND_HAND, MSG_LANDMARKS, MSG_TOPOLOGY, TOPOLOGY_HEADER, LandmarkEncoder)
+
+
+class Decoder:
+    """Client side of the wire format (TECHNICAL_DOCUMENTATION.md, "Flux binaire des landmarks")."""
+
+    def __init__(self):
+        self.prev = None
+
+    def decode(self, message: bytes):
+        msg_type, flags, seq, count, _ = HEADER.unpack_from(message)
+        assert msg_type == MSG_LANDMARKS
+        offset = HEADER.size
+        layout, blocks = [], []
+        if flags & FLAG_INT16:
+            dtype = "<i1" if flags & FLAG_INT8 else "<i2"
+        else:
+            dtype = "<f2"
+        size = np.dtype(dtype).itemsize
+        for _ in range(count):
+            kind, points = GROUP_HEADER.unpack_from(message, offset)
+            offset += GROUP_HEADER.size
+            assert offset % 2 == 0
+            nbytes = points * 3 * size
+            blocks.append(np.frombuffer(message, dtype, points * 3, offset).reshape(points, 3))
+            offset += nbytes + nbytes % 2
+            layout.append((kind, points))
+        assert offset == len(message)
+        if not blocks:
+            self.prev = None
+            return seq, flags, layout, None
+
+        values = np.concatenate(blocks).astype(np.int32 if flags & FLAG_INT16 else np.float32)
+        if flags & FLAG_DELTA:
+            values = self.prev + values
+        if flags & FLAG_INT16:
+            self.prev = values
+        return seq, flags, layout, values
+
+
+def vision_data(hands, face=None):
+    as_dicts = lambda a: [{"x": float(x), "y": float(y), "z": float(z)} for x, y, z in a]
+    data = {"hand_landmarks": [as_dicts(h) for h in hands]}
+    if face is not None:
+        data["face_landmarks"] = [as_dicts(face)]
+    return data
+
+
+rng = np.random.default_rng(0)
+
+
+def quantized(*groups):
+    return np.rint(np.concatenate(groups) * INT16_SCALE).astype(np.int32)
+
+
+def test_delta_round_trip_with_keyframes():
+    encoder = LandmarkEncoder("int16", delta=True, keyframe_interval=5)
+    decoder = Decoder()
+    hand = rng.uniform(0, 1, (21, 3)).astype(np.float32)
+    face = rng.uniform(0, 1, (478, 3)).astype(np.float32)
+    seen = []
+    for i in range(12):
+        # Small motion (int8 deltas), and a jump at frame 7 (int16 deltas)
+        hand = hand + (0.2 if i == 7 else 0.001)
+        face = face + rng.normal(0, 0.0005, face.shape).astype(np.float32)
+        seq, flags, layout, values = decoder.decode(encoder.encode(vision_data([hand], face)))
+        assert seq == i + 1
+        assert layout == [(KIND_HAND, 21), (KIND_FACE, 478)]
+        np.testing.assert_array_equal(values, quantized(hand, face))
+        seen.append(flags)
+
+    keyframe, int8_delta, int16_delta = FLAG_INT16, FLAG_INT16 | FLAG_DELTA | FLAG_INT8, FLAG_INT16 | FLAG_DELTA
+    assert seen[0] == keyframe
+    assert seen[1:6] == [int8_delta] * 5
+    # Keyframe every 5 deltas
+    assert seen[6] == keyframe
+    assert seen[7] == int16_delta
+    assert seen[8:12] == [int8_delta] * 4
+
+
+def test_layout_change_sends_keyframe():
+    encoder = LandmarkEncoder("int16", delta=True)
+    decoder = Decoder()
+    hand = rng.uniform(0, 1, (21, 3))
+    decoder.decode(encoder.encode(vision_data([hand])))
+    _, flags, layout, values = decoder.decode(encoder.encode(vision_data([hand, hand + 0.001])))
+    assert not flags & FLAG_DELTA
+    assert layout == [(KIND_HAND, 21), (KIND_HAND, 21)]
+    np.testing.assert_array_equal(values, quantized(hand, hand + 0.001))
+
+
+def test_empty_frame_resets_the_delta_chain():
+    encoder = LandmarkEncoder("int16", delta=True)
+    decoder = Decoder()
+    hand = rng.uniform(0, 1, (21, 3))
+    decoder.decode(encoder.encode(vision_data([hand])))
+    _, flags, layout, values = decoder.decode(encoder.encode({}))
+    assert layout == [] and values is None
+    _, flags, _, values = decoder.decode(encoder.encode(vision_data([hand])))
+    assert not flags & FLAG_DELTA
+    np.testing.assert_array_equal(values, quantized(hand))
+
+
+def test_odd_group_is_padded():
+    # 1 point x 3 int8 deltas = 3 bytes: padded so the next header stays aligned
+    encoder = LandmarkEncoder("int16", delta=True)
+    decoder = Decoder()
+    points = rng.uniform(0, 1, (1, 3))
+    decoder.decode(encoder.encode(vision_data([points, points])))
+    _, flags, _, values = decoder.decode(encoder.encode(vision_data([points + 0.001, points])))
+    assert flags & FLAG_INT8
+    np.testing.assert_array_equal(values, quantized(points + 0.001, points))
+
+
+def test_float16_ignores_delta():
+    encoder = LandmarkEncoder("float16", delta=True)
+    decoder = Decoder()
+    hand = rng.uniform(0, 1, (21, 3)).astype(np.float32)
+    for _ in range(3):
+        _, flags, _, values = decoder.decode(encoder.encode(vision_data([hand])))
+        assert flags == 0
+        np.testing.assert_allclose(values, hand, atol=1e-3)
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError):
+        LandmarkEncoder("int8")
+
+
+def test_topology_sent_once_per_kind():
+    encoder = LandmarkEncoder()
+    data = {"hand_connections": [(0, 1), (1, 2)], "face_connections": [(0, 1)]}
+    message = encoder.topology_message(data)
+    msg_type, _, groups = TOPOLOGY_HEADER.unpack_from(message)
+    assert (msg_type, groups) == (MSG_TOPOLOGY, 2)
+    kind, edges = GROUP_HEADER.unpack_from(message, TOPOLOGY_HEADER.size)
+    assert (kind, edges) == (KIND_HAND, 2)
+    assert struct.unpack_from("<4H", message, TOPOLOGY_HEADER.size + GROUP_HEADER.size) == (0, 1, 1, 2)
+    assert encoder.topology_message(data) is None
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+from motion_gate import MotionGate
+
+rng = np.random.default_rng(0)
+SKIN = (120, 160, 210)
+BACKGROUND = cv2.GaussianBlur(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8), (0, 0), 8)
+
+
+def camera(img: np.ndarray) -> np.ndarray:
+    """Sensor noise and JPEG round trip, like a webcam frame."""
+    noisy = np.clip(img + rng.normal(0, 4, img.shape), 0, 255).astype(np.uint8)
+    ok, buf = cv2.imencode(".jpg", noisy, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def with_hand(fingers: int = 4) -> np.ndarray:
+    """A ~70x90 px palm with `fingers` raised, in the lower right corner."""
+    img = BACKGROUND.copy()
+    cv2.ellipse(img, (500, 380), (35, 45), 0, 0, 360, SKIN, -1)
+    for i in range(fingers):
+        cv2.rectangle(img, (470 + i * 17, 280), (482 + i * 17, 335), SKIN, -1)
+    return img
+
+
+def gate_on(img: np.ndarray, **kwargs) -> MotionGate:
+    gate = MotionGate(threshold=0.03, **kwargs)
+    assert gate.reuse(camera(img)) is None
+    gate.store({"gesture": "NONE"})
+    return gate
+
+
+def test_static_frame_is_reused():
+    gate = gate_on(BACKGROUND)
+    assert gate.reuse(camera(BACKGROUND)) == {"gesture": "NONE", "reused": True}
+    assert (gate.inferred, gate.reused) == (1, 1)
+
+
+def test_small_changes_reopen_the_gate():
+    # Each covers a few percent of the frame at most
+    assert gate_on(BACKGROUND).reuse(camera(with_hand())) is None
+    assert gate_on(with_hand()).reuse(camera(with_hand(fingers=0))) is None
+    assert gate_on(with_hand(fingers=2)).reuse(camera(with_hand(fingers=1))) is None
+
+
+def test_refresh_is_time_based():
+    gate = gate_on(BACKGROUND, refresh_ms=1000)
+    assert gate.reuse(camera(BACKGROUND)) is not None
+    gate.inferred_at -= 1.0
+    assert gate.reuse(camera(BACKGROUND)) is None
+
+
+def test_other_key_is_not_reused():
+    gate = gate_on(BACKGROUND)
+    assert gate.reuse(camera(BACKGROUND), key="hands") is None
+
+
+def test_off():
+    for gate in (MotionGate(threshold=0), MotionGate(threshold=0.03, refresh_ms=0)):
+        gate.reuse(BACKGROUND)
+        gate.store({})
+        assert gate.reuse(BACKGROUND) is None
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from circuit_breaker import CircuitBreaker
+from frame_ring import StaleFrameError
+from main import EmotionScheduler, FusionEngine, LatestFrameSlot, SessionManager, call_service
+
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def replay(answers):
+    """httpx client answering the successive requests with `answers`."""
+    bodies = iter(answers)
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=next(bodies))))
+
+
+@pytest.fixture(autouse=True)
+def http_backend(monkeypatch):
+    monkeypatch.setattr(main.app.state, "local_backend", None, raising=False)
+    monkeypatch.setattr(main.app.state, "frame_ring", None, raising=False)
+    for name in main.SERVICES:
+        monkeypatch.setitem(main.breakers, name, CircuitBreaker(name, failure_threshold=3))
+
+
+def test_stale_frame_is_no_verdict():
+    breaker = main.breakers["deepface"]
+    breaker.record_failure()
+    with pytest.raises(StaleFrameError):
+        asyncio.run(call_service(replay([{"error": "Frame overwritten", "stale": True}]),
+                                 "deepface", "http://deepface/analyze", b"", "s1", 1.0))
+    assert breaker.consecutive_failures == 1
+
+
+def test_held_fist_survives_a_failed_frame():
+    answers = [{"gesture": "FIST"}, {"error": "Frame overwritten", "stale": True}, {"error": "crashed"},
+               {"gesture": "FIST"}]
+    fusion = FusionEngine(SessionManager())
+    fusion.tasks = frozenset({"hands"})
+    socket = Socket()
+
+    async def run():
+        slot = LatestFrameSlot()
+        worker = asyncio.create_task(
+            main.vision_worker(slot, replay(answers), "s1", EmotionScheduler(), fusion, socket))
+        for i in range(len(answers)):
+            slot.put(b"jpeg")
+            while slot.processed <= i:
+                await asyncio.sleep(0)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(run())
+    assert [m["command"] for m in socket.sent if m["type"] == "UI_COMMAND"] == ["SELECT_ITEM"]
+
+
+def test_emotion_survives_a_failed_frame():
+    answers = [{"emotion": "happy", "confidence": 0.9}, {"error": "Frame overwritten", "stale": True},
+               {"error": "crashed"}]
+    fusion = FusionEngine(SessionManager())
+    scheduler = EmotionScheduler()
+    socket = Socket()
+    http_client = replay(answers)
+
+    async def run():
+        for _ in answers:
+            await main.analyze_emotion(http_client, b"jpeg", "s1", scheduler, fusion, socket)
+
+    asyncio.run(run())
+    assert [(m["mode"], m["emotion"]) for m in socket.sent] == [("DYNAMIC", "happy")]
+    assert scheduler.last_result["emotion"] == "happy"
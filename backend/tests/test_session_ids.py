@@ -0,0 +1,35 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import safe_session_id
+
+
+@pytest.mark.parametrize("session_id", ["abc", "A-b_9", "x" * 64])
+def test_safe_ids_are_kept(session_id):
+    assert safe_session_id(session_id) == session_id
+
+
+@pytest.mark.parametrize("session_id", ["../../tmp/x", "a/b", "a b", "x" * 65, "é", "a\\b"])
+def test_unsafe_ids_are_replaced(session_id):
+    replaced = safe_session_id(session_id)
+    assert replaced != session_id and main.SESSION_ID_PATTERN.fullmatch(replaced)
+
+
+def test_missing_id_gets_a_new_one():
+    assert safe_session_id(None) != safe_session_id(None)
+
+
+@pytest.mark.parametrize("session_id", ["../../escape", "a/b"])
+def test_recording_stays_in_its_directory(tmp_path, monkeypatch, session_id):
+    record_dir = tmp_path / "records"
+    monkeypatch.setattr(main, "WS_RECORD_DIR", str(record_dir))
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws?session_id={session_id}") as ws:
+            ws.send_bytes(b"\x02{}")
+    # The session was released: nothing still holds a connection
+    assert all(c.connections == 0 for c in main.registry.sessions.values())
+    assert len(os.listdir(record_dir)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["records"]
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import main
+from main import SessionManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """main.time.time() under test control."""
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    return now
+
+
+def test_timeline_is_run_length_encoded(clock):
+    manager = SessionManager(spill_dir="")
+    manager.start_session()
+    for gesture in ["FIST", "FIST", "FIST", "OPEN_PALM", "FIST"]:
+        clock[0] += 0.5
+        manager.log_gesture(gesture)
+    clock[0] += 0.5
+    manager.log_emotion("happy")
+    report = manager.stop_session()
+    assert report["duration_seconds"] == 3.0
+    assert report["gesture_stats"] == {"FIST": 4, "OPEN_PALM": 1}
+    assert report["emotion_stats"] == {"happy": 1}
+    assert [(e["type"], e["value"], e["time"], e["end"], e["count"]) for e in report["timeline"]] == [
+        ("GESTURE", "FIST", 0.5, 1.5, 3),
+        ("GESTURE", "OPEN_PALM", 2.0, 2.0, 1),
+        ("GESTURE", "FIST", 2.5, 2.5, 1),
+        ("EMOTION", "happy", 3.0, 3.0, 1),
+    ]
+
+
+def test_runs_are_per_event_type(clock):
+    manager = SessionManager(spill_dir="")
+    manager.start_session()
+    manager.log_gesture("FIST")
+    manager.log_emotion("happy")
+    manager.log_gesture("FIST")
+    timeline = manager.stop_session()["timeline"]
+    # An emotion in between does not break the gesture's run
+    assert [(e["value"], e["count"]) for e in timeline] == [("FIST", 2), ("happy", 1)]
+
+
+def test_timeline_is_bounded(clock):
+    manager = SessionManager(max_timeline=3, spill_dir="")
+    manager.start_session()
+    for i in range(10):
+        manager.log_gesture("FIST" if i % 2 else "OPEN_PALM")
+    report = manager.stop_session()
+    assert len(report["timeline"]) == 3
+    # Counters still cover the whole session
+    assert report["gesture_stats"] == {"FIST": 5, "OPEN_PALM": 5}
+
+
+def test_counters_restart_with_the_session(clock):
+    manager = SessionManager(spill_dir="")
+    manager.log_gesture("FIST")  # not recording yet
+    manager.start_session()
+    manager.log_gesture("FIST")
+    assert manager.stop_session()["gesture_stats"] == {"FIST": 1}
+    assert manager.stop_session() is None
+    manager.log_gesture("FIST")  # stopped: ignored
+    manager.start_session()
+    manager.log_emotion("sad")
+    report = manager.stop_session()
+    assert report["gesture_stats"] == {} and report["emotion_stats"] == {"sad": 1}
+    assert [e["value"] for e in report["timeline"]] == ["sad"]
+
+
+def test_raw_timeline_spill(clock, tmp_path):
+    manager = SessionManager("s1", max_timeline=1, spill_dir=str(tmp_path))
+    manager.start_session()
+    for gesture in ["FIST", "FIST", "OPEN_PALM"]:
+        clock[0] += 1
+        manager.log_gesture(gesture)
+    report = manager.stop_session()
+    path = report["raw_timeline_path"]
+    assert path.startswith(str(tmp_path)) and "session_s1_" in path
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    # Every event, not the run-length / bounded timeline
+    assert events == [
+        {"time": 1.0, "type": "GESTURE", "value": "FIST"},
+        {"time": 2.0, "type": "GESTURE", "value": "FIST"},
+        {"time": 3.0, "type": "GESTURE", "value": "OPEN_PALM"},
+    ]
+    assert manager.spill_file is None
+
+
+def test_close_releases_the_spill_file(clock, tmp_path):
+    manager = SessionManager("s1", spill_dir=str(tmp_path))
+    manager.start_session()
+    manager.log_gesture("FIST")
+    manager.close()
+    assert manager.spill_file is None and not manager.active
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from landmark_pipeline import SessionPool  # noqa: E402
+
+
+def idle(pool: SessionPool, session_id: str, seconds: float):
+    pool.sessions[session_id].last_used -= seconds
+
+
+def test_idle_sessions_are_closed():
+    pool = SessionPool(max_sessions=8, idle_seconds=60)
+    closed = []
+    for sid in ("a", "b", "c"):
+        pool.get(sid).close = lambda sid=sid: closed.append(sid)
+    idle(pool, "a", 120)
+    idle(pool, "b", 120)
+    pool.get("c")
+    assert list(pool.sessions) == ["c"]
+    assert closed == ["a", "b"] and pool.idle_evictions == 2
+
+
+def test_recent_use_keeps_a_session():
+    pool = SessionPool(max_sessions=8, idle_seconds=60)
+    pool.get("a")
+    pool.get("b")
+    idle(pool, "a", 50)
+    state = pool.get("a")
+    idle(pool, "b", 120)
+    # "a" was used again: its idle time starts over
+    assert pool.get("a") is state
+    assert list(pool.sessions) == ["a"]
+
+
+def test_lru_eviction_beyond_the_cap():
+    pool = SessionPool(max_sessions=2, idle_seconds=60)
+    pool.get("a")
+    pool.get("b")
+    pool.get("a")
+    pool.get("c")
+    assert list(pool.sessions) == ["a", "c"]
+    assert pool.evictions == 1 and pool.idle_evictions == 0
@@ -0,0 +1,59 @@
+import pytest
+
+import main
+from main import SessionRegistry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """main.time.monotonic() under test control."""
+    now = [100.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reconnect_reuses_the_session(clock):
+    registry = SessionRegistry(max_sessions=4, idle_seconds=60)
+    client = registry.acquire("a")
+    registry.release(client)
+    clock[0] += 30
+    again = registry.acquire("a")
+    assert again is client and again.connections == 1
+    # Two tabs on one id share it
+    assert registry.acquire("a") is client and client.connections == 2
+    assert len(registry) == 1
+
+
+def test_idle_sessions_are_evicted(clock):
+    registry = SessionRegistry(max_sessions=4, idle_seconds=60)
+    idle = registry.acquire("idle")
+    busy = registry.acquire("busy")
+    registry.release(idle)
+    clock[0] += 61
+    registry.evict_idle()
+    # Only sessions without a connection expire
+    assert list(registry.sessions) == ["busy"]
+    assert registry.acquire("idle") is not idle
+    assert busy.connections == 1
+
+
+def test_full_registry_evicts_least_recently_used(clock):
+    registry = SessionRegistry(max_sessions=2, idle_seconds=60)
+    first = registry.acquire("first")
+    second = registry.acquire("second")
+    registry.release(first)
+    registry.release(second)
+    # Reconnecting moves "first" to the back of the LRU order
+    registry.release(registry.acquire("first"))
+    assert registry.acquire("third") is not None
+    assert list(registry.sessions) == ["first", "third"]
+
+
+def test_full_registry_refuses_when_all_connected(clock):
+    registry = SessionRegistry(max_sessions=2, idle_seconds=60)
+    registry.acquire("a")
+    registry.acquire("b")
+    assert registry.acquire("c") is None
+    assert len(registry) == 2
+    # An existing id still connects
+    assert registry.acquire("a") is not None
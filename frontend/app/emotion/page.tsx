@@ -50,6 +50,14 @@ export default function EmotionAI() {
         const ws = new WebSocket("ws://localhost:8000/ws");
         wsRef.current = ws;
 
+        ws.onopen = () => {
+            // Emotion only. The orchestrator still runs FaceMesh on every frame
+            // (the emotion scheduler watches it to raise the DeepFace rate), but
+            // no hands model and no mesh comes back to this page
+            const message = JSON.stringify({ type: "TASKS", tasks: ["emotion"] });
+            ws.send(new Blob([new Uint8Array([2]), message], { type: 'application/json' }));
+        };
+
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
 
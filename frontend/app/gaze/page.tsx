@@ -19,16 +19,28 @@ export default function GazeTracker() {
         const ws = new WebSocket("ws://localhost:8000/ws");
         wsRef.current = ws;
 
+        ws.onopen = () => {
+            // Gaze is computed server-side from the refined face mesh: ask for
+            // the iris task and the GAZE_DATA stream (no mesh over the wire)
+            const control = (message: object) => ws.send(new Blob([new Uint8Array([2]), JSON.stringify(message)], { type: 'application/json' }));
+            control({ type: "TASKS", tasks: ["iris"] });
+            control({ type: "GAZE_STREAM", fps: 30 });
+        };
+
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
             if (data.type === "GAZE_DATA") {
-                // Assuming backend sends raw gaze vector, we map it to screen coordinates (simulation)
-                // In a real app, this needs complex calibration mapping
+                // vector: offset from the calibrated baseline, in half eye widths
+                // (about +/-0.5 across the screen); frozen while blinking
+                setCalibrationProgress(data.progress ?? 0);
+                setIsCalibrated(Boolean(data.calibrated));
+                if (data.blink) return;
                 const vector = data.vector || [0, 0];
-                setGazePoint(prev => ({
-                    x: 50 + (vector[0] * 500),
-                    y: 50 + (vector[1] * 500)
-                }));
+                const clamp = (v: number) => Math.min(100, Math.max(0, v));
+                setGazePoint({
+                    x: clamp(50 + (vector[0] * 100)),
+                    y: clamp(50 + (vector[1] * 100))
+                });
             }
             if (data.type === "GAZE_ALERT") {
                 // Visual feedback for alert
@@ -95,6 +107,9 @@ export default function GazeTracker() {
             <div className="absolute bottom-12 left-0 right-0 text-center">
                 <h1 className="text-2xl font-bold tracking-widest text-white/20 uppercase">OmniSense Gaze Core</h1>
                 <p className="text-white/10 text-sm mt-2 font-mono">X: {gazePoint.x.toFixed(1)} | Y: {gazePoint.y.toFixed(1)}</p>
+                {!isCalibrated && (
+                    <p className="text-omni-primary/60 text-xs mt-2 font-mono">CALIBRATING - LOOK AT THE SCREEN {Math.round(calibrationProgress * 100)}%</p>
+                )}
             </div>
 
             {/* Gaze Cursor (Follows eyes) */}
@@ -17,6 +17,9 @@ export default function GestureLab() {
     const canvasRef = useRef<HTMLCanvasElement>(null);
     const overlayCanvasRef = useRef<HTMLCanvasElement>(null);
     const wsRef = useRef<WebSocket | null>(null);
+    // Topology is sent once per connection on the landmark stream
+    const handConnectionsRef = useRef<number[][] | null>(null);
+    const faceConnectionsRef = useRef<number[][] | null>(null);
 
     const [gesture, setGesture] = useState("Scanning...");
     const [isRecording, setIsRecording] = useState(false);
@@ -25,6 +28,15 @@ export default function GestureLab() {
         const ws = new WebSocket("ws://localhost:8000/ws");
         wsRef.current = ws;
 
+        ws.onopen = () => {
+            // Only hands and face mesh are shown here: no emotion or iris models
+            const tasks = JSON.stringify({ type: "TASKS", tasks: ["hands", "face"] });
+            ws.send(new Blob([new Uint8Array([2]), tasks], { type: 'application/json' }));
+            // Ask for the landmark side channel at 15 fps for the overlay
+            const message = JSON.stringify({ type: "LANDMARK_STREAM", fps: 15 });
+            ws.send(new Blob([new Uint8Array([2]), message], { type: 'application/json' }));
+        };
+
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
 
@@ -36,6 +48,11 @@ export default function GestureLab() {
 
             if (data.type === "UI_COMMAND" && data.source === "GESTURE") {
                 setGesture(data.gesture || data.command);
+            }
+
+            if (data.type === "LANDMARKS") {
+                if (data.hand_connections) handConnectionsRef.current = data.hand_connections;
+                if (data.face_connections) faceConnectionsRef.current = data.face_connections;
 
                 // Draw landmarks on overlay canvas
                 if (overlayCanvasRef.current && videoRef.current) {
@@ -46,12 +63,13 @@ export default function GestureLab() {
                         ctx.clearRect(0, 0, canvas.width, canvas.height);
 
                         // Draw hand landmarks
-                        if (data.hand_landmarks && data.hand_connections) {
+                        const handConnections = handConnectionsRef.current;
+                        if (data.hand_landmarks && handConnections) {
                             data.hand_landmarks.forEach((handLandmarks: Landmark[]) => {
                                 drawLandmarks(
                                     ctx,
                                     handLandmarks,
-                                    data.hand_connections,
+                                    handConnections,
                                     canvas.width,
                                     canvas.height,
                                     'hand'
@@ -60,12 +78,13 @@ export default function GestureLab() {
                         }
 
                         // Draw face landmarks
-                        if (data.face_landmarks && data.face_connections) {
+                        const faceConnections = faceConnectionsRef.current;
+                        if (data.face_landmarks && faceConnections) {
                             data.face_landmarks.forEach((faceLandmarks: Landmark[]) => {
                                 drawLandmarks(
                                     ctx,
                                     faceLandmarks,
-                                    data.face_connections,
+                                    faceConnections,
                                     canvas.width,
                                     canvas.height,
                                     'face'
@@ -179,7 +198,7 @@ export default function GestureLab() {
         }
     };
 
-    const allGestures = ["FIST", "OPEN_PALM", "POINTING", "PEACE", "THUMBS_UP", "OK", "TCHAO"];
+    const allGestures = ["FIST", "OPEN_PALM", "POINTING", "PEACE", "THUMBS_UP", "OK", "TCHAO", "SWIPE_LEFT", "SWIPE_RIGHT", "SWIPE_UP", "SWIPE_DOWN", "CIRCLE"];
 
     // Gesture emoji mapping for better visual feedback
     const gestureEmojis: Record<string, string> = {
@@ -189,7 +208,12 @@ export default function GestureLab() {
         "PEACE": "✌️",
         "THUMBS_UP": "👍",
         "OK": "👌",
-        "TCHAO": "👋"
+        "TCHAO": "👋",
+        "SWIPE_LEFT": "👈",
+        "SWIPE_RIGHT": "👉",
+        "SWIPE_UP": "👆",
+        "SWIPE_DOWN": "👇",
+        "CIRCLE": "🔄"
     };
 
     const startSession = () => {
@@ -11,8 +11,10 @@ interface SessionReport {
     gesture_stats: Record<string, number>;
     timeline: Array<{
         time: number;
+        end?: number;
         type: string;
         value: string;
+        count?: number;
     }>;
 }
 